@@ -7,6 +7,9 @@ import matplotlib as mpl
 import sys
 from scipy.stats import spearmanr
 
+from SessionCatalog import session_totals
+from WorkbookCache import load_sheet
+
 # --- 用户可设置的常数 ---\
 PROPORTION_THRESHOLD_CROSS_REGION = 0.5  # 同理
 OUTLIER_THRESHOLD_INTERNAL = 2.5
@@ -56,18 +59,12 @@ mpl.rcParams['axes.unicode_minus'] = False
 
 # --- 辅助函数：加载数据 ---
 def load_data(file_path):
-    xls = pd.ExcelFile(file_path)
-    df = pd.read_excel(xls, sheet_name=xls.sheet_names[-1])
-    return df
+    return load_sheet(file_path, -1)
 
 # --- 载入所有数据 ---
 print("正在加载数据...")
-df_char_cn_raw = load_data(FILE_CHAR_CN_RAW)
-df_char_jp_raw = load_data(FILE_CHAR_JP_RAW)
 df_char_cn_grouped = load_data(FILE_CHAR_CN_GROUPED)
 df_char_jp_grouped = load_data(FILE_CHAR_JP_GROUPED)
-df_music_cn_raw = load_data(FILE_MUSIC_CN_RAW)
-df_music_jp_raw = load_data(FILE_MUSIC_JP_RAW)
 df_music_cn_grouped = load_data(FILE_MUSIC_CN_GROUPED)
 df_music_jp_grouped = load_data(FILE_MUSIC_JP_GROUPED)
 
@@ -75,11 +72,14 @@ df_fun_map = load_data(FILE_FUN_MAP)
 char_name_map = dict(zip(df_fun_map[COL_FUN_JP_NAME], df_fun_map[COL_FUN_CN_NAME]))
 print("数据加载完成。")
 
-# --- 计算总票数 (从原始数据) ---
-total_votes_char_cn = df_char_cn_raw[COL_VOTES].sum()
-total_votes_char_jp = df_char_jp_raw[COL_VOTES].sum()
-total_votes_music_cn = df_music_cn_raw[COL_MUSIC_CN_VOTES].sum()
-total_votes_music_jp = df_music_jp_raw[COL_MUSIC_JP_VOTES].sum()
+# --- 计算总票数 (原始数据最后一个 Sheet 的合计，来自届次目录，不解析原始工作簿) ---
+def last_total(file_path, column):
+    return list(session_totals(file_path, column).values())[-1]
+
+total_votes_char_cn = last_total(FILE_CHAR_CN_RAW, COL_VOTES)
+total_votes_char_jp = last_total(FILE_CHAR_JP_RAW, COL_VOTES)
+total_votes_music_cn = last_total(FILE_MUSIC_CN_RAW, COL_MUSIC_CN_VOTES)
+total_votes_music_jp = last_total(FILE_MUSIC_JP_RAW, COL_MUSIC_JP_VOTES)
 
 print(f"\n国区角色总票数: {total_votes_char_cn}")
 print(f"日区角色总票数: {total_votes_char_jp}")
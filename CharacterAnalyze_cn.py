@@ -1,82 +1,123 @@
+import argparse
 import pandas as pd
 import matplotlib.pyplot as plt
 
+from SessionCatalog import session_totals, sort_sheets
+from VoteAnalysis import plot_trends, save_table, share_matrix
+from WorkbookCache import load_workbook
+
 TARGET_NAME = '琪露诺'
 EXCEL_FILE= 'TouhouVote_cn_grouped.xlsx'
 EXCEL_FILE_RAW = 'TouhouVote_cn.xlsx'
+NAME_COL = '译名'
 OUTPUT_IMAGE = 'TouhouVote_character.png'
+OUTPUT_TABLE = 'TouhouVote_character_trends_cn.csv'  # 批量模式输出（.csv 或 .parquet）
 
-# 1. 读取所有 Sheet 并按键名（数字）升序排序
-all_sheets = pd.read_excel(EXCEL_FILE, sheet_name=None)
-raw_sheets = pd.read_excel(EXCEL_FILE_RAW, sheet_name=None)
-
-# 提取 Sheet 名并转换为整数排序（例如 "1", "2" → 1, 2）
-try:
-    sorted_sheet_names = sorted(all_sheets.keys(), key=lambda x: int(x))
-except ValueError:
-    raise ValueError("Sheet 名必须为可转换为整数的字符串（如 '1', '2'）")
-
-# 2. 处理每个 Sheet
-results = {}  # 保存结果：{Sheet名: 百分比}
-
-for sheet_name in sorted_sheet_names:
-    df = all_sheets[sheet_name]
-    try:
-        # 检查必要列是否存在
-        if "译名" not in df.columns or "票数" not in df.columns:
-            print(f"警告：Sheet '{sheet_name}' 缺少列 '名字' 或 '票数'，已跳过")
-            continue
-        
-        # 计算总票数（忽略票数为0的Sheet）
-        total_votes = raw_sheets[sheet_name]["票数"].sum()
-        if total_votes == 0:
-            print(f"警告：Sheet '{sheet_name}' 总票数为0，已跳过")
-            continue
-        
-        # 查找目标人物的票数（若不存在或票数为0则跳过）
-        target_row = df[df["译名"] == TARGET_NAME]
-        if target_row.empty:
-            print(f"警告：Sheet '{sheet_name}' 中未找到 '{TARGET_NAME}'，已跳过")
-            continue
-        target_votes = target_row["票数"].iloc[0]  # 假设每个名字在Sheet内唯一
-        if target_votes == 0:
-            print(f"警告：Sheet '{sheet_name}' 中 '{TARGET_NAME}' 票数为0，已跳过")
+
+def load_sessions():
+    """读取所有 Sheet，返回 (all_sheets, raw_totals)"""
+    all_sheets = load_workbook(EXCEL_FILE)
+    raw_totals = session_totals(EXCEL_FILE_RAW)  # 原始票数合计来自届次目录，不解析原始工作簿
+    return all_sheets, raw_totals
+
+
+def all_character_trends(all_sheets, raw_totals):
+    """所有届拼接后一次 pivot，每个角色的趋势就是表中的一行"""
+    return share_matrix(all_sheets, raw_totals, NAME_COL)
+
+
+def character_trend(target_name, all_sheets, raw_totals):
+    """单个角色在各届的得票占比：DataFrame（Sheet名称, 百分比），按 Sheet 名（数字）升序"""
+    # 按 Sheet 名开头的届数排序（例如 "1", "3(th08)" → 1, 3）
+    sorted_sheet_names = sort_sheets(all_sheets.keys())
+
+    # 处理每个 Sheet
+    results = {}  # 保存结果：{Sheet名: 百分比}
+
+    for sheet_name in sorted_sheet_names:
+        df = all_sheets[sheet_name]
+        try:
+            # 检查必要列是否存在
+            if NAME_COL not in df.columns or "票数" not in df.columns:
+                print(f"警告：Sheet '{sheet_name}' 缺少列 '名字' 或 '票数'，已跳过")
+                continue
+
+            # 计算总票数（忽略票数为0的Sheet）
+            total_votes = raw_totals[sheet_name]
+            if total_votes == 0:
+                print(f"警告：Sheet '{sheet_name}' 总票数为0，已跳过")
+                continue
+
+            # 查找目标人物的票数（若不存在或票数为0则跳过）
+            target_row = df[df[NAME_COL] == target_name]
+            if target_row.empty:
+                print(f"警告：Sheet '{sheet_name}' 中未找到 '{target_name}'，已跳过")
+                continue
+            target_votes = target_row["票数"].iloc[0]  # 假设每个名字在Sheet内唯一
+            if target_votes == 0:
+                print(f"警告：Sheet '{sheet_name}' 中 '{target_name}' 票数为0，已跳过")
+                continue
+
+            # 计算百分比
+            percentage = (target_votes / total_votes) * 100
+            results[sheet_name] = round(percentage, 2)
+
+        except Exception as e:
+            print(f"处理 Sheet '{sheet_name}' 时出错: {str(e)}")
             continue
-        
-        # 计算百分比
-        percentage = (target_votes / total_votes) * 100
-        results[sheet_name] = round(percentage, 2)
-        
-    except Exception as e:
-        print(f"处理 Sheet '{sheet_name}' 时出错: {str(e)}")
-        continue
-
-# 3. 检查是否有有效数据
-if not results:
-    raise ValueError("没有有效数据可绘制图表！")
-
-# 4. 转换为 DataFrame（已按 Sheet 名升序排列）
-result_df = pd.DataFrame(
-    list(results.items()),
-    columns=["Sheet名称", "百分比"]
-)
-
-# 5. 绘制趋势图
-plt.figure(figsize=(10, 6))
-plt.plot(result_df["Sheet名称"], result_df["百分比"], marker='o', linestyle='-', color='#2E86C1')
-plt.rcParams['font.sans-serif'] = ['SimHei']  # 解决中文乱码
-plt.title(f"'{TARGET_NAME}' 在各 Sheet 中的得票占比（按数字顺序）")
-plt.xlabel("Sheet 名称（数字序号）")
-plt.ylabel("得票占比 (%)")
-plt.xticks(rotation=45)
-plt.grid(True, linestyle='--', alpha=0.7)
-
-# 添加数据标签
-for x, y in zip(result_df["Sheet名称"], result_df["百分比"]):
-    plt.text(x, y, f"{y}%", ha='center', va='bottom', fontsize=9)
-
-plt.tight_layout()
-# plt.savefig(OUTPUT_IMAGE, dpi=300)s
-plt.show()
-
-# print(f"处理完成！图表已保存为 {OUTPUT_IMAGE}")
\ No newline at end of file
+
+    # 转换为 DataFrame（已按 Sheet 名升序排列）
+    return pd.DataFrame(
+        list(results.items()),
+        columns=["Sheet名称", "百分比"]
+    )
+
+
+def plot_character_trend(result_df, target_name):
+    # 检查是否有有效数据
+    if result_df.empty:
+        raise ValueError("没有有效数据可绘制图表！")
+
+    # 绘制趋势图
+    plt.figure(figsize=(10, 6))
+    plt.plot(result_df["Sheet名称"], result_df["百分比"], marker='o', linestyle='-', color='#2E86C1')
+    plt.rcParams['font.sans-serif'] = ['SimHei']  # 解决中文乱码
+    plt.title(f"'{target_name}' 在各 Sheet 中的得票占比（按数字顺序）")
+    plt.xlabel("Sheet 名称（数字序号）")
+    plt.ylabel("得票占比 (%)")
+    plt.xticks(rotation=45)
+    plt.grid(True, linestyle='--', alpha=0.7)
+
+    # 添加数据标签
+    for x, y in zip(result_df["Sheet名称"], result_df["百分比"]):
+        plt.text(x, y, f"{y}%", ha='center', va='bottom', fontsize=9)
+
+    plt.tight_layout()
+    # plt.savefig(OUTPUT_IMAGE, dpi=300)s
+    plt.show()
+
+    # print(f"处理完成！图表已保存为 {OUTPUT_IMAGE}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="查看角色得票比例在各届的变化趋势")
+    parser.add_argument('--all', action='store_true', help="批量模式：一次计算所有角色，输出 角色 × 届 的占比表")
+    parser.add_argument('--output', default=OUTPUT_TABLE, help="批量模式的输出表（.csv 或 .parquet）")
+    parser.add_argument('--charts', metavar='DIR', help="批量模式下为每个角色输出一张趋势图到该目录")
+    args = parser.parse_args()
+
+    # 读取所有 Sheet 并按键名（数字）升序排序
+    all_sheets, raw_totals = load_sessions()
+
+    if args.all:
+        matrix = all_character_trends(all_sheets, raw_totals)
+        print(f"已保存 {len(matrix)} 个角色 × {matrix.shape[1]} 届的占比表到 {save_table(matrix, args.output)}")
+        if args.charts:
+            print(f"已输出 {plot_trends(matrix, args.charts)} 张趋势图到 {args.charts}")
+        return
+
+    plot_character_trend(character_trend(TARGET_NAME, all_sheets, raw_totals), TARGET_NAME)
+
+
+if __name__ == '__main__':
+    main()
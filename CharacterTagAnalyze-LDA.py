@@ -1,16 +1,13 @@
 import os
-import hashlib
 import pandas as pd
-import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
-from bs4 import BeautifulSoup
 import jieba
 from sklearn.feature_extraction.text import CountVectorizer
 from sklearn.decomposition import LatentDirichletAllocation
 from wordcloud import WordCloud
 import matplotlib.pyplot as plt
 import re
+from PageFetcher import PageFetcher
+from WorkbookCache import load_sheet
 
 # === 配置区 ===
 excel_path = "TouhouVote_jp_grouped.xlsx"
@@ -21,44 +18,16 @@ suffixes = ["/二次设定", "/"]
 remove_keywords = ["的", "我们", "公司", "产品"]
 stopwords_path = "stopwords.txt"
 font_path = r"方正书宋简体.ttf"
-cache_dir = "cache_data"
+cache_path = "page_cache.sqlite"
 output_dir = "CharacterTagAnalyze-results-LDA"
 num_topics = 20                 # LDA 主题数
 num_words = 30                # 每个主题关键词数
 
 # 初始化目录
-os.makedirs(cache_dir, exist_ok=True)
 os.makedirs(output_dir, exist_ok=True)
 
-# 请求会话配置
-session = requests.Session()
-retries = Retry(total=3, backoff_factor=1,
-                status_forcelist=[429, 500, 502, 503, 504],
-                allowed_methods=["GET"])
-adapter = HTTPAdapter(max_retries=retries)
-session.mount('http://', adapter)
-session.mount('https://', adapter)
-headers = {"User-Agent": "Mozilla/5.0"}
+fetcher = PageFetcher(base_url, cache_path)  # 并发、限速获取网页，缓存在 cache_path 中
 
-# 工具函数
-def url_to_filename(url):
-    h = hashlib.md5(url.encode('utf-8')).hexdigest()
-    return os.path.join(cache_dir, f"{h}.txt")
-
-def fetch_text(url):
-    cache_file = url_to_filename(url)
-    if os.path.exists(cache_file):
-        return open(cache_file, 'r', encoding='utf-8').read()
-    try:
-        r = session.get(url, headers=headers, timeout=10)
-        r.raise_for_status()
-        text = BeautifulSoup(r.text, 'html.parser').get_text(separator=' ', strip=True)
-        with open(cache_file, 'w', encoding='utf-8') as f:
-            f.write(text)
-        return text
-    except Exception as e:
-        print(f"Error fetching {url}: {e}")
-        return ""
 
 # 加载停用词
 stopwords = set(remove_keywords)
@@ -76,7 +45,7 @@ def is_number(w):
     return bool(re.fullmatch(r"\d+", w))
 
 # 构建 URL 列表和译名集合
-df = pd.read_excel(excel_path, sheet_name=sheet_name)
+df = load_sheet(excel_path, sheet_name)
 df = df.dropna(subset=["译名 "])
 name_to_docs = {}
 for name in df["译名 "]:
@@ -90,11 +59,14 @@ for name in df["译名 "]:
 
 name_set = set(name_to_docs.keys())
 
+# 所有网页一起并发获取（已缓存的直接读取）
+page_texts = fetcher.fetch_docs(name_to_docs)
+
 # 合并文档并预处理分词
 combined_preprocessed = []
 names = []
 for name, urls in name_to_docs.items():
-    texts = [fetch_text(url) for url in urls]
+    texts = page_texts[name]
     combined = ' '.join([t for t in texts if t])
     tokens = []
     for w in jieba.lcut(combined):
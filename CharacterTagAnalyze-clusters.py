@@ -1,10 +1,5 @@
 import os
-import hashlib
 import pandas as pd
-import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
-from bs4 import BeautifulSoup
 import jieba
 import jieba.analyse
 from collections import Counter, defaultdict
@@ -13,6 +8,8 @@ from sklearn.decomposition import LatentDirichletAllocation
 from sklearn.cluster import KMeans
 import numpy as np
 import re
+from PageFetcher import PageFetcher
+from WorkbookCache import load_sheet
 
 # === 配置 ===
 excel_path = "TouhouVote_jp_grouped.xlsx"
@@ -21,12 +18,12 @@ base_url = "https://thbwiki.cc/"
 suffixes = ["/二次设定", "/分析考据", "/"]
 remove_keywords = ["的", "我们", "公司", "产品"]
 stopwords_path = "stopwords.txt"
-cache_dir = "cache_data"
+cache_path = "page_cache.sqlite"
 output_dir = "keyword_clusters"
 num_clusters = 5
 
-os.makedirs(cache_dir, exist_ok=True)
 os.makedirs(output_dir, exist_ok=True)
+fetcher = PageFetcher(base_url, cache_path)  # 并发、限速获取网页，缓存在 cache_path 中
 
 # 停用词
 stopwords = set(remove_keywords)
@@ -43,29 +40,19 @@ def clean_text(text):
 def is_valid_word(w):
     return len(w) > 1 and w not in stopwords and not re.fullmatch(r"[A-Za-z0-9]+", w) and not re.fullmatch(r"\d+", w)
 
-def fetch_text(url):
-    cache_file = os.path.join(cache_dir, hashlib.md5(url.encode()).hexdigest() + ".txt")
-    if os.path.exists(cache_file):
-        return open(cache_file, 'r', encoding='utf-8').read()
-    try:
-        res = requests.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=10)
-        res.raise_for_status()
-        text = BeautifulSoup(res.text, 'html.parser').get_text(separator=' ', strip=True)
-        with open(cache_file, 'w', encoding='utf-8') as f:
-            f.write(text)
-        return text
-    except:
-        return ""
-
 # 收集所有关键词上下文信息
-df = pd.read_excel(excel_path, sheet_name=sheet_name).dropna(subset=["译名 "])
+df = load_sheet(excel_path, sheet_name).dropna(subset=["译名 "])
+# 所有网页一起并发获取（已缓存的直接读取）
+entries = [clean_text(str(name)) for name in df["译名 "]]
+page_texts = fetcher.fetch_docs({name: [base_url + name + suf for suf in suffixes]
+                                 for name in entries if name != "蕾拉·普莉兹姆利巴"})
 keyword_contexts = []  # (method, keyword, source)
 entry_clean_texts = {}  # {entry: cleaned text}
 
 for name in df["译名 "]:
     name = clean_text(str(name))
     if name == "蕾拉·普莉兹姆利巴": continue
-    texts = [fetch_text(base_url + name + suf) for suf in suffixes]
+    texts = page_texts[name]
     combined = ' '.join(t for t in texts if t)
     tokens = [w for w in jieba.lcut(combined) if is_valid_word(w)]
     full_text = ' '.join(tokens)
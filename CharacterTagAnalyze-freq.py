@@ -1,15 +1,12 @@
 import os
-import hashlib
 import pandas as pd
-import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
-from bs4 import BeautifulSoup
 import jieba
 from collections import Counter
 from wordcloud import WordCloud
 import matplotlib.pyplot as plt
 import re
+from PageFetcher import PageFetcher
+from WorkbookCache import load_sheet
 
 # === 配置区 ===
 excel_path = "TouhouVote_jp_grouped.xlsx"
@@ -20,24 +17,12 @@ suffixes = ["/二次设定", "/"]
 remove_keywords = ["的", "我们", "公司", "产品"]
 stopwords_path = "stopwords.txt"
 font_path = r"方正书宋简体.ttf"
-cache_dir = "cache_data"
+cache_path = "page_cache.sqlite"
 output_dir = "CharacterTagAnalyze-results-freq"
 
-os.makedirs(cache_dir, exist_ok=True)
 os.makedirs(output_dir, exist_ok=True)
 
-session = requests.Session()
-retries = Retry(total=3, backoff_factor=1,
-                status_forcelist=[429, 500, 502, 503, 504],
-                allowed_methods=["GET"])
-adapter = HTTPAdapter(max_retries=retries)
-session.mount('http://', adapter)
-session.mount('https://', adapter)
-headers = {"User-Agent": "Mozilla/5.0"}
-
-def url_to_filename(url):
-    h = hashlib.md5(url.encode('utf-8')).hexdigest()
-    return os.path.join(cache_dir, f"{h}.txt")
+fetcher = PageFetcher(base_url, cache_path)  # 并发、限速获取网页，缓存在 cache_path 中
 
 stopwords = set(remove_keywords)
 try:
@@ -46,7 +31,7 @@ try:
 except FileNotFoundError:
     print("Warning: 停用词文件不存在，仅使用 remove_keywords")
 
-df = pd.read_excel(excel_path, sheet_name=sheet_name)
+df = load_sheet(excel_path, sheet_name)
 df = df.dropna(subset=["译名 "])
 name_to_docs = {}
 for name in df["译名 "]:
@@ -62,26 +47,15 @@ for name in df["译名 "]:
 
 name_set = set(name_to_docs.keys())
 
-def fetch_text(url):
-    cache_file = url_to_filename(url)
-    if os.path.exists(cache_file):
-        return open(cache_file, 'r', encoding='utf-8').read()
-    try:
-        r = session.get(url, headers=headers, timeout=10)
-        r.raise_for_status()
-        text = BeautifulSoup(r.text, 'html.parser').get_text(separator=' ', strip=True)
-        with open(cache_file, 'w', encoding='utf-8') as f:
-            f.write(text)
-        return text
-    except Exception as e:
-        print(f"Error fetching {url}: {e}")
-        return ""
 
 def is_single_letter_or_digit(w):
     return bool(re.fullmatch(r"[A-Za-z0-9]", w))
 
+# 所有网页一起并发获取（已缓存的直接读取）
+page_texts = fetcher.fetch_docs(name_to_docs)
+
 for name, urls in name_to_docs.items():
-    texts = [fetch_text(url) for url in urls]
+    texts = page_texts[name]
     combined = ' '.join(t for t in texts if t)
     words = jieba.lcut(combined)
     filtered = [w for w in words if w not in stopwords and w not in name_set and not is_single_letter_or_digit(w) and len(w.strip()) > 1]
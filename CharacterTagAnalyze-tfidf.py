@@ -1,15 +1,12 @@
 import os
-import hashlib
 import pandas as pd
-import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
-from bs4 import BeautifulSoup
 import jieba
 from sklearn.feature_extraction.text import TfidfVectorizer
 from wordcloud import WordCloud
 import matplotlib.pyplot as plt
 import re  # 用于清理字符串
+from PageFetcher import PageFetcher
+from WorkbookCache import load_sheet
 
 # === 配置区 ===
 excel_path = "TouhouVote_jp_grouped.xlsx"    # Excel 文件路径，包含一列 "译名 "
@@ -20,28 +17,16 @@ suffixes = ["/二次设定", "/"]  # 每个 partial_path 后要拼接的特定
 remove_keywords = ["的", "我们", "公司", "产品"]  # 强制过滤词
 stopwords_path = "stopwords.txt"            # 停用词文件（可选）
 font_path = r"方正书宋简体.ttf"  # 词云字体路径，根据系统调整
-cache_dir = "cache_data"                   # 本地缓存目录
+cache_path = "page_cache.sqlite"           # 网页缓存（SQLite，见 PageCache.py）
 output_dir = "CharacterTagAnalyze-results-tfidf"                     # 输出目录，用于保存结果
 
 # === 初始化目录 ===
-os.makedirs(cache_dir, exist_ok=True)
 os.makedirs(output_dir, exist_ok=True)
 
-# === 请求会话配置 ===
-session = requests.Session()
-retries = Retry(total=3, backoff_factor=1,
-                status_forcelist=[429,500,502,503,504],
-                allowed_methods=["GET"])
-adapter = HTTPAdapter(max_retries=retries)
-session.mount('http://', adapter)
-session.mount('https://', adapter)
-headers = {"User-Agent": "Mozilla/5.0"}
+# === 网页获取（并发、限速，缓存在 cache_path 中） ===
+fetcher = PageFetcher(base_url, cache_path)
 
 # === 工具函数 ===
-def url_to_filename(url):
-    h = hashlib.md5(url.encode('utf-8')).hexdigest()
-    return os.path.join(cache_dir, f"{h}.txt")
-
 # 读取停用词
 stopwords = set(remove_keywords)
 try:
@@ -51,7 +36,7 @@ except FileNotFoundError:
     print("Warning: 停用词文件不存在，仅使用 remove_keywords")
 
 # === 1. 构建 URL 列表及名称列表 ===
-df = pd.read_excel(excel_path, sheet_name=sheet_name)
+df = load_sheet(excel_path, sheet_name)
 df = df.dropna(subset=["译名 "])
 name_to_docs = {}
 for name in df["译名 "]:
@@ -69,27 +54,14 @@ for name in df["译名 "]:
 # 构建译名集合，用于过滤关键词
 name_set = set(name_to_docs.keys())
 
-# === 2. 获取并缓存网页文本 ===
-def fetch_text(url):
-    cache_file = url_to_filename(url)
-    if os.path.exists(cache_file):
-        return open(cache_file, 'r', encoding='utf-8').read()
-    try:
-        r = session.get(url, headers=headers, timeout=10)
-        r.raise_for_status()
-        text = BeautifulSoup(r.text, 'html.parser').get_text(separator=' ', strip=True)
-        with open(cache_file, 'w', encoding='utf-8') as f:
-            f.write(text)
-        return text
-    except Exception as e:
-        print(f"Error fetching {url}: {e}")
-        return ""
+# === 2. 获取并缓存网页文本（所有网页一起并发获取，已缓存的直接读取） ===
+page_texts = fetcher.fetch_docs(name_to_docs)
 
 # 合并每个 name 对应 suffix 文档内容
 combined_docs = []
 names = []
 for name, urls in name_to_docs.items():
-    texts = [fetch_text(url) for url in urls]
+    texts = page_texts[name]
     combined = ' '.join([t for t in texts if t])
     combined_docs.append(combined)
     names.append(name)
@@ -0,0 +1,109 @@
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from WorkbookCache import (HAS_PARQUET, LazyWorkbook, cache_dir, file_fingerprint, load_sheet, load_workbook,
+                           store_is_current, store_path, write_store, write_workbook_streaming)
+
+FINGERPRINT_VERSION = 1  # 合并逻辑变化时递增，使旧指纹全部失效
+OUTPUT_FORMATS = ['xlsx', 'parquet']
+
+
+def frame_fingerprint(*frames):
+    """对若干 DataFrame 的列名和内容计算哈希"""
+    h = hashlib.sha256(str(FINGERPRINT_VERSION).encode())
+    for df in frames:
+        h.update(json.dumps([str(c) for c in df.columns], ensure_ascii=False).encode('utf-8'))
+        h.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return h.hexdigest()
+
+
+def _state_path(output_path):
+    return os.path.join(cache_dir, os.path.basename(output_path) + ".fingerprints.json")
+
+
+def _output_digest(output_path, output_format):
+    """输出内容的哈希；Parquet 输出以 manifest 为准（Sheet 文件按内容命名）"""
+    target = output_path if output_format == 'xlsx' else os.path.join(store_path(output_path), "manifest.json")
+    if not os.path.exists(target):
+        return None
+    return file_fingerprint(target)["sha256"]
+
+
+def _read_state(output_path, output_format):
+    try:
+        with open(_state_path(output_path), 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+    if state.get("format", "xlsx") != output_format:
+        return {}
+    # 输出文件被手动改过或删掉时，旧指纹不可信
+    digest = _output_digest(output_path, output_format)
+    if digest is None or digest != state.get("output_sha256"):
+        return {}
+    return state.get("sheets", {})
+
+
+def _write_state(output_path, output_format, fingerprints):
+    os.makedirs(cache_dir, exist_ok=True)
+    state = {"format": output_format, "output_sha256": _output_digest(output_path, output_format),
+             "sheets": fingerprints}
+    with open(_state_path(output_path), 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+
+
+def _reread(sheets, name):
+    """第二遍读取变化的 Sheet：惰性映射从 Parquet 缓存读取（与基准解析器结果相同），普通字典直接取值"""
+    if isinstance(sheets, LazyWorkbook) and HAS_PARQUET and not store_is_current(sheets.path):
+        return load_workbook(sheets.path, [name], backend='parquet')[name]
+    return sheets[name]
+
+
+def regenerate_grouped(output_path, sheets, merge_sheet, mapping_rows, full=False, output_format='xlsx'):
+    """
+    增量生成 *_grouped.xlsx：
+      - sheets: {Sheet名: 原始投票 DataFrame}，可以是 WorkbookCache.open_workbook() 的惰性映射
+      - merge_sheet(df): 返回与对照表合并后的 DataFrame
+      - mapping_rows(df): 返回对照表中与该 Sheet 相关的行，和 Sheet 内容一起计算指纹
+    只有指纹变化的 Sheet 会重新合并，其余 Sheet 直接沿用已有输出；full=True 时全部重建。
+    内存中同时只有一个 Sheet：没有旧指纹（首次运行或 full=True）时逐个 Sheet 读取、计算指纹、合并并写出；
+    有旧指纹时先逐个计算指纹（只保留指纹），再重新读取变化的 Sheet 合并写出，
+    惰性映射的重新读取走 WorkbookCache 的 Parquet 缓存，不再解析 xlsx。
+    output_format='parquet' 时写到 X.parquet/ 目录而不写 xlsx（需要时用 WorkbookCache.py --export 导出）。
+    """
+    target = output_path if output_format == 'xlsx' else store_path(output_path)
+    old = {} if full else _read_state(output_path, output_format)
+    fingerprints = {}
+
+    if old:
+        for name, df in sheets.items():
+            fingerprints[name] = frame_fingerprint(df, mapping_rows(df))
+        changed = [name for name in sheets if old.get(name) != fingerprints[name]]
+        if not changed and list(old) == list(sheets):
+            print(f"{target}: 所有 Sheet 均未变化，跳过")
+            return
+
+        def merged(name):
+            return merge_sheet(_reread(sheets, name)) if name in changed else None
+    else:
+        changed = list(sheets)
+
+        def merged(name):
+            df = sheets[name]
+            fingerprints[name] = frame_fingerprint(df, mapping_rows(df))
+            return merge_sheet(df)
+
+    if output_format == 'parquet':
+        # 生成器中先合并（同时得到指纹），再取内容键
+        write_store(output_path, ((name, fingerprints[name][:16], df)
+                                  for name in sheets for df in [merged(name)]))
+    else:
+        # 未变化的 Sheet 从旧输出中逐个读出（新内容先写到临时文件，旧文件此时仍可读）
+        write_workbook_streaming(output_path, (
+            (name, merged(name) if name in changed else load_sheet(output_path, name))
+            for name in sheets))
+    _write_state(output_path, output_format, fingerprints)
+    print(f"{target}: 重新合并 {len(changed)}/{len(sheets)} 个 Sheet {changed}")
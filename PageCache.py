@@ -0,0 +1,226 @@
+import argparse
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.parse import unquote, urlsplit
+
+# 网页缓存：单个 SQLite 文件（page_cache.sqlite），每个页面一行，正文以 zlib 压缩保存，
+# 并记录 URL、角色名、站点、获取时间、HTTP 状态和原始字节数。取代原来的 cache_data/<md5(url)>.txt
+# （关键词脚本）和 cache/<quote(名称)>.html（TagGetMoeWiki.py）；首次打开时自动把这两个目录导入（目录保留不删）。
+#   python PageCache.py              # 统计信息
+#   python PageCache.py --migrate    # 重新导入旧目录（已有的页面不覆盖）
+CACHE_PATH = 'page_cache.sqlite'
+LEGACY_TEXT_DIR = 'cache_data'       # 关键词脚本：thbwiki 页面解析后的文本，文件名为 URL 的 md5
+LEGACY_HTML_DIR = 'cache'            # TagGetMoeWiki.py：萌娘百科页面的 HTML，文件名为 quote(名称)
+THBWIKI_URL = "https://thbwiki.cc/"
+MOEGIRL_URL = 'https://moegirl.icu/'
+THBWIKI_SUFFIXES = ["/二次设定", "/分析考据", "/"]
+NAME_WORKBOOK = "TouhouVote_jp_grouped.xlsx"   # 还原 cache_data/ 中文件对应 URL 所用的角色名
+SQL_BATCH = 500                      # 一条 IN (...) 查询的参数个数上限
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    key        TEXT PRIMARY KEY,   -- md5(url)，与 cache_data/ 的文件名相同
+    url        TEXT,               -- 迁移时无法还原的为 NULL
+    name       TEXT,               -- 角色名（URL 路径的第一段）
+    host       TEXT,
+    fetched_at REAL,               -- Unix 时间；迁移的页面为原文件的修改时间
+    status     INTEGER,            -- HTTP 状态码；失败且没有响应的为 NULL
+    size       INTEGER,            -- 正文（未压缩）的 utf-8 字节数
+    body       BLOB                -- zlib 压缩的正文；请求失败的为 NULL
+);
+CREATE INDEX IF NOT EXISTS pages_name ON pages (name);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+def url_key(url):
+    return hashlib.md5(url.encode('utf-8')).hexdigest()
+
+
+def name_from_url(url):
+    """URL 路径的第一段（解码后），如 https://thbwiki.cc/琪露诺/二次设定 -> 琪露诺"""
+    path = unquote(urlsplit(url).path).lstrip('/')
+    return path.split('/', 1)[0] or None
+
+
+def _batches(items):
+    items = list(items)
+    for start in range(0, len(items), SQL_BATCH):
+        yield items[start:start + SQL_BATCH]
+
+
+class PageCache:
+    """SQLite 网页缓存；各线程使用各自的连接，可在线程池中并发读写"""
+
+    def __init__(self, path=CACHE_PATH, migrate=True):
+        self.path = path
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.executescript(SCHEMA)
+        if migrate and self.meta('migrated') is None:
+            migrate_legacy(self)
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')   # 读写可以同时进行
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def meta(self, key):
+        row = self._conn().execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key, value):
+        with self._conn() as conn:
+            conn.execute('INSERT OR REPLACE INTO meta VALUES (?, ?)', (key, str(value)))
+
+    # ---------- 读 ----------
+
+    def get(self, url):
+        """已缓存的正文，没有（或上次请求失败）时为 None"""
+        return self.get_many([url]).get(url)
+
+    def get_many(self, urls):
+        """{url: 正文}，只包含已成功缓存的页面；按 md5 批量查询"""
+        keys = {url_key(url): url for url in urls}
+        found = {}
+        conn = self._conn()
+        for batch in _batches(keys):
+            rows = conn.execute(f"SELECT key, body FROM pages WHERE body IS NOT NULL AND key IN "
+                                f"({','.join('?' * len(batch))})", batch)
+            for key, body in rows:
+                found[keys[key]] = zlib.decompress(body).decode('utf-8')
+        return found
+
+    def pages_for_names(self, names, host=None):
+        """一次查询取出一批角色的所有页面：{角色名: {url: 正文}}（没有页面的角色不出现）"""
+        result = {}
+        conn = self._conn()
+        for batch in _batches(names):
+            sql = (f"SELECT name, url, body FROM pages WHERE body IS NOT NULL AND name IN "
+                   f"({','.join('?' * len(batch))})")
+            params = list(batch)
+            if host is not None:
+                sql += " AND host = ?"
+                params.append(host)
+            for name, url, body in conn.execute(sql + " ORDER BY name, url", params):
+                result.setdefault(name, {})[url] = zlib.decompress(body).decode('utf-8')
+        return result
+
+    # ---------- 写 ----------
+
+    def put(self, url, text, status=200, name=None, fetched_at=None):
+        self.put_many([(url, text, status, name, fetched_at)])
+
+    def put_many(self, pages, replace=True):
+        """pages 为 (url, 正文, status, name, fetched_at) 的序列；正文为 None 表示请求失败，只记录状态"""
+        rows = []
+        for url, text, status, name, fetched_at in pages:
+            data = None if text is None else text.encode('utf-8')
+            rows.append((url_key(url), url, name or name_from_url(url), urlsplit(url).netloc,
+                         fetched_at or time.time(), status, None if data is None else len(data),
+                         None if data is None else zlib.compress(data)))
+        verb = 'INSERT OR REPLACE' if replace else 'INSERT OR IGNORE'
+        with self._conn() as conn:
+            conn.executemany(f"{verb} INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def record_failure(self, url, status=None):
+        """记录失败的请求（不覆盖已缓存的正文）"""
+        with self._conn() as conn:
+            conn.execute("INSERT OR IGNORE INTO pages (key, url, name, host, fetched_at, status) "
+                         "VALUES (?, ?, ?, ?, ?, ?)",
+                         (url_key(url), url, name_from_url(url), urlsplit(url).netloc, time.time(), status))
+            conn.execute("UPDATE pages SET fetched_at = ?, status = ? WHERE key = ? AND body IS NULL",
+                         (time.time(), status, url_key(url)))
+
+    def stats(self):
+        row = self._conn().execute(
+            "SELECT COUNT(*), COUNT(body), COUNT(DISTINCT name), COALESCE(SUM(size), 0), "
+            "COALESCE(SUM(LENGTH(body)), 0) FROM pages").fetchone()
+        hosts = self._conn().execute(
+            "SELECT COALESCE(host, '?'), COUNT(*) FROM pages GROUP BY host ORDER BY host").fetchall()
+        return {'pages': row[0], 'cached': row[1], 'names': row[2], 'bytes': row[3], 'compressed': row[4],
+                'hosts': dict(hosts)}
+
+
+# ---------- 旧缓存目录的导入 ----------
+
+def _thbwiki_candidates(workbook=NAME_WORKBOOK):
+    """md5 -> url：用投票表中的所有译名（按关键词脚本的方式清理）和各后缀拼出可能的 URL"""
+    from WorkbookCache import load_workbook
+
+    candidates = {}
+    for df in load_workbook(workbook).values():
+        if "译名 " not in df.columns:
+            continue
+        for name in df["译名 "].dropna():
+            key = re.sub(r"（.*?）", "", str(name)).replace("天为", "帝").strip()
+            for suffix in THBWIKI_SUFFIXES:
+                url = THBWIKI_URL + key + suffix
+                candidates[url_key(url)] = url
+    return candidates
+
+
+def migrate_legacy(cache, text_dir=LEGACY_TEXT_DIR, html_dir=LEGACY_HTML_DIR, workbook=NAME_WORKBOOK):
+    """
+    把 cache_data/ 和 cache/ 导入 cache（已有的页面不覆盖），返回导入的页面数。
+    cache_data/ 的文件名是 URL 的 md5，URL 由投票表中的译名还原；还原不了的仍以 md5 为键导入（url 为 NULL），
+    之后按 URL 查询时同样能命中
+    """
+    pages, unknown = [], []
+    if os.path.isdir(text_dir):
+        files = sorted(f for f in os.listdir(text_dir) if f.endswith('.txt'))
+        candidates = _thbwiki_candidates(workbook) if files and os.path.exists(workbook) else {}
+        for filename in files:
+            path = os.path.join(text_dir, filename)
+            with open(path, 'r', encoding='utf-8') as f:
+                text = f.read()
+            url = candidates.get(filename[:-4])
+            if url is None:
+                unknown.append((filename[:-4], text, os.path.getmtime(path)))
+            else:
+                pages.append((url, text, 200, None, os.path.getmtime(path)))
+    if os.path.isdir(html_dir):
+        for filename in sorted(f for f in os.listdir(html_dir) if f.endswith('.html')):
+            path = os.path.join(html_dir, filename)
+            with open(path, 'r', encoding='utf-8') as f:
+                html = f.read()
+            pages.append((MOEGIRL_URL + filename[:-len('.html')], html, 200, None, os.path.getmtime(path)))
+
+    cache.put_many(pages, replace=False)
+    if unknown:
+        with cache._conn() as conn:
+            conn.executemany("INSERT OR IGNORE INTO pages (key, fetched_at, status, size, body) VALUES (?, ?, 200, ?, ?)",
+                             [(key, mtime, len(text.encode('utf-8')), zlib.compress(text.encode('utf-8')))
+                              for key, text, mtime in unknown])
+    cache.set_meta('migrated', time.time())
+    return len(pages) + len(unknown)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="网页缓存（SQLite）的统计与旧缓存目录的导入")
+    parser.add_argument('--path', default=CACHE_PATH)
+    parser.add_argument('--migrate', action='store_true', help=f"重新导入 {LEGACY_TEXT_DIR}/ 和 {LEGACY_HTML_DIR}/")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    cache = PageCache(args.path)
+    if args.migrate:
+        print(f"导入 {migrate_legacy(cache)} 个页面，用时 {time.perf_counter() - t0:.2f}s")
+    s = cache.stats()
+    print(f"{args.path}：{s['pages']} 个页面（{s['cached']} 个有正文），{s['names']} 个角色，"
+          f"正文 {s['bytes'] / 1e6:.1f} MB，压缩后 {s['compressed'] / 1e6:.1f} MB")
+    for host, n in s['hosts'].items():
+        print(f"  {host}: {n}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError
+from urllib3.util.retry import Retry
+
+from PageCache import CACHE_PATH, PageCache
+
+# 关键词脚本（CharacterTagAnalyze-*.py）共用的网页获取层：
+#   - 已缓存的页面一次查询批量读取（PageCache.py 的 SQLite 缓存，首次打开时导入原来的 cache_data/）；
+#   - 未缓存的用线程池并发请求，并发数为 max_workers；
+#   - 每个域名一个令牌桶，限制每秒请求数（rate）和突发请求数（burst），不会因为并发而对站点造成压力；
+#   - 失败重试沿用原来的 urllib3 Retry 配置（3 次，指数退避，429 / 5xx 重试），每次重试同样要从令牌桶取令牌；
+#   - 失败的请求记录 HTTP 状态码（没有响应的为空），下次运行时重新请求；
+#   - 进度输出到 stderr。
+# base_url 可以指向本地的 HTTP 服务，便于测试（见 benchmark/PageFetcherBenchmark.py）。
+BASE_URL = "https://thbwiki.cc/"
+HEADERS = {"User-Agent": "Mozilla/5.0"}
+TIMEOUT = 10
+MAX_WORKERS = 8
+RATE = 5.0      # 每个域名每秒的请求数
+BURST = 5       # 令牌桶容量：空闲之后允许连续发出的请求数
+
+
+def default_retry():
+    return Retry(total=3, backoff_factor=1,
+                 status_forcelist=[429, 500, 502, 503, 504],
+                 allowed_methods=["GET"])
+
+
+def html_to_text(html):
+    """网页正文文本（与原来各脚本相同：BeautifulSoup.get_text，空白分隔）"""
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(html, 'html.parser').get_text(separator=' ', strip=True)
+
+
+class TokenBucket:
+    """令牌桶：平均每秒 rate 个请求，最多连续 burst 个；acquire() 在没有令牌时等待"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            self.tokens -= 1          # 不足时先预支，按欠下的令牌数排队等待，保证先到先得
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+
+
+class Progress:
+    """在 stderr 上显示 已完成/总数，以及缓存命中和失败的数量"""
+
+    def __init__(self, total, enabled=True, stream=sys.stderr):
+        self.total = total
+        self.done = self.cached = self.failed = 0
+        self.enabled = enabled and total > 0
+        self.stream = stream
+        self.start = time.perf_counter()
+        self.lock = threading.Lock()
+
+    def update(self, cached=False, failed=False):
+        with self.lock:
+            self.done += 1
+            self.cached += cached
+            self.failed += failed
+            if self.enabled:
+                self.stream.write(f"\r获取网页 {self.done}/{self.total}（缓存 {self.cached}，失败 {self.failed}），"
+                                  f"{time.perf_counter() - self.start:.1f}s")
+                if self.done == self.total:
+                    self.stream.write("\n")
+                self.stream.flush()
+
+
+class PageFetcher:
+    """并发、限速的网页获取，结果（解析后的文本）按 URL 缓存在 cache 中（PageCache 或其数据库路径）"""
+
+    def __init__(self, base_url=BASE_URL, cache=CACHE_PATH, max_workers=MAX_WORKERS, rate=RATE, burst=BURST,
+                 retry=None, timeout=TIMEOUT, headers=HEADERS, parse=html_to_text, progress=True):
+        self.base_url = base_url
+        self.cache = cache if isinstance(cache, PageCache) else PageCache(cache)
+        self.max_workers = max_workers
+        self.rate = rate
+        self.burst = burst
+        self.retry = retry if retry is not None else default_retry()
+        self.timeout = timeout
+        self.headers = dict(headers)
+        self.parse = parse          # None 时缓存原始响应文本
+        self.progress = progress
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def url(self, name, suffix=''):
+        return self.base_url + name + suffix
+
+    # ---------- 缓存 ----------
+
+    def cached_text(self, url):
+        """已缓存的文本，没有时为 None"""
+        return self.cache.get(url)
+
+    def store_text(self, url, text):
+        self.cache.put(url, text)
+
+    # ---------- 请求 ----------
+
+    def _session(self):
+        """每个线程一个 requests.Session（连接复用；重试由 download() 按 self.retry 处理）"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(max_retries=0, pool_maxsize=self.max_workers)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            self._local.session = session
+        return session
+
+    def _bucket(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._buckets:
+                self._buckets[host] = TokenBucket(self.rate, self.burst)
+            return self._buckets[host]
+
+    def download(self, url):
+        """请求 url 并返回解析后的文本（不读写缓存），重试用尽后抛出异常"""
+        retry = self.retry
+        while True:
+            self._bucket(url).acquire()
+            try:
+                r = self._session().get(url, headers=self.headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                try:
+                    retry = retry.increment(method='GET', url=url, error=e)
+                except MaxRetryError:
+                    raise e from None
+                retry.sleep()
+                continue
+            if not retry.is_retry('GET', r.status_code, 'Retry-After' in r.headers):
+                r.raise_for_status()
+                return self.parse(r.text) if self.parse else r.text
+            try:
+                retry = retry.increment(method='GET', url=url, response=r.raw)
+            except MaxRetryError:
+                r.raise_for_status()
+                raise
+            retry.sleep(r.raw)  # 有 Retry-After 时按其等待，否则指数退避
+
+    def _fetch_uncached(self, url):
+        try:
+            text = self.download(url)
+        except Exception as e:
+            print(f"Error fetching {url}: {e}", file=sys.stderr)
+            response = getattr(e, 'response', None)
+            self.cache.record_failure(url, response.status_code if response is not None else None)
+            return "", True
+        self.store_text(url, text)
+        return text, False
+
+    def fetch_text(self, url):
+        """单个 URL 的文本：优先读缓存；失败时返回空字符串（与原来的 fetch_text 相同）"""
+        text = self.cached_text(url)
+        if text is None:
+            text, _ = self._fetch_uncached(url)
+        return text
+
+    def fetch_all(self, urls):
+        """一批 URL 的文本 {url: text}：缓存命中的一次查询读出，其余用线程池并发获取"""
+        urls = list(dict.fromkeys(urls))  # 去重并保持顺序
+        progress = Progress(len(urls), self.progress)
+        results = self.cache.get_many(urls)
+        missing = [url for url in urls if url not in results]
+        for _ in range(len(results)):
+            progress.update(cached=True)
+
+        if missing:
+            with ThreadPoolExecutor(min(self.max_workers, len(missing))) as pool:
+                futures = {pool.submit(self._fetch_uncached, url): url for url in missing}
+                for future in as_completed(futures):
+                    text, failed = future.result()
+                    results[futures[future]] = text
+                    progress.update(failed=failed)
+        return {url: results[url] for url in urls}
+
+    def fetch_docs(self, name_to_urls):
+        """{名称: [url, ...]} -> {名称: [text, ...]}，所有 URL 一起并发获取"""
+        texts = self.fetch_all(url for urls in name_to_urls.values() for url in urls)
+        return {name: [texts[url] for url in urls] for name, urls in name_to_urls.items()}
@@ -0,0 +1,253 @@
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from WorkbookCache import cache_dir
+
+# 整条数据流水线：每个阶段声明命令、输入、输出。
+# 阶段之间的依赖由“某阶段的输出是另一阶段的输入”自动推出；
+# 输入文件（含脚本本身）的哈希与上次成功运行时相同且输出未被改动的阶段直接跳过。
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STATE_FILE = os.path.join(cache_dir, "pipeline_state.json")
+PIPELINE_VERSION = 1  # 判定逻辑变化时递增，使旧记录全部失效
+
+READ_MODULES = ['WorkbookCache.py']
+GROUPED_MODULES = ['GroupedWriter.py'] + READ_MODULES
+VOTE_MODULES = ['VoteData.py', 'VoteTensor.py']
+
+STAGES = {
+    'grouped_jp': {
+        'cmd': ['TouhouVote.py', '--region', 'jp'],
+        'inputs': ['TouhouVote.py', 'fun.xlsx', 'TouhouVote_jp.xlsx'] + GROUPED_MODULES,
+        'outputs': ['TouhouVote_jp_grouped.xlsx'],
+    },
+    'grouped_cn': {
+        'cmd': ['TouhouVote.py', '--region', 'cn'],
+        'inputs': ['TouhouVote.py', 'fun.xlsx', 'TouhouVote_cn.xlsx'] + GROUPED_MODULES,
+        'outputs': ['TouhouVote_cn_grouped.xlsx'],
+    },
+    'music_grouped_jp': {
+        'cmd': ['TouhouVoteMusic.py', '--region', 'jp'],
+        'inputs': ['TouhouVoteMusic.py', 'TouhouMusicInfo.xlsx', 'TouhouVote_music_jp.xlsx'] + GROUPED_MODULES,
+        'outputs': ['TouhouVote_music_jp_grouped.xlsx'],
+    },
+    'music_grouped_cn': {
+        'cmd': ['TouhouVoteMusic.py', '--region', 'cn'],
+        'inputs': ['TouhouVoteMusic.py', 'TouhouMusicInfo.xlsx', 'TouhouVote_music_cn.xlsx'] + GROUPED_MODULES,
+        'outputs': ['TouhouVote_music_cn_grouped.xlsx'],
+    },
+    'summarize': {
+        'cmd': ['SummarizeAllData.py'],
+        'inputs': ['SummarizeAllData.py',
+                   'TouhouVote_jp_grouped.xlsx', 'TouhouVote_jp.xlsx',
+                   'TouhouVote_cn_grouped.xlsx', 'TouhouVote_cn.xlsx',
+                   'TouhouVote_music_jp_grouped.xlsx', 'TouhouVote_music_jp.xlsx',
+                   'TouhouVote_music_cn_grouped.xlsx', 'TouhouVote_music_cn.xlsx',
+                   'TouhouVoteGenderInfo.xlsx', 'Character_tag.xlsx', 'SessionCatalog.py'] + READ_MODULES + VOTE_MODULES,
+        'outputs': ['touhou_vote.json'],
+    },
+    'work_cube': {
+        'cmd': ['WorkCube.py'],
+        'inputs': ['WorkCube.py', 'TouhouVote_jp_grouped.xlsx', 'TouhouVote_jp.xlsx',
+                   'TouhouVote_cn_grouped.xlsx', 'TouhouVote_cn.xlsx', 'SessionCatalog.py'] + READ_MODULES,
+        'outputs': ['touhou_vote_work_cube/index.json'],
+    },
+    'tag_stats': {
+        'cmd': ['data_statistic/ChracterTagStatistics.py'],
+        'inputs': ['data_statistic/ChracterTagStatistics.py', 'data_statistic/TagStatEngine.py',
+                   'data_statistic/TagRanks.py', 'touhou_vote.json'] + VOTE_MODULES,
+        'outputs': ['data_statistic/data_cn.json', 'data_statistic/data_jp.json',
+                    'data_statistic/tag_index_cn.json', 'data_statistic/tag_index_jp.json'],
+    },
+    'charts': {
+        'cmd': ['RenderCharts.py'],
+        'inputs': ['RenderCharts.py', 'TouhouVote_jp_grouped.xlsx', 'TouhouVote_cn_grouped.xlsx',
+                   'touhou_vote_work_cube/index.json', 'data_statistic/data_cn.json', 'data_statistic/data_jp.json',
+                   'data_statistic/tag_index_cn.json', 'data_statistic/tag_index_jp.json',
+                   'CharacterAnalyze_jp.py', 'CharacterAnalyze_cn.py', 'GroupAnalyze_jp.py', 'TopKConcentration.py',
+                   'difference.py', 'VoteAnalysis.py', 'data_statistic/TagRanks.py',
+                   'data_statistic/CharacterTagAnalyze_BySession.py', 'data_statistic/CharacterTagAnalyze_ByTag.py',
+                   'data_statistic/CharacterTagDifferent.py', 'SessionCatalog.py'] + READ_MODULES,
+        'outputs': ['charts/manifest.json'],
+    },
+}
+
+
+def dependencies(stages):
+    """{阶段: 它依赖的上游阶段集合}"""
+    producer = {out: name for name, stage in stages.items() for out in stage['outputs']}
+    return {name: {producer[i] for i in stage['inputs'] if i in producer and producer[i] != name}
+            for name, stage in stages.items()}
+
+
+def select_stages(targets):
+    """目标阶段及其全部上游；未指定目标时为所有阶段"""
+    if not targets:
+        return list(STAGES)
+    deps = dependencies(STAGES)
+    selected, todo = set(), list(targets)
+    while todo:
+        name = todo.pop()
+        if name not in selected:
+            selected.add(name)
+            todo.extend(deps[name])
+    return [name for name in STAGES if name in selected]
+
+
+class FileHasher:
+    """按 (mtime, size) 缓存文件的 sha256，未改动的大文件不必重复读取"""
+
+    def __init__(self, known):
+        self.known = known
+
+    def __call__(self, rel_path):
+        path = os.path.join(ROOT, rel_path)
+        if not os.path.exists(path):
+            return None
+        st = os.stat(path)
+        entry = self.known.get(rel_path)
+        if entry and entry['mtime_ns'] == st.st_mtime_ns and entry['size'] == st.st_size:
+            return entry['sha256']
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        self.known[rel_path] = {'mtime_ns': st.st_mtime_ns, 'size': st.st_size, 'sha256': h.hexdigest()}
+        return h.hexdigest()
+
+
+def stage_key(stage, hasher):
+    """命令和全部输入内容的哈希；有输入缺失时返回 None"""
+    h = hashlib.sha256(f"{PIPELINE_VERSION}\0{json.dumps(stage['cmd'])}".encode('utf-8'))
+    for rel_path in stage['inputs']:
+        digest = hasher(rel_path)
+        if digest is None:
+            return None
+        h.update(f"\0{rel_path}\0{digest}".encode('utf-8'))
+    return h.hexdigest()
+
+
+def is_up_to_date(name, stage, state, hasher):
+    record = state['stages'].get(name)
+    if not record or record['key'] != stage_key(stage, hasher):
+        return False
+    # 输出被删除或手动改过时也要重新运行
+    return all(hasher(out) == record['outputs'].get(out) for out in stage['outputs'])
+
+
+def read_state():
+    try:
+        with open(STATE_FILE, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {'files': {}, 'stages': {}}
+    if state.get('version') != PIPELINE_VERSION:
+        return {'files': {}, 'stages': {}}
+    return state
+
+
+def write_state(state):
+    os.makedirs(cache_dir, exist_ok=True)
+    state['version'] = PIPELINE_VERSION
+    tmp = f"{STATE_FILE}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, STATE_FILE)
+
+
+def run_stage(name, stage):
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable] + stage['cmd'], cwd=ROOT,
+                          stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    return proc.returncode, proc.stdout, time.perf_counter() - start
+
+
+def run_pipeline(targets=None, jobs=None, force=False, dry_run=False):
+    """
+    按依赖顺序运行阶段，互不依赖的阶段在线程池中并行（每个阶段是一个子进程）。
+    阶段是否跳过在其上游全部结束后再判断，此时上游的输出已是最新内容。
+    返回失败的阶段列表。
+    """
+    names = select_stages(targets)
+    deps = {name: d & set(names) for name, d in dependencies(STAGES).items() if name in names}
+    state = read_state()
+    hasher = FileHasher(state['files'])
+    jobs = jobs or min(len(names), os.cpu_count() or 1)
+
+    done, failed, running = set(), [], {}
+    would_run = set()  # dry-run 时记录需要运行的阶段，其下游也视为需要运行
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        while len(done) + len(failed) < len(names):
+            blocked = set(failed)
+            for name in names:
+                if name in done or name in failed or name in running.values():
+                    continue
+                if deps[name] & blocked:
+                    print(f"[{name}] 上游失败，不运行")
+                    failed.append(name)
+                    blocked.add(name)
+                    continue
+                if not deps[name] <= done:
+                    continue
+                if not force and not deps[name] & would_run and is_up_to_date(name, STAGES[name], state, hasher):
+                    print(f"[{name}] 输入未变化，跳过")
+                    done.add(name)
+                    continue
+                if dry_run:
+                    print(f"[{name}] 需要运行: python {' '.join(STAGES[name]['cmd'])}")
+                    would_run.add(name)
+                    done.add(name)
+                    continue
+                print(f"[{name}] 开始运行: python {' '.join(STAGES[name]['cmd'])}")
+                running[pool.submit(run_stage, name, STAGES[name])] = name
+            if not running:
+                continue
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                code, output, elapsed = future.result()
+                if output.strip():
+                    print('\n'.join(f"[{name}] {line}" for line in output.rstrip().splitlines()))
+                if code != 0:
+                    print(f"[{name}] 失败（返回码 {code}），用时 {elapsed:.1f}s")
+                    failed.append(name)
+                    state['stages'].pop(name, None)
+                    continue
+                stage = STAGES[name]
+                state['stages'][name] = {'key': stage_key(stage, hasher),
+                                         'outputs': {out: hasher(out) for out in stage['outputs']}}
+                write_state(state)
+                print(f"[{name}] 完成，用时 {elapsed:.1f}s")
+                done.add(name)
+
+    if not dry_run:
+        write_state(state)
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="按依赖顺序更新全部派生数据，输入未变化的阶段自动跳过")
+    parser.add_argument('targets', nargs='*', metavar='stage',
+                        help=f"只更新这些阶段（及其上游），可选：{', '.join(STAGES)}")
+    parser.add_argument('--jobs', '-j', type=int, default=None, help="同时运行的阶段数，默认为 CPU 核数")
+    parser.add_argument('--force', action='store_true', help="忽略哈希记录，全部重新运行")
+    parser.add_argument('--dry-run', action='store_true', help="只列出需要运行的阶段")
+    args = parser.parse_args()
+    unknown = [t for t in args.targets if t not in STAGES]
+    if unknown:
+        parser.error(f"未知阶段：{unknown}")
+
+    start = time.perf_counter()
+    failed = run_pipeline(args.targets, jobs=args.jobs, force=args.force, dry_run=args.dry_run)
+    print(f"流水线结束，用时 {time.perf_counter() - start:.1f}s" + (f"，失败阶段：{failed}" if failed else ""))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
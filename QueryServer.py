@@ -0,0 +1,258 @@
+import argparse
+import json
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import numpy as np
+
+from VoteData import VOTE_JSON, load_vote_data
+from data_statistic.TagRanks import load_tag_ranks
+
+# 本地查询服务：启动时读取一次 touhou_vote.json 和 tag 相对热度（data_statistic/data_*.json），
+# 建好内存索引后以 HTTP/JSON 回答查询，看板、notebook 不必各自解析工作簿。只用标准库（ThreadingHTTPServer）。
+#   GET /share?character=琪露诺&session=11_cn   角色在某届的票数、名次和得票占比（省略 session 时为所有届）
+#   GET /topk?session=20_jp&k=7,15              某届前 k 名的票数占比
+#   GET /tags?region=cn&session=11&top=15        某届相对热度最高的 tag
+#   GET /tag?name=萝莉                            某个 tag 在各届的相对热度
+#   GET /sessions、/health、/stats（请求延迟分位数和缓存命中情况）
+# 相同的查询由 LRU 缓存直接返回；测试中可用 start_server(port=0) 在本进程内启动一个实例。
+DEFAULT_PORT = 8765
+CACHE_SIZE = 4096
+LATENCY_WINDOW = 100000  # 延迟统计保留的最近请求数
+UNCACHED = {'/health', '/stats'}
+
+
+class QueryError(Exception):
+    """查询参数错误（status 为返回的 HTTP 状态码）"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class VoteIndex:
+    """touhou_vote.json 和 tag 相对热度的内存索引"""
+
+    def __init__(self, data, tag_ranks):
+        self.sessions = data['meta']['cn_sessions'] + data['meta']['jp_sessions']
+        self.totals = {key: idx.get('total_votes') for key, idx in data['indexes']['by_session'].items()}
+
+        # 角色：中文名和日文名都可以查询
+        self.characters = data['characters']
+        self.aliases = {}
+        for name, info in self.characters.items():
+            self.aliases[name] = name
+            if info.get('jp_name'):
+                self.aliases.setdefault(info['jp_name'], name)
+
+        # 每届按票数降序的累计票数，前 k 名占比只是取一个下标
+        votes = {key: [] for key in self.sessions}
+        for info in self.characters.values():
+            for key, stats in info['sessions'].items():
+                if key in votes and stats.get('v') is not None:
+                    votes[key].append(stats['v'])
+        self.cumulative = {key: np.cumsum(sorted(v, reverse=True)) for key, v in votes.items()}
+
+        # tag 相对热度：{大区: {届数: [(tag, 热度), ...]}} 及 {大区: {tag: {届数: 热度}}}
+        self.tag_ranks = tag_ranks
+        self.tag_heat = {}
+        for region, ranks in tag_ranks.items():
+            by_tag = self.tag_heat.setdefault(region, {})
+            for session, tag_list in ranks.items():
+                for tag, value in tag_list:
+                    by_tag.setdefault(tag, {})[session] = float(value)
+
+    @classmethod
+    def load(cls, json_path=VOTE_JSON):
+        return cls(load_vote_data(json_path), {region: load_tag_ranks(region) for region in ('cn', 'jp')})
+
+    def _session(self, key):
+        if key not in self.totals:
+            raise QueryError(f"未知的届次 '{key}'（格式如 11_cn、20_jp）", 404)
+        return key
+
+    def share(self, character, session=None):
+        name = self.aliases.get(character)
+        if name is None:
+            raise QueryError(f"未找到角色 '{character}'", 404)
+        keys = [self._session(session)] if session else [k for k in self.sessions if k in self.characters[name]['sessions']]
+        result = []
+        for key in keys:
+            stats = self.characters[name]['sessions'].get(key)
+            total = self.totals.get(key)
+            v = stats.get('v') if stats else None
+            result.append({'session': key, 'votes': v, 'rank': stats.get('r') if stats else None,
+                           'share': v / total if v is not None and total else None})
+        return {'character': name, 'jp_name': self.characters[name].get('jp_name'), 'sessions': result}
+
+    def topk(self, session, ks):
+        cum = self.cumulative[self._session(session)]
+        total = self.totals[session]
+        shares = {str(k): float(cum[min(k, len(cum)) - 1] / total) if len(cum) and total else None for k in ks}
+        return {'session': session, 'listed': len(cum), 'total_votes': total, 'share': shares}
+
+    def tags(self, region, session, top):
+        ranks = self.tag_ranks.get(region)
+        if ranks is None:
+            raise QueryError(f"未知的大区 '{region}'（cn 或 jp）")
+        if session not in ranks:
+            raise QueryError(f"{region} 没有第 {session} 届的 tag 数据", 404)
+        return {'region': region, 'session': session,
+                'tags': [[tag, float(value)] for tag, value in ranks[session][:top]]}
+
+    def tag(self, name):
+        if not any(name in by_tag for by_tag in self.tag_heat.values()):
+            raise QueryError(f"未找到 tag '{name}'", 404)
+        return {'tag': name, **{region: {str(s): v for s, v in sorted(by_tag.get(name, {}).items())}
+                                for region, by_tag in self.tag_heat.items()}}
+
+
+def _param(query, name, default=None, type=str):
+    if name not in query:
+        if default is None:
+            raise QueryError(f"缺少参数 '{name}'")
+        return default
+    try:
+        return type(query[name])
+    except ValueError:
+        raise QueryError(f"参数 '{name}' 的值无效：{query[name]}")
+
+
+def _positive_int(value):
+    n = int(value)
+    if n < 1:
+        raise ValueError(value)
+    return n
+
+
+def _int_list(value):
+    ks = [int(k) for k in value.split(',') if k]
+    if not ks or min(ks) < 1:
+        raise ValueError(value)
+    return ks
+
+
+class LatencyStats:
+    def __init__(self, window=LATENCY_WINDOW):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def record(self, seconds):
+        with self.lock:
+            self.samples.append(seconds)
+            self.count += 1
+
+    def summary(self):
+        with self.lock:
+            samples = np.array(self.samples) * 1000
+            count = self.count
+        if not len(samples):
+            return {'requests': count}
+        p50, p90, p99 = np.percentile(samples, [50, 90, 99])
+        return {'requests': count, 'window': len(samples), 'mean_ms': float(samples.mean()),
+                'p50_ms': float(p50), 'p90_ms': float(p90), 'p99_ms': float(p99), 'max_ms': float(samples.max())}
+
+
+class QueryServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, index, cache_size=CACHE_SIZE, verbose=False):
+        super().__init__(address, QueryHandler)
+        self.index = index
+        self.verbose = verbose
+        self.latency = LatencyStats()
+        self.cached_response = lru_cache(maxsize=cache_size)(self.respond)
+
+    def respond(self, path, params):
+        """(path, ((参数, 值), ...)) -> (状态码, JSON 字节串)"""
+        query = dict(params)
+        index = self.index
+        try:
+            if path == '/share':
+                body = index.share(_param(query, 'character'), query.get('session'))
+            elif path == '/topk':
+                body = index.topk(_param(query, 'session'), _param(query, 'k', '7', _int_list))
+            elif path == '/tags':
+                body = index.tags(_param(query, 'region'), _param(query, 'session', type=int),
+                                  _param(query, 'top', 15, _positive_int))
+            elif path == '/tag':
+                body = index.tag(_param(query, 'name'))
+            elif path == '/sessions':
+                body = {'sessions': index.sessions, 'total_votes': index.totals}
+            elif path == '/health':
+                body = {'status': 'ok', 'characters': len(index.characters), 'sessions': len(index.sessions)}
+            elif path == '/stats':
+                info = self.cached_response.cache_info()
+                body = {'latency': self.latency.summary(),
+                        'cache': {'hits': info.hits, 'misses': info.misses, 'size': info.currsize,
+                                  'maxsize': info.maxsize}}
+            else:
+                raise QueryError(f"未知的路径 '{path}'", 404)
+            status = 200
+        except QueryError as e:
+            status, body = e.status, {'error': str(e)}
+        return status, json.dumps(body, ensure_ascii=False).encode('utf-8')
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # 保持连接，压测时不必每个请求重新建立 TCP 连接
+    disable_nagle_algorithm = True  # 响应头和正文分两次写出，不关闭 Nagle 时长连接上每个请求要多等约 40ms
+
+    def do_GET(self):
+        t0 = time.perf_counter()
+        url = urlsplit(self.path)
+        params = tuple(sorted(parse_qsl(url.query)))
+        if url.path in UNCACHED:
+            status, body = self.server.respond(url.path, params)
+        else:
+            status, body = self.server.cached_response(url.path, params)
+        elapsed = time.perf_counter() - t0
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('X-Response-Time-ms', f"{elapsed * 1000:.3f}")
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.latency.record(elapsed)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def start_server(host='127.0.0.1', port=0, index=None, cache_size=CACHE_SIZE):
+    """在后台线程中启动服务（port=0 时自动选择空闲端口），返回 (server, base_url)；用 server.shutdown() 停止"""
+    server = QueryServer((host, port), index or VoteIndex.load(), cache_size)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="东方人气投票数据的本地查询服务")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--cache-size', type=int, default=CACHE_SIZE, help="LRU 响应缓存的条目数")
+    parser.add_argument('--json', default=VOTE_JSON, help="touhou_vote.json 的路径")
+    parser.add_argument('--verbose', action='store_true', help="打印每个请求")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    index = VoteIndex.load(args.json)
+    server = QueryServer((args.host, args.port), index, args.cache_size, args.verbose)
+    print(f"已载入 {len(index.characters)} 个角色、{len(index.sessions)} 届（用时 {time.perf_counter() - t0:.2f}s），"
+          f"监听 http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n" + json.dumps(server.latency.summary(), ensure_ascii=False))
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,313 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+
+import pandas as pd
+
+from SessionCatalog import extract_number
+from VoteAnalysis import safe_filename
+
+# 批量渲染图表：先在主进程里算好每张图的数据（图表规格 spec），再用进程池以 Agg 后端渲染为 PNG / SVG。
+# 每张图的“规格 + 数据”的哈希记录在输出目录的 manifest.json 中，哈希未变且文件存在的图直接跳过，
+# 新增一届后重新运行只会重画受影响的图。
+#   python RenderCharts.py                       # 全部图表，输出到 charts/
+#   python RenderCharts.py --kinds tag_trend -j 4 --format png svg
+OUTPUT_DIR = 'charts'
+MANIFEST = 'manifest.json'
+RENDER_VERSION = 1  # 绘图代码改变、需要全部重画时加一
+KINDS = ['character', 'group', 'topk', 'tag_session', 'tag_trend', 'tag_diff']
+TOPK = [7, 15, 30]
+TAG_TOP_N = 15
+TAG_DIFF_THRESHOLD = 0.001
+TAG_DIFF_TOP_N = 30
+DPI = 150
+
+
+def _series_data(series):
+    return {'index': [str(i) for i in series.index], 'values': [float(v) for v in series.to_numpy()]}
+
+
+# ---------- 图表规格：{'kind', 'name', 'args', 'data'}，name 为输出目录下不含扩展名的相对路径 ----------
+
+def character_specs():
+    import CharacterAnalyze_cn
+    import CharacterAnalyze_jp
+
+    for region, module in (('jp', CharacterAnalyze_jp), ('cn', CharacterAnalyze_cn)):
+        matrix = module.all_character_trends(*module.load_sessions())
+        for name, row in matrix.iterrows():
+            row = row.dropna()
+            if not row.empty:
+                yield {'kind': 'character', 'name': f"character_{region}/{safe_filename(name)}",
+                       'args': {'name': name}, 'data': _series_data(row)}
+
+
+def group_specs():
+    from GroupAnalyze_jp import group_percentages
+    from WorkCube import load_cube
+
+    cube = load_cube()
+    for region in ('jp', 'cn'):
+        df = group_percentages(region, cube)
+        yield {'kind': 'group', 'name': f"group/{region}", 'args': {},
+               'data': {'index': [float(i) for i in df.index], 'columns': list(df.columns),
+                        'values': [[None if pd.isna(v) else float(v) for v in row] for row in df.to_numpy()]}}
+
+
+def topk_specs():
+    from TopKConcentration import load_region
+
+    for region in ('jp', 'cn'):
+        curves, indices = load_region(region)
+        for k in TOPK:
+            yield {'kind': 'topk', 'name': f"topk/{region}_top{k}", 'args': {'k': k},
+                   'data': _series_data(curves[min(k, curves.columns.max())])}
+
+
+def tag_session_specs():
+    from data_statistic.TagRanks import load_tag_ranks, session_top_tags
+
+    for region in ('cn', 'jp'):
+        for session in sorted(load_tag_ranks(region)):
+            top = session_top_tags(region, session, TAG_TOP_N)
+            yield {'kind': 'tag_session', 'name': f"tag_session/{region}_{session}",
+                   'args': {'region': region, 'session': session, 'top_n': TAG_TOP_N},
+                   'data': [[tag, float(v)] for tag, v in top.itertuples(index=False)]}
+
+
+def tag_trend_specs():
+    from data_statistic.TagRanks import load_tag_ranks, tag_trend
+
+    tags = sorted({tag for region in ('cn', 'jp') for tag_list in load_tag_ranks(region).values()
+                   for tag, _ in tag_list})
+    for tag in tags:
+        yield {'kind': 'tag_trend', 'name': f"tag_trend/{safe_filename(tag)}", 'args': {'tag': tag},
+               'data': {region: _series_data(tag_trend(region, tag)) for region in ('cn', 'jp')}}
+
+
+def tag_diff_spec(cn_session, jp_session, diff, threshold=TAG_DIFF_THRESHOLD, top_n_tags=TAG_DIFF_TOP_N,
+                  significant=False):
+    """diff 为 DataFrame（tag, cn, jp, diff），即 TagRanks.tag_difference() 的结果"""
+    args = {'cn_session': int(cn_session), 'jp_session': int(jp_session),
+            'threshold': threshold, 'top_n_tags': top_n_tags}
+    if significant:
+        args['significant'] = True
+    return {'kind': 'tag_diff', 'name': f"tag_diff/cn{cn_session}_jp{jp_session}", 'args': args,
+            'data': diff[['tag', 'cn', 'jp', 'diff']].values.tolist()}
+
+
+def tag_diff_specs():
+    from difference import aligned_pairs
+    from data_statistic.TagRanks import tag_difference
+
+    for cn_sheet, jp_sheet in aligned_pairs():
+        cn_session, jp_session = int(extract_number(cn_sheet)), int(extract_number(jp_sheet))
+        yield tag_diff_spec(cn_session, jp_session,
+                            tag_difference(cn_session, jp_session, TAG_DIFF_THRESHOLD, TAG_DIFF_TOP_N))
+
+
+SPEC_BUILDERS = {
+    'character': character_specs,
+    'group': group_specs,
+    'topk': topk_specs,
+    'tag_session': tag_session_specs,
+    'tag_trend': tag_trend_specs,
+    'tag_diff': tag_diff_specs,
+}
+
+
+def spec_hash(spec):
+    payload = json.dumps([RENDER_VERSION, spec], ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+# ---------- 渲染（在子进程中运行）：沿用各脚本的绘图函数，只是换成 Agg 后端并保存为文件 ----------
+
+def _init_worker():
+    """进程池子进程的初始化（ProcessPoolExecutor 的 initializer），整个子进程使用 Agg 后端、忽略警告"""
+    import matplotlib
+    matplotlib.use('Agg')
+    warnings.filterwarnings('ignore')  # 缺少中文字体的字形警告、Agg 下 plt.show() 的提示
+    logging.getLogger('matplotlib.font_manager').setLevel(logging.ERROR)
+
+
+@contextmanager
+def _quiet_in_process():
+    """在调用者进程中渲染时使用：只在渲染期间忽略警告、让 plt.show() 不弹出窗口，不改变后端和全局警告设置"""
+    import matplotlib.pyplot as plt
+
+    show = plt.show
+    font_logger = logging.getLogger('matplotlib.font_manager')
+    level = font_logger.level
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        plt.show = lambda *args, **kwargs: None
+        font_logger.setLevel(logging.ERROR)
+        try:
+            yield
+        finally:
+            plt.show = show
+            font_logger.setLevel(level)
+
+
+def _series(data):
+    return pd.Series(data['values'], index=data['index'])
+
+
+def _render_character(spec, path):
+    from CharacterAnalyze_jp import plot_character_trend
+    s = _series(spec['data'])
+    plot_character_trend(pd.DataFrame({"Sheet名称": s.index, "百分比": s.values}), spec['args']['name'])
+
+
+def _render_group(spec, path):
+    from GroupAnalyze_jp import plot_group_percentages
+    data = spec['data']
+    df = pd.DataFrame(data['values'], index=data['index'], columns=data['columns'], dtype=float)
+    plot_group_percentages(df, path, DPI)
+    return True
+
+
+def _render_topk(spec, path):
+    from TopKConcentration import plot_topk_trend
+    k = spec['args']['k']
+    plot_topk_trend(pd.DataFrame({k: _series(spec['data'])}), k, path, DPI)
+    return True
+
+
+def _render_tag_session(spec, path):
+    from data_statistic.CharacterTagAnalyze_BySession import plot_session_top_tags
+    args = spec['args']
+    plot_session_top_tags(pd.DataFrame(spec['data'], columns=['tag', '相对热度']),
+                          args['region'], args['session'], args['top_n'])
+
+
+def _render_tag_trend(spec, path):
+    from data_statistic.CharacterTagAnalyze_ByTag import plot_tag_trend
+    cn, jp = (_series(spec['data'][region]) for region in ('cn', 'jp'))
+    cn.index, jp.index = cn.index.astype(int), jp.index.astype(int)
+    plot_tag_trend(spec['args']['tag'], cn, jp)
+
+
+def _render_tag_diff(spec, path):
+    from data_statistic.CharacterTagDifferent import plot_tag_difference
+    args = spec['args']
+    plot_tag_difference(pd.DataFrame(spec['data'], columns=['tag', 'cn', 'jp', 'diff']),
+                        args['cn_session'], args['jp_session'], args['threshold'], args['top_n_tags'])
+
+
+RENDERERS = {
+    'character': _render_character,
+    'group': _render_group,
+    'topk': _render_topk,
+    'tag_session': _render_tag_session,
+    'tag_trend': _render_tag_trend,
+    'tag_diff': _render_tag_diff,
+}
+
+
+def render(spec, paths):
+    """
+    按 spec 画图并保存到 paths（同一张图的各个格式），返回 spec 的 name；没有图可画时不写文件。
+    只关闭本次新建的图，在调用者进程中渲染时不影响其已打开的图
+    """
+    import matplotlib.pyplot as plt
+
+    for path in paths:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        before = set(plt.get_fignums())
+        try:
+            saved = RENDERERS[spec['kind']](spec, path)
+            if not saved and set(plt.get_fignums()) - before:
+                plt.savefig(path, dpi=DPI, bbox_inches='tight')
+        finally:
+            for num in set(plt.get_fignums()) - before:
+                plt.close(num)
+    return spec['name']
+
+
+# ---------- 调度 ----------
+
+def _read_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _write_manifest(out_dir, manifest):
+    path = os.path.join(out_dir, MANIFEST)
+    with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(f"{path}.tmp", path)
+
+
+def render_all(kinds=KINDS, out_dir=OUTPUT_DIR, formats=('png',), jobs=None, force=False):
+    """渲染 kinds 中的全部图表，返回 (渲染数, 跳过数)"""
+    specs = (spec for kind in kinds for spec in SPEC_BUILDERS[kind]())
+    return render_specs(specs, out_dir, formats, jobs, force)
+
+
+def render_specs(specs, out_dir=OUTPUT_DIR, formats=('png',), jobs=None, force=False):
+    """渲染给定的图表规格（kind 须在 RENDERERS 中），哈希未变且文件存在的跳过，返回 (渲染数, 跳过数)"""
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = _read_manifest(out_dir)
+    todo, skipped = [], 0
+    for spec in specs:
+        digest = spec_hash(spec)
+        paths = [os.path.join(out_dir, f"{spec['name']}.{fmt}") for fmt in formats]
+        key = {fmt: f"{spec['name']}.{fmt}" for fmt in formats}
+        if not force and all(manifest.get(key[fmt]) == digest and os.path.exists(p)
+                             for fmt, p in zip(formats, paths)):
+            skipped += 1
+            continue
+        todo.append((spec, paths, digest))
+
+    def done(spec, digest):
+        for fmt in formats:
+            manifest[f"{spec['name']}.{fmt}"] = digest
+
+    jobs = jobs or os.cpu_count() or 1
+    try:
+        if jobs == 1 or len(todo) <= 1:
+            with _quiet_in_process():
+                for spec, paths, digest in todo:
+                    render(spec, paths)
+                    done(spec, digest)
+        else:
+            with ProcessPoolExecutor(jobs, initializer=_init_worker) as pool:
+                futures = {pool.submit(render, spec, paths): (spec, digest) for spec, paths, digest in todo}
+                for future in as_completed(futures):
+                    future.result()
+                    done(*futures[future])
+    finally:
+        _write_manifest(out_dir, manifest)  # 中途出错时已完成的图也会记录下来
+    return len(todo), skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="用进程池批量渲染图表（Agg 后端），跳过数据未变化的图")
+    parser.add_argument('--kinds', nargs='+', default=KINDS, metavar='KIND', help=f"图表种类，可选：{', '.join(KINDS)}")
+    parser.add_argument('--out', default=OUTPUT_DIR, help="输出目录")
+    parser.add_argument('--format', nargs='+', default=['png'], choices=['png', 'svg'], dest='formats')
+    parser.add_argument('-j', '--jobs', type=int, help="进程数（默认为 CPU 核数）")
+    parser.add_argument('--force', action='store_true', help="忽略记录的哈希，全部重画")
+    args = parser.parse_args()
+    unknown = [k for k in args.kinds if k not in KINDS]
+    if unknown:
+        parser.error(f"未知的图表种类: {', '.join(unknown)}（可选：{', '.join(KINDS)}）")
+
+    t0 = time.perf_counter()
+    rendered, skipped = render_all(args.kinds, args.out, args.formats, args.jobs, args.force)
+    print(f"渲染 {rendered} 张，跳过 {skipped} 张（数据未变化），用时 {time.perf_counter() - t0:.1f}s，输出目录 {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,217 @@
+import hashlib
+import json
+import os
+import re
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from WorkbookCache import cache_dir, list_sheets, open_workbook, store_is_current, store_path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# 届次目录：只读取工作簿的元数据（Sheet 名）列出各届，按届数排序，并解析大区和括号里的追加作品，
+# 例如 '4(th7.5、th09)' -> 第 4 届，追加作品 ['th7.5', 'th09']。
+# 各届原始票数合计缓存在 cache_workbook/session_catalog.json 中（与列式缓存一样不纳入版本管理），以工作簿内容的哈希校验，
+# 需要总票数的脚本不必再解析原始工作簿；工作簿变化后第一次读取时自动重新统计。
+# 工作簿的修改时间和大小与记录相同时不重新计算哈希；写入目录时持有文件锁（并行的流水线阶段会同时写），
+# 在锁内重新读取、合并后经临时文件替换，不会丢掉其他进程写入的条目。
+ROOT = os.path.dirname(os.path.abspath(__file__))
+CATALOG_FILE = os.path.join(ROOT, cache_dir, 'session_catalog.json')
+LOCK_FILE = CATALOG_FILE + '.lock'
+CATALOG_VERSION = 1
+
+# 原始投票工作簿：(大区, 类别, 票数列)
+RAW_WORKBOOKS = {
+    'TouhouVote_jp.xlsx': ('jp', 'character', '票数'),
+    'TouhouVote_cn.xlsx': ('cn', 'character', '票数'),
+    'TouhouVote_music_jp.xlsx': ('jp', 'music', '得票数'),
+    'TouhouVote_music_cn.xlsx': ('cn', 'music', '票数'),
+}
+
+_SHEET_RE = re.compile(r'^(\d+)')
+_EXTRA_RE = re.compile(r'\(([^)]+)\)')
+
+
+def extract_number(sheet):
+    """排序用：Sheet 名开头的数字，没有数字（或为空）时为 inf，排在最后"""
+    if not isinstance(sheet, str):
+        return float('inf')
+    m = _SHEET_RE.match(sheet)
+    return float(m.group(1)) if m else float('inf')
+
+
+def extra_works(sheet):
+    """'4(th7.5、th09)' -> ['th7.5', 'th09']"""
+    m = _EXTRA_RE.search(sheet)
+    return m.group(1).split('、') if m else []
+
+
+def parse_session(sheet, region):
+    """'3(th08)', 'jp' -> '3_jp'；没有数字时用整个 Sheet 名"""
+    m = _SHEET_RE.match(sheet)
+    return f"{m.group(1)}_{region}" if m else f"{sheet}_{region}"
+
+
+def sort_sheets(names):
+    """按届数排序 Sheet 名"""
+    return sorted(names, key=extract_number)
+
+
+def region_of(path):
+    """从文件名判断大区（TouhouVote_jp_grouped.xlsx -> 'jp'），无法判断时为 None"""
+    m = re.search(r'_(jp|cn)(?:_grouped)?\.(?:xlsx|parquet)$', os.path.basename(path))
+    return m.group(1) if m else None
+
+
+def sessions(path, region=None):
+    """
+    列出工作簿中的各届（按届数排序），只读取 Sheet 名：
+    [{'sheet': '4(th7.5、th09)', 'number': 4, 'region': 'jp', 'key': '4_jp', 'extra_works': [...]}, ...]
+    """
+    region = region or region_of(path)
+    out = []
+    for sheet in sort_sheets(list_sheets(path)):
+        number = extract_number(sheet)
+        out.append({'sheet': sheet, 'number': int(number) if number != float('inf') else None,
+                    'region': region, 'key': parse_session(sheet, region), 'extra_works': extra_works(sheet)})
+    return out
+
+
+def sheet_total(values):
+    """一列票数的合计：非数字视为缺失，小数截断为整数（与 SummarizeAllData.py 的统计方式一致）"""
+    total = np.trunc(pd.to_numeric(values, errors='coerce')).sum()
+    return int(total) if float(total).is_integer() else float(total)
+
+
+def _catalog_key(path):
+    return os.path.relpath(os.path.abspath(path), ROOT).replace(os.sep, '/')
+
+
+def _source_stat(path):
+    """(哈希的对象文件, 其状态)；Parquet 优先输出以其 manifest 为准（见 WorkbookCache.write_store）"""
+    target = os.path.join(store_path(path), 'manifest.json') if store_is_current(path) else path
+    st = os.stat(target)
+    return target, {'file': _catalog_key(target), 'mtime_ns': st.st_mtime_ns, 'size': st.st_size}
+
+
+def _content_hash(path, entry=None):
+    """(内容哈希, 文件状态)；文件、修改时间和大小都与 entry 记录的相同时直接沿用记录的哈希"""
+    target, stat = _source_stat(path)
+    if entry and entry.get('stat') == stat:
+        return entry['sha256'], stat
+    h = hashlib.sha256()
+    with open(target, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest(), stat
+
+
+@contextmanager
+def _catalog_lock():
+    """跨进程互斥地读-改-写目录文件"""
+    os.makedirs(os.path.dirname(LOCK_FILE), exist_ok=True)
+    with open(LOCK_FILE, 'a+b') as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)  # 最多等待约 10 秒，超时后继续等
+                    break
+                except OSError:
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _read_catalog():
+    try:
+        with open(CATALOG_FILE, 'r', encoding='utf-8') as f:
+            catalog = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {'version': CATALOG_VERSION, 'workbooks': {}}
+    if catalog.get('version') != CATALOG_VERSION:
+        return {'version': CATALOG_VERSION, 'workbooks': {}}
+    return catalog
+
+
+def _write_catalog(catalog):
+    """先写临时文件再替换（调用者持有 _catalog_lock()）"""
+    os.makedirs(os.path.dirname(CATALOG_FILE), exist_ok=True)
+    tmp = f"{CATALOG_FILE}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(catalog, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, CATALOG_FILE)
+
+
+def _update_entry(path, digest, stat, column=None, totals=None):
+    """在锁内重新读取目录，更新该工作簿的条目（哈希变化时丢弃旧的合计）后写回"""
+    key = _catalog_key(path)
+    with _catalog_lock():
+        catalog = _read_catalog()
+        entry = catalog['workbooks'].get(key)
+        if not entry or entry['sha256'] != digest:
+            entry = {'sha256': digest, 'sessions': sessions(path), 'totals': {}}
+        entry['stat'] = stat
+        if column is not None:
+            entry['totals'][column] = totals
+        catalog['workbooks'][key] = entry
+        _write_catalog(catalog)
+
+
+def vote_column(path):
+    return RAW_WORKBOOKS.get(os.path.basename(path), (None, None, '票数'))[2]
+
+
+def session_totals(path, column=None):
+    """
+    各 Sheet 的票数合计 {Sheet名: 合计}（工作簿中的顺序），Sheet 缺少该列时为 None。
+    column 默认为 RAW_WORKBOOKS 中登记的票数列。结果缓存在 cache_workbook/session_catalog.json，
+    工作簿内容未变时不解析工作簿。
+    """
+    column = column or vote_column(path)
+    entry = _read_catalog()['workbooks'].get(_catalog_key(path))
+    digest, stat = _content_hash(path, entry)
+    if entry and entry['sha256'] == digest and column in entry['totals']:
+        if entry.get('stat') != stat:  # 内容未变但修改时间变了（如 git checkout），记录新的状态以便下次跳过哈希
+            _update_entry(path, digest, stat)
+        return entry['totals'][column]
+
+    # 解析在锁外进行，只有写回目录时才持有锁
+    totals = {}
+    for sheet, df in open_workbook(path).items():
+        df.columns = df.columns.str.strip()
+        totals[sheet] = sheet_total(df[column]) if column in df.columns else None
+    _update_entry(path, digest, stat, column, totals)
+    return totals
+
+
+def session_total(path, sheet, column=None):
+    """单个 Sheet 的票数合计；Sheet 不存在时抛出 ValueError（与读取 Sheet 时一致）"""
+    totals = session_totals(path, column)
+    if sheet not in totals:
+        raise ValueError(f"Worksheet named '{sheet}' not found")
+    return totals[sheet]
+
+
+if __name__ == '__main__':
+    # 刷新全部原始工作簿的目录和票数合计，并列出各届
+    for path, (region, kind, column) in RAW_WORKBOOKS.items():
+        totals = session_totals(path, column)
+        print(f"{path}（{region}，{kind}）：")
+        for s in sessions(path, region):
+            extra = f"  追加作品 {'、'.join(s['extra_works'])}" if s['extra_works'] else ''
+            print(f"  {s['key']:>6}  总票数 {totals[s['sheet']]}{extra}")
@@ -1,6 +1,13 @@
+import argparse
+import os
 import pandas as pd
-import json
-import re
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from SessionCatalog import extra_works, parse_session, session_totals as catalog_totals
+from VoteData import save_vote_data
+from VoteTensor import build_tensor, save_tensor
+from WorkbookCache import load_workbook
 
 # File paths
 jp_grouped = 'TouhouVote_jp_grouped.xlsx'
@@ -13,238 +20,283 @@ music_cn_grouped = 'TouhouVote_music_cn_grouped.xlsx'
 music_cn_full = 'TouhouVote_music_cn.xlsx'
 gender_file = 'TouhouVoteGenderInfo.xlsx'
 tag_file = 'Character_tag.xlsx'
+touhou_json = 'touhou_vote.json'
 
-# Initialize data structure
-data = {
-    "meta": {"missing_gender": ["3_jp", "4_jp"], "jp_sessions": [], "cn_sessions": []},
-    "characters": {},
-    "songs": {},
-    "gender": {},
-    "indexes": {"by_work": {}, "by_session": {}}
+# Workbooks read by build_data(), keyed by their role
+BOOKS = {
+    'jp_grouped': jp_grouped, 'cn_grouped': cn_grouped,
+    'music_jp_grouped': music_jp_grouped, 'music_cn_grouped': music_cn_grouped,
+    'gender': gender_file, 'tags': tag_file,
 }
 
-# Helpers
-def parse_session(sheet_name, suffix):
-    m = re.match(r"^(\d+)", sheet_name)
-    return f"{m.group(1)}_{suffix}" if m else sheet_name + f"_{suffix}"
-
-def to_int(val):
-    try:
-        if pd.isna(val): return None
-        return int(val)
-    except:
-        return None
-
-def to_float(val):
-    try:
-        if pd.isna(val): return None
-        return float(val)
-    except:
-        return None
+# The raw workbooks are only needed for per-sheet vote totals, which come from the session
+# catalog (cache_workbook/session_catalog.json) instead of parsing the workbooks: role -> (file, vote column)
+RAW_TOTALS = {
+    'jp_full': (jp_full, '票数'), 'cn_full': (cn_full, '票数'),
+    'music_jp_full': (music_jp_full, '得票数'), 'music_cn_full': (music_cn_full, '票数'),
+}
 
+# Short stat key -> (source column, type). Key order is the JSON field order.
+JP_CHAR_STATS = {
+    'r': ('名次', int), 'prev_r': ('上回名次', int), 'prev2_r': ('上上回名次', int),
+    'v': ('票数', int), 'bnum': ('本名票数', int), 'comments': ('评论数', int),
+    'support': ('应援作品数', int),
+}
+CN_CHAR_STATS = {
+    'r': ('名次', int), 'v': ('票数', int), 'bnum': ('本命数', int),
+    'brate': ('本命率', float), 'bw': ('本命加权', float), 'v_pct': ('票数占比', float),
+    'b_pct': ('本命占比', float), 'male_pct': ('男性比例', float), 'female_pct': ('女性比例', float),
+}
+JP_SONG_STATS = {
+    'r': ('排名', int), 'prev_r': ('上回名次', int), 'prev2_r': ('上上回名次', int),
+    'v': ('得票数', int), 'main_v': ('本名票数', int), 'comments': ('评论数', int),
+}
+CN_SONG_STATS = {
+    'r': ('名次', int), 'v': ('票数', int), 'bnum': ('本命数', int),
+    'brate': ('本命率', float), 'bw': ('本命加权', float), 'v_pct': ('票数占比', float),
+    'b_pct': ('本命占比', float), 'male': ('男性', int), 'male_pct': ('男性比', float),
+    'male_total_pct': ('占总数', float), 'female': ('女性', int), 'female_pct': ('女性比', float),
+    'female_total_pct': ('占总数.1', float), 'bias_orig': ('偏原作', int), 'bias_2nd': ('偏二次', int),
+    'no_bias': ('无偏爱', int), 'no_interest': ('都没兴趣', int),
+}
+
+# Helpers
 # Clean string values
 def clean_str(val):
     if val is None or (isinstance(val, float) and pd.isna(val)): return None
     if isinstance(val, float) and val.is_integer(): return str(int(val))
     return str(val).strip()
 
-# --- JP Character Sessions ---
-wb = pd.ExcelFile(jp_grouped)
-for sheet in wb.sheet_names:
-    sess = parse_session(sheet, 'jp')
-    data['meta']['jp_sessions'].append(sess)
-    df = wb.parse(sheet)
+def to_objects(col, kind):
+    """Coerce a column to a list of Python int/float values, None where missing or non-numeric"""
+    num = pd.to_numeric(col, errors='coerce')
+    mask = num.isna().to_numpy()
+    num = num.to_numpy(dtype=float, na_value=0.0)
+    out = np.empty(len(num), dtype=object)
+    out[:] = np.trunc(num).astype(np.int64).tolist() if kind is int else num.tolist()
+    out[mask] = None
+    return out
+
+def str_or_none(col):
+    """Stripped strings, None where missing"""
+    out = col.astype(str).str.strip().to_numpy(dtype=object)
+    out[col.isna().to_numpy()] = None
+    return out
+
+def strip_columns(df):
+    df = df.copy(deep=False)
     df.columns = df.columns.str.strip()
-    data['indexes']['by_session'][sess] = {'chars': [], 'songs': [], 'extra_works': []}
-    for _, r in df.iterrows():
-        tr = r.get('译名')
-        if pd.isna(tr): continue
-        tr = str(tr).strip()
-        jp_name = None if pd.isna(r.get('日文名')) else str(r.get('日文名')).strip()
-        cid = re.sub(r"\W+", "", tr).lower()
-        fa = clean_str(r.get('首次出现作品'))
-        if tr not in data['characters']:
-            data['characters'][tr] = {'id': cid, 'jp_name': jp_name, 'first_appear': fa, 'keywords': [], 'sessions': {}}
-            if fa: data['indexes']['by_work'].setdefault(fa, []).append(tr)
-        stats = {
-            'r': to_int(r.get('名次')),
-            'prev_r': to_int(r.get('上回名次')),
-            'prev2_r': to_int(r.get('上上回名次')),
-            'v': to_int(r.get('票数')),
-            'bnum': to_int(r.get('本名票数')),
-            'comments': to_int(r.get('评论数')),
-            'support': to_int(r.get('应援作品数'))
-        }
-        data['characters'][tr]['sessions'][sess] = stats
-        data['indexes']['by_session'][sess]['chars'].append(tr)
-    extra = re.findall(r"\(([^)]+)\)", sheet)
-    if extra: data['indexes']['by_session'][sess]['extra_works'] = extra[0].split('、')
-
-# --- JP Total Votes ---
-wb = pd.ExcelFile(jp_full)
-for sheet in wb.sheet_names:
-    sess = parse_session(sheet, 'jp')
-    if sess not in data['meta']['jp_sessions']: continue
-    df = wb.parse(sheet); df.columns = df.columns.str.strip()
-    tot = df['票数'].apply(to_int).dropna().sum()
-    data['indexes']['by_session'][sess]['total_votes'] = int(tot) if tot is not None else None
-
-# --- CN Character Sessions ---
-wb = pd.ExcelFile(cn_grouped)
-for sheet in wb.sheet_names:
-    sess = parse_session(sheet, 'cn')
-    data['meta']['cn_sessions'].append(sess)
-    df = wb.parse(sheet); df.columns = df.columns.str.strip()
-    data['indexes']['by_session'][sess] = {'chars': [], 'songs': []}
-    for _, r in df.iterrows():
-        tr = r.get('译名');
-        if pd.isna(tr): continue
-        tr = str(tr).strip()
-        if tr not in data['characters']:
-            fa = clean_str(r.get('首次出现作品'))
-            data['characters'][tr] = {'id': re.sub(r"\W+", "", tr).lower(), 'jp_name': None, 'first_appear': fa, 'keywords': [], 'sessions': {}}
-            if fa: data['indexes']['by_work'].setdefault(fa, []).append(tr)
-        stats = {
-            'r': to_int(r.get('名次')),
-            'v': to_int(r.get('票数')),
-            'bnum': to_int(r.get('本命数')),
-            'brate': to_float(r.get('本命率')),
-            'bw': to_float(r.get('本命加权')),
-            'v_pct': to_float(r.get('票数占比')),
-            'b_pct': to_float(r.get('本命占比')),
-            'male_pct': to_float(r.get('男性比例')),
-            'female_pct': to_float(r.get('女性比例'))
-        }
-        data['characters'][tr]['sessions'][sess] = stats
-        data['indexes']['by_session'][sess]['chars'].append(tr)
-
-# --- CN Total Votes ---
-wb = pd.ExcelFile(cn_full)
-for sheet in wb.sheet_names:
-    sess = parse_session(sheet, 'cn')
-    if sess not in data['meta']['cn_sessions']: continue
-    df = wb.parse(sheet); df.columns = df.columns.str.strip()
-    tot = df['票数'].apply(to_int).dropna().sum()
-    data['indexes']['by_session'][sess]['total_votes'] = int(tot) if tot is not None else None
-
-# --- JP Music Sessions ---
-wb = pd.ExcelFile(music_jp_grouped)
-for sheet in wb.sheet_names:
-    sess = parse_session(sheet, 'jp')
-    idx = data['indexes']['by_session'].setdefault(sess, {'chars': [], 'songs': []})
-    df = wb.parse(sheet); df.columns = df.columns.str.strip()
-    for _, r in df.iterrows():
-        st = r.get('译名');
-        if pd.isna(st): continue
-        st = str(st).strip(); song_jp = None if pd.isna(r.get('曲目')) else str(r.get('曲目')).strip()
-        chars = [] if pd.isna(r.get('所属角色')) else [c.strip() for c in str(r.get('所属角色')).split('|')]
-        if st not in data['songs']:
-            data['songs'][st] = {'t': song_jp, 'tr_t': st, 'chars': [], 'sessions': {}}
-        for c in chars:
-            if c not in data['songs'][st]['chars']: data['songs'][st]['chars'].append(c)
-        stats = {
-            'r': to_int(r.get('排名')),
-            'prev_r': to_int(r.get('上回名次')),
-            'prev2_r': to_int(r.get('上上回名次')),
-            'v': to_int(r.get('得票数')),
-            'main_v': to_int(r.get('本名票数')),
-            'comments': to_int(r.get('评论数'))
-        }
-        data['songs'][st]['sessions'][sess] = stats
-        idx['songs'].append(st)
-
-# --- JP Music Total Votes ---
-wb = pd.ExcelFile(music_jp_full)
-for sheet in wb.sheet_names:
-    sess = parse_session(sheet, 'jp')
-    if sess not in data['indexes']['by_session']: continue
-    df = wb.parse(sheet); df.columns = df.columns.str.strip()
-    tot = df['得票数'].apply(to_int).dropna().sum()
-    data['indexes']['by_session'][sess]['total_song_votes'] = int(tot) if tot is not None else None
-
-# --- CN Music Sessions ---
-wb = pd.ExcelFile(music_cn_grouped)
-for sheet in wb.sheet_names:
-    sess = parse_session(sheet, 'cn')
-    idx = data['indexes']['by_session'].setdefault(sess, {'chars': [], 'songs': []})
-    df = wb.parse(sheet); df.columns = df.columns.str.strip()
-    for _, r in df.iterrows():
-        st = r.get('译名');
-        if pd.isna(st): continue
-        st = str(st).strip()
-        if st not in data['songs']: data['songs'][st] = {'t': None, 'tr_t': st, 'chars': [], 'sessions': {}}
-        stats = {
-            'r': to_int(r.get('名次')),
-            'v': to_int(r.get('票数')),
-            'bnum': to_int(r.get('本命数')),
-            'brate': to_float(r.get('本命率')),
-            'bw': to_float(r.get('本命加权')),
-            'v_pct': to_float(r.get('票数占比')),
-            'b_pct': to_float(r.get('本命占比')),
-            'male': to_int(r.get('男性')),
-            'male_pct': to_float(r.get('男性比')),
-            'male_total_pct': to_float(r.get('占总数')),
-            'female': to_int(r.get('女性')),
-            'female_pct': to_float(r.get('女性比')),
-            'female_total_pct': to_float(r.get('占总数.1')),
-            'bias_orig': to_int(r.get('偏原作')),
-            'bias_2nd': to_int(r.get('偏二次')),
-            'no_bias': to_int(r.get('无偏爱')),
-            'no_interest': to_int(r.get('都没兴趣'))
-        }
-        roles = [] if pd.isna(r.get('所属角色')) else [c.strip() for c in str(r.get('所属角色')).split('|')]
-        for c in roles:
-            if c not in data['songs'][st]['chars']: data['songs'][st]['chars'].append(c)
-        data['songs'][st]['sessions'][sess] = stats
-        idx['songs'].append(st)
-
-# --- CN Music Total Votes ---
-wb = pd.ExcelFile(music_cn_full)
-for sheet in wb.sheet_names:
-    sess = parse_session(sheet, 'cn')
-    if sess not in data['indexes']['by_session']: continue
-    df = wb.parse(sheet); df.columns = df.columns.str.strip()
-    tot = df['票数'].apply(to_int).dropna().sum()
-    data['indexes']['by_session'][sess]['total_song_votes'] = int(tot) if tot is not None else None
-
-# --- Process Gender Info ---
-wb = pd.ExcelFile(gender_file)
-for sheet in wb.sheet_names:
-    sess = parse_session(sheet, 'jp')
-    df = wb.parse(sheet); df.columns = df.columns.str.strip()
-    m_v = df[df['性别'] == '男性']['票数'].apply(to_int).sum(min_count=0)
-    f_v = df[df['性别'] == '女性']['票数'].apply(to_int).sum(min_count=0)
-    o_v = df[df['性别'] == '其他']['票数'].apply(to_int).sum(min_count=0)
-    data['gender'][sess] = {
-        'm': int(m_v) if pd.notna(m_v) and m_v > 0 else None,
-        'f': int(f_v) if pd.notna(f_v) and f_v > 0 else None,
-        'o': int(o_v) if pd.notna(o_v) and o_v > 0 else None
+    return df
+
+def char_id(names):
+    return names.str.replace(r"\W+", "", regex=True).str.lower()
+
+def stack_sheets(sheets, suffix, name_col, stats, extra_cols=()):
+    """
+    Concatenate every session sheet into one frame: 'sess', 'name', the short stat keys
+    (coerced to float, NaN where missing or non-numeric) and the requested extra columns.
+    Rows without a name are dropped.
+    """
+    parts = [strip_columns(df) for df in sheets.values()]
+    if not parts:
+        return pd.DataFrame(columns=['sess', 'name', *stats, *extra_cols])
+    raw = pd.concat(parts, ignore_index=True)
+    sess = np.repeat([parse_session(sheet, suffix) for sheet in sheets], [len(df) for df in parts])
+    out = {'sess': sess, 'name': raw[name_col] if name_col in raw.columns else None}
+    for key, (src, _) in stats.items():
+        out[key] = pd.to_numeric(raw[src], errors='coerce').astype(float) if src in raw.columns else np.nan
+    for col in extra_cols:
+        out[col] = raw[col] if col in raw.columns else None
+    frame = pd.DataFrame(out, index=raw.index)
+    frame = frame[frame['name'].notna()].reset_index(drop=True)
+    frame['name'] = frame['name'].astype(str).str.strip()
+    return frame
+
+def stat_records(frame, stats):
+    """One stats dict per row, with the values coerced column by column"""
+    keys = list(stats)
+    cols = [to_objects(frame[key], kind) for key, (_, kind) in stats.items()]
+    return [dict(zip(keys, row)) for row in zip(*cols)]
+
+def session_totals(sheet_totals, suffix, wanted):
+    """Raw vote total per session, for sessions already known (sheets of one session are added up)"""
+    totals = {}
+    for sheet, tot in sheet_totals.items():
+        if (sess := parse_session(sheet, suffix)) in wanted:
+            if tot is None:
+                raise KeyError(f"sheet '{sheet}' has no vote column")
+            totals[sess] = totals.get(sess, 0) + tot
+    return {sess: int(tot) for sess, tot in totals.items()}
+
+def add_characters(data, frame, stats, with_jp_name):
+    """Merge one region's stacked character frame into data['characters'] / indexes"""
+    chars = data['characters']
+    by_work = data['indexes']['by_work']
+    frame = frame.assign(stats=stat_records(frame, stats), id=char_id(frame['name']),
+                         fa=frame['fa'].map(clean_str).astype(object))
+    if with_jp_name:
+        frame['jp_name'] = str_or_none(frame['jp_name'])
+    for tr, rows in frame.groupby('name', sort=False):
+        first = rows.iloc[0]
+        if tr not in chars:
+            fa = first['fa']
+            fa = None if pd.isna(fa) else fa
+            jp_name = first['jp_name'] if with_jp_name else None
+            chars[tr] = {'id': first['id'], 'jp_name': jp_name, 'first_appear': fa, 'keywords': [], 'sessions': {}}
+            if fa: by_work.setdefault(fa, []).append(tr)
+        chars[tr]['sessions'].update(zip(rows['sess'], rows['stats']))
+
+def add_songs(data, frame, stats, with_title):
+    """Merge one region's stacked song frame into data['songs']"""
+    songs = data['songs']
+    roles = frame['roles'].astype(str).str.split('|')
+    roles[frame['roles'].isna()] = None
+    frame = frame.assign(stats=stat_records(frame, stats), roles=roles)
+    if with_title:
+        frame['t'] = str_or_none(frame['t'])
+    for st, rows in frame.groupby('name', sort=False):
+        if st not in songs:
+            t = rows['t'].iloc[0] if with_title else None
+            songs[st] = {'t': t, 'tr_t': st, 'chars': [], 'sessions': {}}
+        song_chars = songs[st]['chars']
+        for role_list in rows['roles']:
+            if role_list is None: continue
+            for c in role_list:
+                c = c.strip()
+                if c not in song_chars: song_chars.append(c)
+        songs[st]['sessions'].update(zip(rows['sess'], rows['stats']))
+
+def session_lists(frame):
+    """Names listed per session, in sheet row order"""
+    return {sess: rows.tolist() for sess, rows in frame.groupby('sess', sort=False)['name']}
+
+def build_data(books, totals):
+    """
+    Build the touhou_vote.json structure from the parsed workbooks.
+    books maps the keys of BOOKS to {sheet name: DataFrame};
+    totals maps the keys of RAW_TOTALS to {sheet name: vote total}.
+    """
+    data = {
+        "meta": {"missing_gender": ["3_jp", "4_jp"], "jp_sessions": [], "cn_sessions": []},
+        "characters": {},
+        "songs": {},
+        "gender": {},
+        "indexes": {"by_work": {}, "by_session": {}}
     }
+    by_session = data['indexes']['by_session']
 
-# --- Process Character Tags ---
-wb = pd.ExcelFile(tag_file)
-# Assume single sheet
-df_tag = wb.parse(wb.sheet_names[0])
-df_tag.columns = df_tag.columns.str.strip()
-for _, r in df_tag.iterrows():
-    tr = r.get('译名')
-    if pd.isna(tr): continue
-    tr = str(tr).strip()
-    kw_str = r.get('keywords')
-    if pd.isna(kw_str): continue
-    keywords = [kw.strip() for kw in str(kw_str).split('、') if kw.strip()]
-    if tr in data['characters']:
-        data['characters'][tr]['keywords'] = keywords
-    else:
-        # create entry if not existing
-        data['characters'][tr] = {'id': re.sub(r"\W+", "", tr).lower(), 'jp_name': None, 'first_appear': None, 'keywords': keywords, 'sessions': {}}
-
-# Sort sessions
-data['meta']['jp_sessions'].sort(key=lambda x: int(x.split('_')[0]))
-data['meta']['cn_sessions'].sort(key=lambda x: int(x.split('_')[0]))
-
-# Output JSON
-touhou_json = 'touhou_vote.json'
-with open(touhou_json, 'w', encoding='utf-8') as f:
-    json.dump(data, f, ensure_ascii=False, indent=2)
-print(f"Generated {touhou_json}")
+    # --- JP Character Sessions ---
+    jp = stack_sheets(books['jp_grouped'], 'jp', '译名', JP_CHAR_STATS, ('日文名', '首次出现作品'))
+    jp = jp.rename(columns={'日文名': 'jp_name', '首次出现作品': 'fa'})
+    jp_chars = session_lists(jp)
+    for sheet in books['jp_grouped']:
+        sess = parse_session(sheet, 'jp')
+        data['meta']['jp_sessions'].append(sess)
+        by_session[sess] = {'chars': jp_chars.get(sess, []), 'songs': [], 'extra_works': extra_works(sheet)}
+    add_characters(data, jp, JP_CHAR_STATS, with_jp_name=True)
+
+    # --- JP Total Votes ---
+    for sess, tot in session_totals(totals['jp_full'], 'jp', set(data['meta']['jp_sessions'])).items():
+        by_session[sess]['total_votes'] = tot
+
+    # --- CN Character Sessions ---
+    cn = stack_sheets(books['cn_grouped'], 'cn', '译名', CN_CHAR_STATS, ('首次出现作品',))
+    cn = cn.rename(columns={'首次出现作品': 'fa'})
+    cn_chars = session_lists(cn)
+    for sheet in books['cn_grouped']:
+        sess = parse_session(sheet, 'cn')
+        data['meta']['cn_sessions'].append(sess)
+        by_session[sess] = {'chars': cn_chars.get(sess, []), 'songs': []}
+    add_characters(data, cn, CN_CHAR_STATS, with_jp_name=False)
+
+    # --- CN Total Votes ---
+    for sess, tot in session_totals(totals['cn_full'], 'cn', set(data['meta']['cn_sessions'])).items():
+        by_session[sess]['total_votes'] = tot
+
+    # --- JP Music Sessions ---
+    mjp = stack_sheets(books['music_jp_grouped'], 'jp', '译名', JP_SONG_STATS, ('曲目', '所属角色'))
+    mjp = mjp.rename(columns={'曲目': 't', '所属角色': 'roles'})
+    mjp_songs = session_lists(mjp)
+    for sheet in books['music_jp_grouped']:
+        sess = parse_session(sheet, 'jp')
+        by_session.setdefault(sess, {'chars': [], 'songs': []})['songs'] += mjp_songs.get(sess, [])
+    add_songs(data, mjp, JP_SONG_STATS, with_title=True)
+
+    # --- JP Music Total Votes ---
+    for sess, tot in session_totals(totals['music_jp_full'], 'jp', set(by_session)).items():
+        by_session[sess]['total_song_votes'] = tot
+
+    # --- CN Music Sessions ---
+    mcn = stack_sheets(books['music_cn_grouped'], 'cn', '译名', CN_SONG_STATS, ('所属角色',))
+    mcn = mcn.rename(columns={'所属角色': 'roles'})
+    mcn_songs = session_lists(mcn)
+    for sheet in books['music_cn_grouped']:
+        sess = parse_session(sheet, 'cn')
+        by_session.setdefault(sess, {'chars': [], 'songs': []})['songs'] += mcn_songs.get(sess, [])
+    add_songs(data, mcn, CN_SONG_STATS, with_title=False)
+
+    # --- CN Music Total Votes ---
+    for sess, tot in session_totals(totals['music_cn_full'], 'cn', set(by_session)).items():
+        by_session[sess]['total_song_votes'] = tot
+
+    # --- Process Gender Info ---
+    for sheet, df in books['gender'].items():
+        df = strip_columns(df)
+        votes = np.trunc(pd.to_numeric(df['票数'], errors='coerce')).groupby(df['性别']).sum(min_count=0)
+        data['gender'][parse_session(sheet, 'jp')] = {
+            key: int(votes[g]) if g in votes.index and votes[g] > 0 else None
+            for key, g in (('m', '男性'), ('f', '女性'), ('o', '其他'))
+        }
+
+    # --- Process Character Tags ---
+    # Assume single sheet
+    df_tag = next(iter(books['tags'].values()))
+    df_tag = strip_columns(df_tag)
+    df_tag = df_tag[df_tag['译名'].notna() & df_tag['keywords'].notna()]
+    names = df_tag['译名'].astype(str).str.strip()
+    keyword_lists = df_tag['keywords'].astype(str).str.split('、')
+    for tr, cid, kws in zip(names, char_id(names), keyword_lists):
+        keywords = [kw.strip() for kw in kws if kw.strip()]
+        if tr in data['characters']:
+            data['characters'][tr]['keywords'] = keywords
+        else:
+            # create entry if not existing
+            data['characters'][tr] = {'id': cid, 'jp_name': None, 'first_appear': None, 'keywords': keywords, 'sessions': {}}
+
+    # Sort sessions
+    data['meta']['jp_sessions'].sort(key=lambda x: int(x.split('_')[0]))
+    data['meta']['cn_sessions'].sort(key=lambda x: int(x.split('_')[0]))
+    return data
+
+def load_books(workers=1):
+    """
+    Parse every workbook in BOOKS. With workers > 1 the workbooks are parsed concurrently in a
+    process pool; results are always returned in BOOKS order, so the output does not depend on
+    which workbook finishes first. workers=1 parses them one by one in this process.
+    """
+    keys, paths = list(BOOKS), list(BOOKS.values())
+    if workers <= 1:
+        return {key: load_workbook(path) for key, path in zip(keys, paths)}
+    with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as pool:
+        return dict(zip(keys, pool.map(load_workbook, paths)))
+
+def load_totals():
+    """Per-sheet vote totals of the raw workbooks, from the session catalog"""
+    return {key: catalog_totals(path, col) for key, (path, col) in RAW_TOTALS.items()}
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize all vote workbooks into touhou_vote.json")
+    parser.add_argument('--workers', type=int, default=min(len(BOOKS), os.cpu_count() or 1),
+                        help="processes used to parse the workbooks (1 = serial, for debugging)")
+    args = parser.parse_args()
+
+    data = build_data(load_books(args.workers), load_totals())
+
+    # Output JSON (plus the msgpack twin when msgpack is installed)
+    for path in save_vote_data(data, touhou_json):
+        print(f"Generated {path}")
+    # Dense character x session x region arrays for the analysis scripts
+    print(f"Generated {save_tensor(build_tensor(data), touhou_json)}")
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,3 @@
-import os
 import re
 import pandas as pd
 from bs4 import BeautifulSoup
@@ -8,15 +7,16 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
-# 配置输入输出文件及缓存目录
+from PageCache import PageCache
+from WorkbookCache import load_sheet, write_workbook
+
+# 配置输入输出文件及网页缓存（SQLite，见 PageCache.py；原来的 cache/ 目录在首次打开时导入）
 input_file = 'fun.xlsx'
 output_file = '萌点提取结果.xlsx'
-cache_dir = 'cache'
-if not os.path.exists(cache_dir):
-    os.makedirs(cache_dir)
+cache = PageCache('page_cache.sqlite')
 
 # 读取 Excel 数据
-_df = pd.read_excel(input_file)
+_df = load_sheet(input_file)
 # 检查必需列
 for col in ['译名', '首次出现作品']:
     if col not in _df.columns:
@@ -56,21 +56,19 @@ for raw_name in filtered_df['译名'].dropna():
     url = base_url + encoded
     print(f"Processing: {url}")
 
-    cache_file = os.path.join(cache_dir, f"{encoded}.html")
-    if os.path.exists(cache_file):
+    html = cache.get(url)
+    if html is not None:
         print("  Loading from cache")
-        with open(cache_file, 'r', encoding='utf-8') as f:
-            html = f.read()
     else:
         try:
             driver.get(url)
             # 假定验证后无需再次验证
             wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, 'div.infotemplatebox')))
             html = driver.page_source
-            with open(cache_file, 'w', encoding='utf-8') as f:
-                f.write(html)
+            cache.put(url, html)
         except Exception as e:
             print(f"  访问失败: {e}")
+            cache.record_failure(url)
             continue
 
     soup = BeautifulSoup(html, 'html.parser')
@@ -92,7 +90,7 @@ driver.quit()
 
 # 保存到 Excel
 if results:
-    pd.DataFrame(results).to_excel(output_file, index=False)
+    write_workbook(output_file, {'Sheet1': pd.DataFrame(results)})
     print(f"已保存结果到 {output_file}")
 else:
     print("未提取到任何萌点内容。")
@@ -0,0 +1,116 @@
+import argparse
+
+import pandas as pd
+
+from SessionCatalog import session_totals, sort_sheets
+from VoteAnalysis import concentration, save_table
+from WorkbookCache import load_workbook
+
+# 前 k 名票数占比（集中度）：每届只排序一次做累加，得到所有 k 的占比曲线，另有 HHI 和 Gini。
+# top7.py / top15.py / top30.py 是本模块的简单封装；直接运行本脚本可一次查看任意 k、两个大区和热力图。
+REGIONS = {
+    'jp': ('TouhouVote_jp_grouped.xlsx', 'TouhouVote_jp.xlsx'),
+    'cn': ('TouhouVote_cn_grouped.xlsx', 'TouhouVote_cn.xlsx'),
+}
+
+
+def load_region(region, sort=True):
+    """读取一个大区的分组工作簿（总票数来自届次目录），返回 concentration() 的 (curves, indices)"""
+    grouped, raw = REGIONS[region]
+    sheets = load_workbook(grouped)
+    if sort:
+        sheets = {name: sheets[name] for name in sort_sheets(sheets)}
+    return concentration(sheets, session_totals(raw))
+
+
+def topk_shares(curves, k):
+    """各届前 k 名占比（%，保留两位小数）"""
+    return [round(v, 2) for v in curves[min(k, curves.columns.max())]]
+
+
+def plot_topk_trend(curves, k, output_image=None, dpi=300):
+    """画出各届前 k 名占比的趋势图（与原 top7.py 的样式相同），output_image 为 None 时不保存"""
+    import matplotlib.pyplot as plt
+
+    if curves.empty:
+        raise ValueError("没有有效数据可绘制图表！")
+    result_df = pd.DataFrame({"Sheet": curves.index, f"前{k}名占比": topk_shares(curves, k)})
+
+    plt.figure(figsize=(12, 6))
+    plt.plot(result_df["Sheet"], result_df[f"前{k}名占比"], marker='o', linestyle='-', color='#E74C3C')
+    plt.title(f"各 Sheet 前{k}名票数占比趋势", fontsize=14)
+    plt.xlabel("Sheet 名称（数字序号）", fontsize=12)
+    plt.ylabel(f"前{k}名票数占比 (%)", fontsize=12)
+    plt.xticks(rotation=45)
+    plt.grid(True, linestyle='--', alpha=0.6)
+    plt.rcParams['font.sans-serif'] = ['SimHei']  # 解决中文乱码
+    plt.ylim(0, 105)  # 固定纵轴范围
+
+    # 添加数据标签
+    for x, y in zip(result_df["Sheet"], result_df[f"前{k}名占比"]):
+        plt.text(x, y, f"{y}%", ha='center', va='bottom', fontsize=9)
+
+    plt.tight_layout()
+    if output_image:
+        plt.savefig(output_image, dpi=dpi, bbox_inches='tight')
+    plt.show()
+
+
+def plot_heatmap(curves_by_region, kmax, output_image):
+    """届 × k 的前 k 名占比热力图，每个大区一个子图；直接构造 Figure 保存，不改变调用者的后端和全局 rcParams"""
+    import matplotlib
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(8 * len(curves_by_region), 7))
+    axes = fig.subplots(1, len(curves_by_region), squeeze=False)
+    for ax, (region, curves) in zip(axes[0], curves_by_region.items()):
+        data = curves.loc[:, :kmax]
+        im = ax.imshow(data.to_numpy(), aspect='auto', cmap='viridis', vmin=0, vmax=100, origin='lower')
+        ax.set_title(f"{region} 前 k 名票数占比 (%)")
+        ax.set_xlabel("k")
+        ax.set_ylabel("Sheet")
+        ticks = list(range(0, data.shape[1], max(1, data.shape[1] // 10)))
+        ax.set_xticks(ticks, [data.columns[i] for i in ticks])
+        ax.set_yticks(range(len(data.index)), data.index)
+        fig.colorbar(im, ax=ax)
+    with matplotlib.rc_context({'font.sans-serif': ['SimHei']}):  # 解决中文乱码
+        fig.tight_layout()
+        fig.savefig(output_image, dpi=150)
+
+
+def topk_table(results, ks):
+    """{大区: (curves, indices)} -> 各届的 HHI/Gini 及各 k 的占比表，index 为 (region, sheet)"""
+    tables = []
+    for region, (curves, indices) in results.items():
+        table = indices.copy()
+        for k in ks:
+            table[f"top{k}"] = topk_shares(curves, k)
+        table.index = pd.MultiIndex.from_product([[region], table.index], names=['region', 'sheet'])
+        tables.append(table)
+    return pd.concat(tables)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="各届前 k 名票数占比、HHI 和 Gini")
+    parser.add_argument('--region', choices=['jp', 'cn', 'all'], default='all')
+    parser.add_argument('-k', type=int, nargs='+', default=[7, 15, 30], help="列出的 k（可多个）")
+    parser.add_argument('--output', help="把各届的 k 占比和 HHI/Gini 保存为表（.csv 或 .parquet）")
+    parser.add_argument('--heatmap', metavar='PNG', help="输出 届 × k 的占比热力图")
+    parser.add_argument('--kmax', type=int, default=50, help="热力图的最大 k")
+    args = parser.parse_args()
+
+    regions = list(REGIONS) if args.region == 'all' else [args.region]
+    results = {region: load_region(region) for region in regions}
+    curves_by_region = {region: curves for region, (curves, indices) in results.items()}
+    table = topk_table(results, args.k)
+    with pd.option_context('display.max_rows', None, 'display.max_columns', None, 'display.width', 200):
+        print(table.round({'hhi': 4, 'gini': 4}))
+    if args.output:
+        print(f"已保存到 {save_table(table, args.output)}")
+    if args.heatmap:
+        plot_heatmap(curves_by_region, args.kmax, args.heatmap)
+        print(f"热力图已保存为 {args.heatmap}")
+
+
+if __name__ == '__main__':
+    main()
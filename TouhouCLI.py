@@ -0,0 +1,214 @@
+import argparse
+import shlex
+import sys
+import time
+from functools import lru_cache
+
+import pandas as pd
+
+import CharacterAnalyze_cn
+import CharacterAnalyze_jp
+import difference
+from GroupAnalyze_jp import group_percentages
+from TopKConcentration import load_region, topk_table
+from VoteAnalysis import save_table
+from WorkCube import load_cube, region_difference
+from data_statistic.TagRanks import (session_top_tags, tag_confidence, tag_difference, tag_difference_all, tag_sensitivity,
+                                     tag_trend)
+
+# 统一的命令行入口：各分析脚本的计算部分以子命令提供，结果以表格输出（可用 --output 保存为 csv / parquet）。
+#   python TouhouCLI.py topk -k 7 15 30
+#   python TouhouCLI.py repl          # 交互模式：数据只读取一次，之后的查询在内存中完成
+# 读取过的工作簿和算好的表在进程内缓存，repl 中第二次查询通常只需几毫秒。
+CHARACTER_MODULES = {'jp': CharacterAnalyze_jp, 'cn': CharacterAnalyze_cn}
+
+
+@lru_cache(maxsize=None)
+def character_matrix(region):
+    module = CHARACTER_MODULES[region]
+    return module.all_character_trends(*module.load_sessions())
+
+
+@lru_cache(maxsize=None)
+def topk_results(region):
+    return load_region(region)
+
+
+@lru_cache(maxsize=None)
+def work_cube():
+    return load_cube()
+
+
+@lru_cache(maxsize=None)
+def divergence(offset=None, sort='abs'):
+    return difference.divergence_table(difference.aligned_pairs(offset), sort)
+
+
+def regions_of(region):
+    return ['jp', 'cn'] if region == 'all' else [region]
+
+
+def cmd_topk(args):
+    return topk_table({region: topk_results(region) for region in regions_of(args.region)}, args.k)
+
+
+def cmd_character(args):
+    matrix = character_matrix(args.region)
+    if args.name not in matrix.index:
+        raise ValueError(f"未找到角色 '{args.name}'（{args.region} 使用 {CHARACTER_MODULES[args.region].NAME_COL}）")
+    return matrix.loc[args.name].dropna().rename('百分比').rename_axis('Sheet名称').reset_index()
+
+
+def cmd_groups(args):
+    if args.diff:
+        return region_difference(work_cube(), args.offset).round(2)
+    return group_percentages(args.region, work_cube())
+
+
+def cmd_diff(args):
+    if args.all:
+        return divergence(args.offset, args.sort)
+    target_jp = difference.name_mapping().get(args.name)
+    if target_jp is None:
+        raise ValueError(f"角色'{args.name}'在对照表中不存在")
+    cn_pct = difference.analyze_sheet('cn', args.cn_sheet, args.name)
+    jp_pct = difference.analyze_sheet('jp', args.jp_sheet, target_jp)
+    return pd.DataFrame([{'译名': args.name, '日文名': target_jp, 'cn_sheet': args.cn_sheet, 'jp_sheet': args.jp_sheet,
+                          'cn_share': cn_pct, 'jp_share': jp_pct, 'diff': cn_pct - jp_pct}])
+
+
+def cmd_tags(args):
+    if args.tags_command == 'session':
+        return session_top_tags(args.region, args.session, args.top, args.significant, args.alpha)
+    if args.tags_command == 'trend':
+        return pd.DataFrame({region: tag_trend(region, args.tag) for region in ('cn', 'jp')})
+    if args.tags_command == 'pairs':
+        return tag_difference_all(args.threshold, args.top, args.significant, args.alpha)
+    if args.tags_command == 'ci':
+        return tag_confidence(args.region, args.session, args.alpha).sort_values('相对热度', ascending=False)
+    if args.tags_command == 'sensitivity':
+        return tag_sensitivity(args.region, args.tag).rename_axis(columns=None).reset_index()
+    return tag_difference(args.cn_session, args.jp_session, args.threshold, args.top, args.significant, args.alpha)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='TouhouCLI.py', description="东方人气投票数据分析")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    def add_output(p):
+        p.add_argument('--output', help="把结果保存为 .csv 或 .parquet")
+        p.add_argument('--rows', type=int, default=60, help="最多打印的行数")
+
+    def add(name, func, help, output=True):
+        p = sub.add_parser(name, help=help)
+        p.set_defaults(func=func)
+        if output:
+            add_output(p)
+        return p
+
+    p = add('topk', cmd_topk, "各届前 k 名票数占比、HHI 和 Gini（top7/15/30.py）")
+    p.add_argument('--region', choices=['jp', 'cn', 'all'], default='jp')
+    p.add_argument('-k', type=int, nargs='+', default=[7, 15, 30])
+
+    p = add('character', cmd_character, "单个角色在各届的得票占比（CharacterAnalyze_*.py）")
+    p.add_argument('name', help="日区用日文名，国区用译名")
+    p.add_argument('--region', choices=['jp', 'cn'], default='jp')
+
+    p = add('groups', cmd_groups, "各作品（首次出现作品）在各届的票数占比（GroupAnalyze_jp.py）")
+    p.add_argument('--region', choices=['jp', 'cn'], default='jp')
+    p.add_argument('--diff', action='store_true', help="对齐届次（国区第 11 届对日区第 20 届，往前依次对齐）的国区与日区占比差")
+    p.add_argument('--offset', type=int, help="--diff 时日区届数 = 国区届数 + offset（默认按最新一届对齐）")
+
+    p = add('diff', cmd_diff, "国区与日区的角色得票占比差异（difference.py）")
+    p.add_argument('name', nargs='?', default=difference.TARGET_CN_NAME, help="中文角色名")
+    p.add_argument('--cn-sheet', default=difference.CN_SHEET_NAME)
+    p.add_argument('--jp-sheet', default=difference.JP_SHEET_NAME)
+    p.add_argument('--all', action='store_true', help="所有角色在所有对齐届次的差值排名")
+    p.add_argument('--offset', type=int, help="日区届数 = 国区届数 + offset（默认按最新一届对齐）")
+    p.add_argument('--sort', choices=list(difference.SORT_KEYS), default='abs')
+
+    p = add('tags', cmd_tags, "tag 相对热度（data_statistic/ 下的脚本）", output=False)
+    tags = p.add_subparsers(dest='tags_command', required=True)
+    t = tags.add_parser('session', help="某一届相对热度最高的 tag")
+    t.add_argument('region', choices=['cn', 'jp'])
+    t.add_argument('session', type=int)
+    t.add_argument('--top', type=int, default=15)
+    t = tags.add_parser('trend', help="某个 tag 在各届的相对热度")
+    t.add_argument('tag')
+    t = tags.add_parser('sensitivity', help="某个 tag 的相对热度随 rank_boundary 的变化（需先运行 ChracterTagStatistics.py --sweep N）")
+    t.add_argument('tag')
+    t.add_argument('--region', choices=['cn', 'jp'], default='cn')
+    t = tags.add_parser('diff', help="国区某届与日区某届的 tag 相对热度差值")
+    t.add_argument('cn_session', type=int)
+    t.add_argument('jp_session', type=int)
+    t.add_argument('--threshold', type=float, default=0.001)
+    t.add_argument('--top', type=int, default=30)
+    t = tags.add_parser('pairs', help="所有（国区届, 日区届）组合的 tag 相对热度差值，每个组合取差异最大的前 N 个")
+    t.add_argument('--threshold', type=float, default=0.001)
+    t.add_argument('--top', type=int, default=30)
+    for name in ('session', 'diff', 'pairs'):
+        tags.choices[name].add_argument('--significant', action='store_true',
+                                        help="只保留重抽样置信区间显著的 tag（需先运行 ChracterTagStatistics.py --bootstrap B）")
+        tags.choices[name].add_argument('--alpha', type=float, default=0.05)
+    t = tags.add_parser('ci', help="某一届各 tag 相对热度的重抽样置信区间")
+    t.add_argument('region', choices=['cn', 'jp'])
+    t.add_argument('session', type=int)
+    t.add_argument('--alpha', type=float, default=0.05)
+    for t in tags.choices.values():
+        add_output(t)
+
+    sub.add_parser('repl', help="交互模式：逐行输入上面的子命令，数据在进程内保持加载")
+    return parser
+
+
+def run(argv, parser=None):
+    """执行一条子命令（参数列表），打印并返回结果表"""
+    args = (parser or build_parser()).parse_args(argv)
+    result = args.func(args)
+    with pd.option_context('display.max_rows', args.rows, 'display.max_columns', None, 'display.width', 200):
+        print(result.head(args.rows) if len(result) > args.rows else result)
+    if args.output:
+        print(f"已保存到 {save_table(result, args.output)}")
+    return result
+
+
+def repl():
+    parser = build_parser()
+    print("输入子命令（如 topk -k 7、character チルノ、diff --all），help 查看帮助，quit 退出")
+    while True:
+        try:
+            line = input('touhou> ').strip()
+        except (EOFError, KeyboardInterrupt):
+            print()
+            break
+        if not line:
+            continue
+        if line in ('quit', 'exit'):
+            break
+        argv = ['-h'] if line == 'help' else shlex.split(line)
+        if argv[0] == 'repl':
+            continue
+        t0 = time.perf_counter()
+        try:
+            run(argv, parser)
+        except SystemExit:  # argparse 的帮助或参数错误
+            continue
+        except Exception as e:
+            print(f"出错: {e}")
+            continue
+        print(f"（用时 {(time.perf_counter() - t0) * 1000:.1f} ms）")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ['repl']:
+        repl()
+        return
+    try:
+        run(argv)
+    except (ValueError, KeyError) as e:
+        sys.exit(f"出错: {e.args[0] if e.args else e}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,32 +1,43 @@
+import argparse
 import pandas as pd
 
-dic_saw = pd.read_excel('fun.xlsx',usecols=['日文名','译名','首次出现作品'])
+from GroupedWriter import OUTPUT_FORMATS, regenerate_grouped
+from WorkbookCache import load_sheet, open_workbook
+
+parser = argparse.ArgumentParser(description="为中日角色投票数据添加首次出现作品信息")
+parser.add_argument('--full', action='store_true', help="忽略指纹，重新生成全部 Sheet")
+parser.add_argument('--region', choices=['jp', 'cn', 'all'], default='all', help="只处理日区或国区")
+parser.add_argument('--format', choices=OUTPUT_FORMATS, default='xlsx',
+                    help="parquet：分组结果写到 *_grouped.parquet/ 目录，需要 xlsx 时再用 WorkbookCache.py --export 导出")
+args = parser.parse_args()
+
+dic_saw = load_sheet('fun.xlsx')[['日文名','译名','首次出现作品']].copy()
 dic_saw.dropna(subset=['首次出现作品'], inplace=True)
 dic_saw = dic_saw.loc[dic_saw['首次出现作品'] > 5]
 dic_saw['首次出现作品'] = dic_saw['首次出现作品'].astype(float)
 # dic = dict(zip(dic_saw['日文名'], dic_saw['首次出现作品']))
 # print(dic_saw)
 
-dic_jp = dic_saw.loc[dic_saw['首次出现作品'] > 5,['日文名','首次出现作品']]
-data_jp = pd.read_excel('TouhouVote_jp.xlsx',sheet_name=None)
-processed_sheets = {}
-for num, df in data_jp.items():
-    merged_df = pd.merge(df, dic_jp,on='日文名',how='left')
-    merged_df.dropna(subset=['首次出现作品'], inplace=True)
-    processed_sheets[num] = merged_df
-
-with pd.ExcelWriter("TouhouVote_jp_grouped.xlsx", engine="openpyxl") as writer:
-    for sheet_name, df in processed_sheets.items():
-        df.to_excel(writer, sheet_name=sheet_name, index=False)
-
-dic_cn = dic_saw.loc[dic_saw['首次出现作品'] > 5,['译名','首次出现作品']]
-data_jp = pd.read_excel('TouhouVote_cn.xlsx',sheet_name=None)
-processed_sheets = {}
-for num, df in data_jp.items():
-    merged_df = pd.merge(df, dic_cn,on='译名',how='left')
-    merged_df.dropna(subset=['首次出现作品'], inplace=True)
-    processed_sheets[num] = merged_df
-
-with pd.ExcelWriter("TouhouVote_cn_grouped.xlsx", engine="openpyxl") as writer:
-    for sheet_name, df in processed_sheets.items():
-        df.to_excel(writer, sheet_name=sheet_name, index=False)
\ No newline at end of file
+if args.region in ('jp', 'all'):
+    dic_jp = dic_saw.loc[dic_saw['首次出现作品'] > 5,['日文名','首次出现作品']]
+    data_jp = open_workbook('TouhouVote_jp.xlsx')
+
+    def merge_jp(df):
+        merged_df = pd.merge(df, dic_jp,on='日文名',how='left')
+        merged_df.dropna(subset=['首次出现作品'], inplace=True)
+        return merged_df
+
+    regenerate_grouped("TouhouVote_jp_grouped.xlsx", data_jp, merge_jp,
+                       lambda df: dic_jp[dic_jp['日文名'].isin(df['日文名'])], full=args.full, output_format=args.format)
+
+if args.region in ('cn', 'all'):
+    dic_cn = dic_saw.loc[dic_saw['首次出现作品'] > 5,['译名','首次出现作品']]
+    data_cn = open_workbook('TouhouVote_cn.xlsx')
+
+    def merge_cn(df):
+        merged_df = pd.merge(df, dic_cn,on='译名',how='left')
+        merged_df.dropna(subset=['首次出现作品'], inplace=True)
+        return merged_df
+
+    regenerate_grouped("TouhouVote_cn_grouped.xlsx", data_cn, merge_cn,
+                       lambda df: dic_cn[dic_cn['译名'].isin(df['译名'])], full=args.full, output_format=args.format)
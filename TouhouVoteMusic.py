@@ -1,6 +1,17 @@
+import argparse
 import pandas as pd
 import re
 
+from GroupedWriter import OUTPUT_FORMATS, regenerate_grouped
+from WorkbookCache import load_sheet, open_workbook
+
+parser = argparse.ArgumentParser(description="清洗中日歌曲投票数据并添加所属角色信息")
+parser.add_argument('--full', action='store_true', help="忽略指纹，重新生成全部 Sheet")
+parser.add_argument('--region', choices=['jp', 'cn', 'all'], default='all', help="只处理日区或国区")
+parser.add_argument('--format', choices=OUTPUT_FORMATS, default='xlsx',
+                    help="parquet：分组结果写到 *_grouped.parquet/ 目录，需要 xlsx 时再用 WorkbookCache.py --export 导出")
+args = parser.parse_args()
+
 def normalize_for_match(s: str) -> str:
     """
     1. 先用手工映射把已知的异名统一
@@ -33,7 +44,7 @@ manual_match_map = {
 }
 
 # 1. 读映射表，生成“标准译名”和“干净名”
-dic_saw = pd.read_excel('TouhouMusicInfo.xlsx', usecols=['曲目', '译名', '所属角色'])
+dic_saw = load_sheet('TouhouMusicInfo.xlsx')[['曲目', '译名', '所属角色']].copy()
 dic_saw.dropna(subset=['所属角色'], inplace=True)
 dic_saw = dic_saw.rename(columns={'译名': '标准译名'})
 dic_saw['干净名'] = dic_saw['标准译名'].map(normalize_for_match)
@@ -44,32 +55,34 @@ dic_jp = dic_saw[['曲目', '所属角色', '标准译名']].copy()
 # 国区映射：按干净名合并
 dic_cn = dic_saw[['曲目', '所属角色', '标准译名', '干净名']].copy()
 
-# 2. 处理日区投票表（不变列结构，只替换译名）
-data_jp = pd.read_excel('TouhouVote_music_jp.xlsx', sheet_name=None)
-processed_jp = {}
-for sheet, df in data_jp.items():
-    merged = pd.merge(df, dic_jp, on='曲目', how='left', validate='many_to_one')
-    merged.dropna(subset=['所属角色', '标准译名'], inplace=True)
-    # 【改动】在这里：对标准译名再归一化，去掉括号和子标题
-    merged['译名'] = merged['标准译名'].map(normalize_for_match)
-    processed_jp[sheet] = merged[df.columns.tolist() + ['所属角色']]
+if args.region in ('jp', 'all'):
+    # 2. 处理日区投票表（不变列结构，只替换译名）
+    data_jp = open_workbook('TouhouVote_music_jp.xlsx')
+
+    def merge_jp(df):
+        merged = pd.merge(df, dic_jp, on='曲目', how='left', validate='many_to_one')
+        merged.dropna(subset=['所属角色', '标准译名'], inplace=True)
+        # 【改动】在这里：对标准译名再归一化，去掉括号和子标题
+        merged['译名'] = merged['标准译名'].map(normalize_for_match)
+        return merged[df.columns.tolist() + ['所属角色']]
+
+    regenerate_grouped("TouhouVote_music_jp_grouped.xlsx", data_jp, merge_jp,
+                       lambda df: dic_jp[dic_jp['曲目'].isin(df['曲目'])], full=args.full, output_format=args.format)
 
-with pd.ExcelWriter("TouhouVote_music_jp_grouped.xlsx", engine="openpyxl") as w:
-    for sheet, df in processed_jp.items():
-        df.to_excel(w, sheet, index=False)
+if args.region in ('cn', 'all'):
+    # 3. 处理国区投票表
+    data_cn = open_workbook('TouhouVote_music_cn.xlsx')
 
-# 3. 处理国区投票表
-data_cn = pd.read_excel('TouhouVote_music_cn.xlsx', sheet_name=None)
-processed_cn = {}
-for sheet, df in data_cn.items():
-    df['干净名'] = df['译名'].map(normalize_for_match)
-    merged = pd.merge(df, dic_cn, on='干净名', how='left', validate='many_to_one')
-    merged.dropna(subset=['曲目', '所属角色', '标准译名'], inplace=True)
-    # 【改动】同样再归一化一下，防止标准译名里还有括号
-    merged['译名'] = merged['标准译名'].map(normalize_for_match)
-    cols = [c for c in df.columns if c != '干净名'] + ['所属角色']
-    processed_cn[sheet] = merged[cols]
+    def merge_cn(df):
+        df = df.copy()
+        df['干净名'] = df['译名'].map(normalize_for_match)
+        merged = pd.merge(df, dic_cn, on='干净名', how='left', validate='many_to_one')
+        merged.dropna(subset=['曲目', '所属角色', '标准译名'], inplace=True)
+        # 【改动】同样再归一化一下，防止标准译名里还有括号
+        merged['译名'] = merged['标准译名'].map(normalize_for_match)
+        cols = [c for c in df.columns if c != '干净名'] + ['所属角色']
+        return merged[cols]
 
-with pd.ExcelWriter("TouhouVote_music_cn_grouped.xlsx", engine="openpyxl") as w:
-    for sheet, df in processed_cn.items():
-        df.to_excel(w, sheet, index=False)
+    regenerate_grouped("TouhouVote_music_cn_grouped.xlsx", data_cn, merge_cn,
+                       lambda df: dic_cn[dic_cn['干净名'].isin(df['译名'].map(normalize_for_match))],
+                       full=args.full, output_format=args.format)
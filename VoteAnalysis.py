@@ -0,0 +1,127 @@
+import os
+import re
+
+import pandas as pd
+
+from SessionCatalog import sort_sheets
+
+# 多个分析脚本共用的批量计算：所有届一次拼接，再用一次 groupby/pivot 得到整张表，
+# 取某个角色的趋势只是取表中的一行，不必每个角色重新读一遍工作簿。
+
+
+def stack_sessions(sheets, name_col, vote_col='票数'):
+    """
+    把 {Sheet名: DataFrame} 拼成一张长表，列为 sheet、name、votes（票数转为数值，非数字为 NaN）。
+    name_col 为 None 时不需要名字列（name 全为 None）。缺少所需列的 Sheet 跳过并给出警告。
+    """
+    parts = []
+    for sheet, df in sheets.items():
+        if vote_col not in df.columns or (name_col is not None and name_col not in df.columns):
+            missing = f"'{vote_col}'" if name_col is None else f"'{name_col}' 或 '{vote_col}'"
+            print(f"警告：Sheet '{sheet}' 缺少列 {missing}，已跳过")
+            continue
+        parts.append(pd.DataFrame({'sheet': sheet, 'name': None if name_col is None else df[name_col].to_numpy(),
+                                   'votes': pd.to_numeric(df[vote_col], errors='coerce').to_numpy()}))
+    if not parts:
+        return pd.DataFrame(columns=['sheet', 'name', 'votes'])
+    return pd.concat(parts, ignore_index=True)
+
+
+def share_matrix(sheets, totals, name_col, vote_col='票数'):
+    """
+    角色 × 届 的得票占比（%，保留两位小数）：index 为角色名（按首次出现的顺序），columns 为按届数排序的 Sheet 名。
+    与逐个角色计算时的规则相同：同一 Sheet 中同名的取第一行；票数为 0、未上榜或该届总票数为 0 时为 NaN。
+    totals 为 {Sheet名: 原始总票数}（SessionCatalog.session_totals）。
+    """
+    long = stack_sessions(sheets, name_col, vote_col)
+    long = long[long['name'].notna()].drop_duplicates(['sheet', 'name'], keep='first')
+    votes = long.pivot(index='name', columns='sheet', values='votes')
+    votes = votes.reindex(index=long['name'].unique(), columns=sort_sheets(long['sheet'].unique()))
+    total = pd.Series({sheet: totals.get(sheet) for sheet in votes.columns}, dtype=float)
+    total[total == 0] = float('nan')
+    votes = votes.where(votes != 0)
+    return (votes / total * 100).round(2)
+
+
+def concentration(sheets, totals, vote_col='票数'):
+    """
+    各届票数集中度，返回 (curves, indices)：
+      - curves: index 为 Sheet 名（保持 sheets 的顺序），columns 为 k = 1..N（N 为最多上榜人数），
+        值为前 k 名票数占该届原始总票数的百分比（未取整）；k 超过该届上榜人数时等于全部上榜票数的占比
+      - indices: 每届的上榜人数 n、上榜票数 listed_votes、原始总票数 total_votes、
+        HHI（各上榜者占原始总票数份额的平方和，0~1）和 Gini（上榜者票数分布的基尼系数，0~1）
+    每届只排序一次并做累加，所有 k 一次得到；缺失的票数按 0 计。总票数为 0 的届跳过。
+    """
+    long = stack_sessions(sheets, None, vote_col)
+    order = {sheet: i for i, sheet in enumerate(sheets)}
+    long = long.assign(pos=long['sheet'].map(order), votes=long['votes'].fillna(0))
+    long = long.sort_values(['pos', 'votes'], ascending=[True, False], kind='stable')
+    by_sheet = long.groupby('sheet', sort=False)['votes']
+    long['rank'] = by_sheet.cumcount() + 1
+    long['cum'] = by_sheet.cumsum()
+
+    total = pd.Series({sheet: totals.get(sheet) for sheet in long['sheet'].unique()}, dtype=float)
+    for sheet in total.index[~(total > 0)]:
+        print(f"警告：Sheet '{sheet}' 总票数为0，已跳过")
+    total = total[total > 0]
+    long = long[long['sheet'].isin(total.index)]
+
+    cum = long.pivot(index='sheet', columns='rank', values='cum').reindex(total.index).ffill(axis=1)
+    curves = cum.div(total, axis=0) * 100
+    curves.columns.name = 'k'
+
+    n = long.groupby('sheet', sort=False)['rank'].max().reindex(total.index)
+    listed = cum.iloc[:, -1] if len(cum.columns) else total * 0
+    share = long['votes'] / long['sheet'].map(total)
+    hhi = (share ** 2).groupby(long['sheet'], sort=False).sum().reindex(total.index)
+    # 升序位置 i = n - rank + 1：G = 2 * Σ i·x / (n · Σx) - (n + 1) / n
+    asc = long['sheet'].map(n) - long['rank'] + 1
+    weighted = (asc * long['votes']).groupby(long['sheet'], sort=False).sum().reindex(total.index)
+    gini = 2 * weighted / (n * listed) - (n + 1) / n
+    indices = pd.DataFrame({'n': n, 'listed_votes': listed, 'total_votes': total, 'hhi': hhi, 'gini': gini})
+    return curves, indices
+
+
+def save_table(df, path):
+    """按扩展名保存为 CSV（utf-8-sig，Excel 可直接打开）或 Parquet"""
+    if path.endswith('.parquet'):
+        df.to_parquet(path)
+    else:
+        df.to_csv(path, encoding='utf-8-sig')
+    return path
+
+
+def safe_filename(name):
+    """把角色名、tag 等转换为可用作文件名的字符串"""
+    return re.sub(r'[\\/:*?"<>|\s]+', '_', str(name))
+
+
+def plot_trends(matrix, out_dir, title_fmt="'{name}' 在各 Sheet 中的得票占比（按数字顺序）"):
+    """
+    每个角色（matrix 的一行）输出一张趋势图到 out_dir，返回生成的文件数。
+    直接构造 Figure 并保存，不经过 pyplot，不改变调用者的后端和全局 rcParams
+    """
+    import matplotlib
+    from matplotlib.figure import Figure
+
+    os.makedirs(out_dir, exist_ok=True)
+    count = 0
+    for name, row in matrix.iterrows():
+        row = row.dropna()
+        if row.empty:
+            continue
+        fig = Figure(figsize=(10, 6))
+        ax = fig.subplots()
+        ax.plot(row.index, row.values, marker='o', linestyle='-', color='#2E86C1')
+        ax.set_title(title_fmt.format(name=name))
+        ax.set_xlabel("Sheet 名称（数字序号）")
+        ax.set_ylabel("得票占比 (%)")
+        ax.tick_params(axis='x', rotation=45)
+        ax.grid(True, linestyle='--', alpha=0.7)
+        for x, y in zip(row.index, row.values):
+            ax.text(x, y, f"{y}%", ha='center', va='bottom', fontsize=9)
+        with matplotlib.rc_context({'font.sans-serif': ['SimHei']}):  # 解决中文乱码
+            fig.tight_layout()
+            fig.savefig(os.path.join(out_dir, f"{safe_filename(name)}.png"), dpi=100)
+        count += 1
+    return count
@@ -0,0 +1,51 @@
+import json
+import os
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# touhou_vote.json 的二进制副本（msgpack），逻辑结构与 JSON 完全相同，体积更小、解析更快
+VOTE_JSON = 'touhou_vote.json'
+
+
+def binary_path(json_path=VOTE_JSON):
+    return os.path.splitext(json_path)[0] + '.msgpack'
+
+
+def save_vote_data(data, json_path=VOTE_JSON):
+    """写出 JSON，并在安装了 msgpack 时同时写出二进制副本，返回写出的文件列表"""
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    written = [json_path]
+    if msgpack is not None:
+        with open(binary_path(json_path), 'wb') as f:
+            f.write(msgpack.packb(data, use_bin_type=True))
+        written.append(binary_path(json_path))
+    return written
+
+
+def load_json(json_path=VOTE_JSON):
+    with open(json_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_binary(json_path=VOTE_JSON):
+    with open(binary_path(json_path), 'rb') as f:
+        return msgpack.unpackb(f.read(), raw=False, strict_map_key=False)
+
+
+def binary_is_fresh(json_path=VOTE_JSON):
+    """二进制副本存在且不比 JSON 旧（JSON 被单独重新生成后副本即失效）"""
+    bin_path = binary_path(json_path)
+    if msgpack is None or not os.path.exists(bin_path):
+        return False
+    return not os.path.exists(json_path) or os.path.getmtime(bin_path) >= os.path.getmtime(json_path)
+
+
+def load_vote_data(json_path=VOTE_JSON):
+    """读取投票数据：优先使用最新的 msgpack 副本，否则回退到 JSON"""
+    if binary_is_fresh(json_path):
+        return load_binary(json_path)
+    return load_json(json_path)
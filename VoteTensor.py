@@ -0,0 +1,96 @@
+import json
+import os
+import re
+
+import numpy as np
+
+from VoteData import VOTE_JSON, load_vote_data
+
+# 由 touhou_vote.json 生成的稠密数组：每个指标一个 (角色, 届, 大区) 的 float32 数组，缺失为 NaN，
+# 以 .npy 保存在 touhou_vote_tensor/ 下，读取时用 mmap 打开，不会整体载入内存。
+REGIONS = ['cn', 'jp']                        # 大区下标：0 为国区，1 为日区
+METRICS = ['v', 'r', 'bnum', 'brate']         # 直接取自 sessions 的指标
+# 另有 'share'（得票数占该届总票数的比例）和 'total_votes'（(届, 大区)，float64）
+
+
+def tensor_dir(json_path=VOTE_JSON):
+    return os.path.splitext(json_path)[0] + '_tensor'
+
+
+def split_session_key(key):
+    """'3_jp' -> (3, 'jp')；不是 '<届数>_<大区>' 形式（如 Sheet 名不以数字开头）时抛出 ValueError"""
+    m = re.match(r'^(\d+)_([a-z]+)$', key)
+    if m is None:
+        raise ValueError(f"届次键 '{key}' 不是 '<届数>_<大区>' 的形式（如 '3_jp'），请检查工作簿的 Sheet 名")
+    return int(m.group(1)), m.group(2)
+
+
+def build_tensor(data):
+    """从 touhou_vote.json 的数据结构构建数组，返回 dict（索引信息 + 各指标数组）"""
+    characters = list(data['characters'])
+    session_keys = data['meta']['cn_sessions'] + data['meta']['jp_sessions']
+    sessions = sorted({split_session_key(k)[0] for k in session_keys})
+    sess_index = {s: i for i, s in enumerate(sessions)}
+    region_index = {r: i for i, r in enumerate(REGIONS)}
+    shape = (len(characters), len(sessions), len(REGIONS))
+
+    arrays = {m: np.full(shape, np.nan, dtype=np.float32) for m in METRICS}
+    totals = np.full(shape[1:], np.nan)
+    for key, idx in data['indexes']['by_session'].items():
+        num, region = split_session_key(key)
+        if num in sess_index and region in region_index and idx.get('total_votes') is not None:
+            totals[sess_index[num], region_index[region]] = idx['total_votes']
+
+    for ci, name in enumerate(characters):
+        for key, stats in data['characters'][name]['sessions'].items():
+            num, region = split_session_key(key)
+            for m in METRICS:
+                value = stats.get(m)
+                if value is not None:
+                    arrays[m][ci, sess_index[num], region_index[region]] = value
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        share = arrays['v'].astype(np.float64) / totals[None, :, :]
+    share[:, ~(totals > 0)] = np.nan
+    arrays['share'] = share.astype(np.float32)
+    arrays['total_votes'] = totals
+    return {'characters': characters, 'sessions': sessions, 'regions': list(REGIONS), **arrays}
+
+
+def save_tensor(tensor, json_path=VOTE_JSON):
+    out_dir = tensor_dir(json_path)
+    os.makedirs(out_dir, exist_ok=True)
+    for name, value in tensor.items():
+        if isinstance(value, np.ndarray):
+            np.save(os.path.join(out_dir, f"{name}.npy"), value)
+    # index.json 最后写入，其修改时间代表整个目录的生成时间
+    index = {k: tensor[k] for k in ('characters', 'sessions', 'regions')}
+    index['arrays'] = [k for k, v in tensor.items() if isinstance(v, np.ndarray)]
+    with open(os.path.join(out_dir, 'index.json'), 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False)
+    return out_dir
+
+
+def tensor_is_fresh(json_path=VOTE_JSON):
+    index_path = os.path.join(tensor_dir(json_path), 'index.json')
+    if not os.path.exists(index_path):
+        return False
+    return not os.path.exists(json_path) or os.path.getmtime(index_path) >= os.path.getmtime(json_path)
+
+
+def load_tensor(json_path=VOTE_JSON, data=None):
+    """
+    打开数组目录（mmap，只读）。目录不存在或比 JSON 旧时先根据 JSON 重新生成。
+    返回的 dict 额外带有 char_index（角色名 -> 下标）和 session_index（届数 -> 下标）。
+    """
+    out_dir = tensor_dir(json_path)
+    if not tensor_is_fresh(json_path):
+        save_tensor(build_tensor(data if data is not None else load_vote_data(json_path)), json_path)
+    with open(os.path.join(out_dir, 'index.json'), 'r', encoding='utf-8') as f:
+        index = json.load(f)
+    tensor = {k: index[k] for k in ('characters', 'sessions', 'regions')}
+    for name in index['arrays']:
+        tensor[name] = np.load(os.path.join(out_dir, f"{name}.npy"), mmap_mode='r')
+    tensor['char_index'] = {name: i for i, name in enumerate(tensor['characters'])}
+    tensor['session_index'] = {s: i for i, s in enumerate(tensor['sessions'])}
+    return tensor
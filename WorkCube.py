@@ -0,0 +1,151 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from SessionCatalog import extract_number, session_totals
+from WorkbookCache import load_workbook, store_is_current, store_path
+
+# 作品（首次出现作品）× 届 × 大区 的得票占比立方体：
+# 两个大区所有届拼成一张长表，一次 groupby 求和后展开为 float64 数组，缺失（该届没有该作品的角色）为 NaN，
+# 以 .npy 保存在 touhou_vote_work_cube/ 下；index.json 记录各轴和输入文件的哈希，输入变化后 load_cube() 自动重建。
+CUBE_DIR = 'touhou_vote_work_cube'
+REGIONS = ['cn', 'jp']                 # 大区下标：0 为国区，1 为日区（与 VoteTensor 相同）
+SOURCES = {                            # 大区 -> (分组工作簿, 原始工作簿)
+    'cn': ('TouhouVote_cn_grouped.xlsx', 'TouhouVote_cn.xlsx'),
+    'jp': ('TouhouVote_jp_grouped.xlsx', 'TouhouVote_jp.xlsx'),
+}
+WORK_COL = '首次出现作品'
+VOTE_COL = '票数'
+
+
+def _source_hashes():
+    """分组工作簿（或其 Parquet 输出）和原始工作簿的内容哈希"""
+    hashes = {}
+    for grouped, raw in SOURCES.values():
+        for path in (grouped, raw):
+            target = os.path.join(store_path(path), 'manifest.json') if store_is_current(path) else path
+            with open(target, 'rb') as f:
+                hashes[path] = hashlib.sha256(f.read()).hexdigest()
+    return hashes
+
+
+def _stack_region(region):
+    grouped, raw = SOURCES[region]
+    totals = session_totals(raw)
+    parts = []
+    for sheet, df in load_workbook(grouped).items():
+        if WORK_COL not in df.columns or VOTE_COL not in df.columns:
+            print(f"警告：Sheet '{sheet}' 缺少列 '{WORK_COL}' 或 '{VOTE_COL}'，已跳过")
+            continue
+        number = extract_number(sheet)
+        if number == float('inf'):
+            print(f"警告：Sheet '{sheet}' 的名字不以届数开头，已跳过")
+            continue
+        parts.append(pd.DataFrame({
+            'region': region, 'sheet': sheet, 'session': int(number), 'total': totals.get(sheet),
+            'work': df[WORK_COL].astype(float).to_numpy(),
+            'votes': pd.to_numeric(df[VOTE_COL], errors='coerce').to_numpy(),
+        }))
+    return parts
+
+
+def build_cube():
+    """
+    返回 dict：works（作品编号，升序）、sessions（届数，升序）、regions、
+    sheets（{大区: {届数: Sheet名}}）、votes 和 share（(作品, 届, 大区) 的 float64 数组，share 为百分比）、
+    total_votes（(届, 大区)）。总票数为 0 或缺失的届 share 为 NaN。
+    """
+    long = pd.concat([part for region in REGIONS for part in _stack_region(region)], ignore_index=True)
+    long = long[long['work'].notna()]
+    votes = long.groupby(['work', 'session', 'region'])['votes'].sum()
+
+    works = sorted(long['work'].unique().tolist())
+    sessions = sorted(long['session'].unique().tolist())
+    full_index = pd.MultiIndex.from_product([works, sessions, REGIONS], names=votes.index.names)
+    shape = (len(works), len(sessions), len(REGIONS))
+    vote_arr = votes.reindex(full_index).to_numpy(dtype=np.float64).reshape(shape)
+
+    firsts = long.drop_duplicates(['region', 'session'])
+    totals = firsts.set_index(['session', 'region'])['total'].astype(float)
+    total_arr = totals.reindex(pd.MultiIndex.from_product([sessions, REGIONS])).to_numpy().reshape(shape[1:])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        share = vote_arr / total_arr[None, :, :] * 100
+    share[:, ~(total_arr > 0)] = np.nan
+
+    sheets = {region: {} for region in REGIONS}
+    for region, session, sheet in firsts[['region', 'session', 'sheet']].itertuples(index=False):
+        sheets[region][int(session)] = sheet
+    return {'works': works, 'sessions': [int(s) for s in sessions], 'regions': list(REGIONS),
+            'sheets': sheets, 'votes': vote_arr, 'share': share, 'total_votes': total_arr}
+
+
+def save_cube(cube, sources=None):
+    os.makedirs(CUBE_DIR, exist_ok=True)
+    arrays = [k for k, v in cube.items() if isinstance(v, np.ndarray)]
+    for name in arrays:
+        np.save(os.path.join(CUBE_DIR, f"{name}.npy"), cube[name])
+    # index.json 最后写入，记录生成时输入文件的哈希
+    index = {k: cube[k] for k in ('works', 'sessions', 'regions')}
+    index['sheets'] = {r: {str(s): name for s, name in m.items()} for r, m in cube['sheets'].items()}
+    index['arrays'] = arrays
+    index['sources'] = sources or _source_hashes()
+    with open(os.path.join(CUBE_DIR, 'index.json'), 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False)
+    return CUBE_DIR
+
+
+def load_cube():
+    """打开立方体（mmap，只读）；不存在或输入工作簿已变化时先重新生成"""
+    index_path = os.path.join(CUBE_DIR, 'index.json')
+    sources = _source_hashes()
+    index = None
+    if os.path.exists(index_path):
+        with open(index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    if index is None or index.get('sources') != sources:
+        save_cube(build_cube(), sources)
+        with open(index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    cube = {k: index[k] for k in ('works', 'sessions', 'regions')}
+    cube['sheets'] = {r: {int(s): name for s, name in m.items()} for r, m in index['sheets'].items()}
+    for name in index['arrays']:
+        cube[name] = np.load(os.path.join(CUBE_DIR, f"{name}.npy"), mmap_mode='r')
+    return cube
+
+
+def region_frame(cube, region, value='share'):
+    """某个大区的 作品 × 届 DataFrame（columns 为该大区的 Sheet 名，按届数排序；没有这一届的列不出现）"""
+    r = cube['regions'].index(region)
+    cols = [i for i, s in enumerate(cube['sessions']) if s in cube['sheets'][region]]
+    return pd.DataFrame(np.asarray(cube[value][:, cols, r]), index=pd.Index(cube['works'], name=WORK_COL),
+                        columns=[cube['sheets'][region][cube['sessions'][i]] for i in cols])
+
+
+def aligned_sessions(cube, offset=None):
+    """
+    对齐的 (国区届数, 日区届数) 列表：日区届数 = 国区届数 + offset，两区的届数编号并不对应同一年。
+    offset 默认为两个大区最新一届之差（国区第 11 届对日区第 20 届），与 difference.aligned_pairs() 相同
+    """
+    cn, jp = cube['sheets']['cn'], cube['sheets']['jp']
+    if offset is None:
+        offset = max(jp) - max(cn)
+    return [(n, n + offset) for n in sorted(cn) if n + offset in jp]
+
+
+def region_difference(cube, offset=None):
+    """对齐届次（见 aligned_sessions()）的 国区占比 - 日区占比（百分点），作品 × 届次组合，列名如 cn11_jp20；任一大区缺失时为 NaN"""
+    share = np.asarray(cube['share'])
+    cn, jp = cube['regions'].index('cn'), cube['regions'].index('jp')
+    col = {s: i for i, s in enumerate(cube['sessions'])}
+    pairs = aligned_sessions(cube, offset)
+    diff = np.stack([share[:, col[c], cn] - share[:, col[j], jp] for c, j in pairs], axis=1) if pairs \
+        else np.empty((len(cube['works']), 0))
+    return pd.DataFrame(diff, index=pd.Index(cube['works'], name=WORK_COL),
+                        columns=[f"cn{c}_jp{j}" for c, j in pairs])
+
+if __name__ == '__main__':
+    cube = build_cube()
+    print(f"已生成 {save_cube(cube)}：{len(cube['works'])} 个作品 × {len(cube['sessions'])} 届 × {len(REGIONS)} 个大区")
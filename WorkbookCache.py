@@ -0,0 +1,472 @@
+import hashlib
+import json
+import os
+import zipfile
+from collections.abc import Mapping
+from xml.etree import ElementTree
+
+import numpy as np
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+try:
+    import pyarrow  # noqa: F401  仅用于检测 Parquet 支持
+    HAS_PARQUET = True
+except ImportError:
+    HAS_PARQUET = False
+
+try:
+    import python_calamine  # noqa: F401  Rust 实现的 xlsx 解析器，pandas 的 engine='calamine'
+    HAS_CALAMINE = True
+except ImportError:
+    HAS_CALAMINE = False
+
+try:
+    import xlsxwriter  # noqa: F401
+    HAS_XLSXWRITER = True
+except ImportError:
+    HAS_XLSXWRITER = False
+
+# === 配置区 ===
+cache_dir = "cache_workbook"   # 列式缓存目录，每个工作簿一个子目录
+CACHE_VERSION = 1              # 缓存格式变化时递增，使旧缓存自动失效
+SESSION_COL = "_session"       # 每张表附加的届次（Sheet 名）列
+BACKEND_ENV = "TOUHOU_EXCEL_BACKEND"                       # 环境变量，强制使用某个读取后端
+BACKEND_FILE = os.path.join(cache_dir, "backends.json")    # 各工作簿基准测试结果
+STORE_SUFFIX = ".parquet"      # Parquet 优先输出：X.xlsx 对应目录 X.parquet/
+
+# 读取后端：
+#   parquet  - 本模块的列式缓存，源文件变化时用基准解析器（openpyxl）重建，内容与 openpyxl 相同
+#   calamine - python-calamine（Rust），直接解析 xlsx；个别单元格的类型或取值可能与 openpyxl 不同，
+#              只有 benchmark_readers() 验证过结果一致（或用环境变量强制指定）时才会使用
+#   openpyxl - pandas 默认引擎（以 read_only 模式流式读取），作为基准
+READERS = ["parquet", "calamine", "openpyxl"]
+REFERENCE_READER = "openpyxl"
+WRITERS = ["xlsxwriter", "openpyxl"]
+
+# 混合类型列（如票数列里夹着 '-'、'--'）无法直接写入 Parquet，
+# 这些列按单元格 JSON 编码成字符串保存，读取时还原成原来的 int/float/str
+_JSON_SAFE = (str, int, float, bool, type(None))
+
+
+def file_fingerprint(path):
+    """返回源文件的 mtime、大小和内容哈希"""
+    st = os.stat(path)
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "sha256": h.hexdigest()}
+
+
+def available_readers():
+    available = {"parquet": HAS_PARQUET, "calamine": HAS_CALAMINE, "openpyxl": True}
+    return [r for r in READERS if available[r]]
+
+
+def _parse_engine():
+    """直接解析 xlsx 时使用的引擎"""
+    return "calamine" if HAS_CALAMINE else "openpyxl"
+
+
+def read_excel(path, sheet_name=None, engine=None):
+    """不经缓存直接解析 xlsx，参数同 pd.read_excel；engine 默认优先 calamine"""
+    return pd.read_excel(path, sheet_name=sheet_name, engine=engine or _parse_engine())
+
+
+def _cache_paths(path):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    tag = hashlib.md5(os.path.abspath(path).encode('utf-8')).hexdigest()[:8]
+    book_dir = os.path.join(cache_dir, f"{stem}-{tag}")
+    return book_dir, os.path.join(book_dir, "manifest.json")
+
+
+def _read_manifest(manifest_path):
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if manifest.get("version") != CACHE_VERSION:
+        return None
+    return manifest
+
+
+def _write_manifest(manifest_path, manifest):
+    tmp = f"{manifest_path}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, manifest_path)
+
+
+def _is_fresh(path, manifest):
+    """先比较 mtime/大小，不一致时再比较内容哈希（例如 git checkout 后 mtime 变了但内容没变）"""
+    if manifest is None:
+        return False
+    st = os.stat(path)
+    src = manifest["source"]
+    if src["mtime_ns"] == st.st_mtime_ns and src["size"] == st.st_size:
+        return True
+    fp = file_fingerprint(path)
+    if fp["sha256"] != src["sha256"]:
+        return False
+    manifest["source"] = fp
+    _write_manifest(_cache_paths(path)[1], manifest)
+    return True
+
+
+def _encode_sheet(sheet, df):
+    """转换为可写入 Parquet 的表，返回 (表, 该表的元信息)；无法无损编码时返回 (None, None)"""
+    out = pd.DataFrame(index=df.index)
+    json_cols = []
+    for i, col in enumerate(df.columns):
+        s = df[col]
+        if s.dtype == object and not s.map(lambda v: isinstance(v, str) or v is None or v != v).all():
+            if not s.map(lambda v: isinstance(v, _JSON_SAFE)).all():
+                return None, None
+            s = s.map(json.dumps)
+            json_cols.append(i)
+        out[f"c{i}"] = s
+    out[SESSION_COL] = sheet
+    meta = {"name": sheet, "columns": list(df.columns), "json_columns": json_cols}
+    return out.reset_index(drop=True), meta
+
+
+def _decode_sheet(table, meta):
+    table = table.drop(columns=[SESSION_COL])
+    for i in meta["json_columns"]:
+        # 整列拼成一个 JSON 数组一次解析，比逐个单元格 json.loads 快得多
+        values = json.loads('[' + ','.join(table[f"c{i}"]) + ']')
+        table[f"c{i}"] = pd.Series(values, index=table.index, dtype=object)
+    # Parquet 把字符串列里的 NaN 读回为 None，这里还原成 read_excel 的 NaN
+    for col in table.columns:
+        if table[col].dtype == object and table[col].isna().any():
+            table[col] = table[col].where(table[col].notna(), np.nan)
+    table.columns = meta["columns"]
+    return table
+
+
+def _build_cache(path):
+    book_dir, manifest_path = _cache_paths(path)
+    fp = file_fingerprint(path)
+    sheets = read_excel(path, engine=REFERENCE_READER)
+    os.makedirs(book_dir, exist_ok=True)
+    metas = []
+    for idx, (sheet, df) in enumerate(sheets.items()):
+        table, meta = _encode_sheet(sheet, df)
+        if table is None:
+            # 含日期等特殊类型，放弃缓存，直接返回解析结果
+            print(f"警告：'{path}' 的 Sheet '{sheet}' 含无法缓存的数据类型，本次不建立缓存")
+            return sheets
+        meta["file"] = f"{idx}.parquet"
+        # 先写临时文件再替换，多个进程同时建立同一缓存时不会读到写了一半的文件
+        target = os.path.join(book_dir, meta["file"])
+        table.to_parquet(f"{target}.{os.getpid()}.tmp", index=False)
+        os.replace(f"{target}.{os.getpid()}.tmp", target)
+        metas.append(meta)
+    _write_manifest(manifest_path, {"version": CACHE_VERSION, "reader": REFERENCE_READER, "source": fp, "sheets": metas})
+    return sheets
+
+
+def _read_benchmarks():
+    try:
+        with open(BACKEND_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def preferred_reader(path):
+    """
+    选择读取后端：环境变量 TOUHOU_EXCEL_BACKEND > 基准测试记录的最快后端 > parquet（可用时）> openpyxl。
+    未经基准测试验证的 calamine 不会被自动选用
+    """
+    available = available_readers()
+    forced = os.environ.get(BACKEND_ENV)
+    if forced:
+        if forced not in available:
+            raise ValueError(f"读取后端 '{forced}' 不可用，可选：{available}")
+        return forced
+    record = _read_benchmarks().get(os.path.basename(_cache_paths(path)[0]))
+    if record and record.get("best") in available:
+        return record["best"]
+    return "parquet" if "parquet" in available else REFERENCE_READER
+
+
+def _read_parquet_sheets(book_dir, manifest, sheet_names=None):
+    sheets = {}
+    for meta in manifest["sheets"]:
+        if sheet_names is not None and meta["name"] not in sheet_names:
+            continue
+        table = pd.read_parquet(os.path.join(book_dir, meta["file"]))
+        sheets[meta["name"]] = _decode_sheet(table, meta)
+    return sheets
+
+
+def _load_cached(path, sheet_names=None):
+    book_dir, manifest_path = _cache_paths(path)
+    manifest = _read_manifest(manifest_path)
+    if manifest is not None and manifest.get("reader") != REFERENCE_READER:
+        manifest = None  # 旧版本用 calamine 建立的缓存，重建
+    if _is_fresh(path, manifest):
+        return _read_parquet_sheets(book_dir, manifest, sheet_names)
+    sheets = _build_cache(path)
+    if sheet_names is not None:
+        sheets = {k: v for k, v in sheets.items() if k in sheet_names}
+    return sheets
+
+
+def load_workbook(path, sheet_names=None, backend=None):
+    """
+    读取工作簿的全部 Sheet，返回 {Sheet名: DataFrame}，与 pd.read_excel(path, sheet_name=None) 一致。
+    parquet 后端首次读取时把每个 Sheet 转存为 Parquet，之后源文件未变化时直接读缓存。
+    sheet_names 可只读取其中部分 Sheet；backend 为 None 时按 preferred_reader() 选择。
+    若存在比 xlsx 新的 Parquet 优先输出（X.parquet/），直接从中读取。
+    """
+    if store_is_current(path):
+        return read_store(path, sheet_names)
+    backend = backend or preferred_reader(path)
+    if backend == "parquet":
+        return _load_cached(path, sheet_names)
+    if sheet_names is None:
+        return read_excel(path, engine=backend)
+    # 只解析需要的 Sheet，并保持工作簿中的顺序
+    order = pd.ExcelFile(path, engine=backend).sheet_names
+    return read_excel(path, [n for n in order if n in sheet_names], engine=backend)
+
+
+def load_sheet(path, sheet_name=0, backend=None):
+    """读取单个 Sheet，sheet_name 可以是名称或序号（-1 表示最后一个）"""
+    if isinstance(sheet_name, int):
+        sheet_name = list_sheets(path)[sheet_name]
+    sheets = load_workbook(path, [sheet_name], backend)
+    if sheet_name not in sheets:
+        raise ValueError(f"Worksheet named '{sheet_name}' not found")
+    return sheets[sheet_name]
+
+
+def list_sheets(path):
+    """按工作簿中的顺序返回 Sheet 名，只读取 xlsx 压缩包里的 xl/workbook.xml，不解析表格内容"""
+    if store_is_current(path):
+        return [meta["name"] for meta in _read_store_manifest(path)["sheets"]]
+    with zipfile.ZipFile(path) as zf:
+        root = ElementTree.fromstring(zf.read("xl/workbook.xml"))
+    return [el.get("name") for el in root.iter() if el.tag.rsplit('}', 1)[-1] == "sheet"]
+
+
+class LazyWorkbook(Mapping):
+    """
+    与 load_workbook() 的结果用法相同的只读映射，但每次取值时才读取对应的 Sheet，且不保留在内存中，
+    适合逐个 Sheet 处理的大工作簿。
+    """
+
+    def __init__(self, path, backend=None):
+        self.path = path
+        self.backend = backend
+        self._names = list_sheets(path)
+
+    def __getitem__(self, sheet_name):
+        if sheet_name not in self._names:
+            raise KeyError(sheet_name)
+        return load_workbook(self.path, [sheet_name], self.backend)[sheet_name]
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __len__(self):
+        return len(self._names)
+
+
+def open_workbook(path, backend=None):
+    return LazyWorkbook(path, backend)
+
+
+def write_workbook(path, sheets, engine=None):
+    """把 {Sheet名: DataFrame} 写成 xlsx（不含索引），engine 默认优先 xlsxwriter"""
+    engine = engine or ("xlsxwriter" if HAS_XLSXWRITER else "openpyxl")
+    with pd.ExcelWriter(path, engine=engine) as writer:
+        for sheet_name, df in sheets.items():
+            df.to_excel(writer, sheet_name=sheet_name, index=False)
+
+
+def _sheet_rows(df):
+    """表头和各行的 Python 原生值，缺失值为 None（写出为空单元格，与 to_excel 相同）"""
+    yield df.columns.tolist()
+    values = df.astype(object).where(df.notna(), None)
+    yield from values.itertuples(index=False, name=None)
+
+
+def write_workbook_streaming(path, sheets):
+    """
+    逐个 Sheet、逐行写出 xlsx，sheets 为 (Sheet名, DataFrame) 的可迭代对象（可以是生成器）。
+    使用 xlsxwriter 的 constant_memory 模式（每写完一行即落盘），未安装时使用 openpyxl 的 write_only 模式，
+    内存占用只与当前 Sheet 有关。先写临时文件再替换，因此生成器可以读取旧的 path。
+    pandas 的 to_excel 按列写单元格，不能用于 constant_memory 模式，所以这里自己按行写。
+    """
+    tmp = f"{os.path.splitext(path)[0]}.{os.getpid()}.tmp.xlsx"
+    if HAS_XLSXWRITER:
+        wb = xlsxwriter.Workbook(tmp, {"constant_memory": True})
+        for sheet_name, df in sheets:
+            ws = wb.add_worksheet(sheet_name)
+            for r, row in enumerate(_sheet_rows(df)):
+                ws.write_row(r, 0, row)
+        wb.close()
+    else:
+        import openpyxl
+        wb = openpyxl.Workbook(write_only=True)
+        for sheet_name, df in sheets:
+            ws = wb.create_sheet(sheet_name)
+            for row in _sheet_rows(df):
+                ws.append(row)
+        wb.save(tmp)
+    os.replace(tmp, path)
+
+
+# === Parquet 优先输出 ===
+# 分组结果可以不写 xlsx，而是写到 X.parquet/ 目录（每个 Sheet 一个 Parquet 文件 + manifest.json），
+# 需要时再用 export_store() 导出成 X.xlsx。load_workbook(X.xlsx) 会优先读取比 xlsx 新的目录。
+
+def store_path(path):
+    return os.path.splitext(path)[0] + STORE_SUFFIX
+
+
+def _read_store_manifest(path):
+    return _read_manifest(os.path.join(store_path(path), "manifest.json"))
+
+
+def store_is_current(path):
+    """存在 Parquet 输出，且 xlsx 不存在或比它旧"""
+    manifest_path = os.path.join(store_path(path), "manifest.json")
+    if not os.path.exists(manifest_path) or _read_store_manifest(path) is None:
+        return False
+    return not os.path.exists(path) or os.path.getmtime(manifest_path) >= os.path.getmtime(path)
+
+
+def read_store(path, sheet_names=None):
+    return _read_parquet_sheets(store_path(path), _read_store_manifest(path), sheet_names)
+
+
+def _as_read_back(df):
+    """
+    得到 df 写入 xlsx 再用 read_excel 读回的结果（不实际写文件）：
+    与 xlsx 读取器一样把整数值的浮点数转为 int、缺失值转为空串，再交给 pandas 的 TextParser 推断各列类型。
+    这样 Parquet 优先输出读出的内容与导出 xlsx 后读到的完全一致。
+    """
+    def cell(v):
+        if v is None or (isinstance(v, float) and v != v):
+            return ''
+        if isinstance(v, float) and v.is_integer():
+            return int(v)
+        return v
+
+    rows = [df.columns.tolist()]
+    rows.extend([cell(v) for v in row] for row in df.astype(object).itertuples(index=False, name=None))
+    return TextParser(rows, header=0).read()
+
+
+def write_store(path, sheets):
+    """
+    写出 Parquet 优先输出。sheets 为 (Sheet名, 内容键, DataFrame 或 None) 的可迭代对象：
+    文件以内容键命名，DataFrame 为 None 表示内容未变，沿用上次写出的同名文件。
+    manifest 最后原子替换，不再引用的文件随后删除。
+    """
+    out_dir = store_path(path)
+    os.makedirs(out_dir, exist_ok=True)
+    old = {meta["file"]: meta for meta in (_read_store_manifest(path) or {"sheets": []})["sheets"]}
+    metas = []
+    for sheet, key, df in sheets:
+        file = f"{key}.parquet"
+        if df is None:
+            if file not in old:
+                raise ValueError(f"'{out_dir}' 中没有 Sheet '{sheet}' 的旧文件，无法沿用")
+            metas.append(dict(old[file], name=sheet))
+            continue
+        table, meta = _encode_sheet(sheet, _as_read_back(df))
+        if table is None:
+            raise ValueError(f"Sheet '{sheet}' 含无法写入 Parquet 的数据类型")
+        target = os.path.join(out_dir, file)
+        table.to_parquet(f"{target}.{os.getpid()}.tmp", index=False)
+        os.replace(f"{target}.{os.getpid()}.tmp", target)
+        meta["file"] = file
+        metas.append(meta)
+    _write_manifest(os.path.join(out_dir, "manifest.json"), {"version": CACHE_VERSION, "sheets": metas})
+    referenced = {meta["file"] for meta in metas}
+    for name in os.listdir(out_dir):
+        if name.endswith(".parquet") and name not in referenced:
+            os.remove(os.path.join(out_dir, name))
+    return out_dir
+
+
+def export_store(path):
+    """把 X.parquet/ 逐个 Sheet 流式导出为 X.xlsx"""
+    manifest = _read_store_manifest(path)
+    if manifest is None:
+        raise FileNotFoundError(f"没有找到 '{store_path(path)}'")
+    book_dir = store_path(path)
+    write_workbook_streaming(path, (
+        (meta["name"], _read_parquet_sheets(book_dir, {"sheets": [meta]})[meta["name"]])
+        for meta in manifest["sheets"]))
+
+
+def benchmark_readers(path, repeat=3):
+    """
+    在本机上比较各读取后端读取整个工作簿的耗时（取 repeat 次中的最小值），
+    结果写入 cache_workbook/backends.json，之后 preferred_reader() 会选择其中最快的。
+    parquet 后端测的是缓存已建立后的读取时间。结果与基准解析器（openpyxl）不一致的后端不参与选择。
+    """
+    import time
+
+    reference = read_excel(path, engine=REFERENCE_READER)
+    timings = {}
+    for backend in available_readers():
+        if backend == "parquet":
+            _load_cached(path)  # 先建立缓存
+        best = float("inf")
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            sheets = load_workbook(path, backend=backend)
+            best = min(best, time.perf_counter() - t0)
+        if list(sheets) != list(reference) or not all(sheets[k].equals(reference[k]) for k in reference):
+            print(f"警告：'{path}' 用 {backend} 读取的结果与 {REFERENCE_READER} 不一致，不参与选择")
+            continue
+        timings[backend] = best
+
+    record = {"size": os.path.getsize(path), "seconds": timings, "best": min(timings, key=timings.get)}
+    os.makedirs(cache_dir, exist_ok=True)
+    records = _read_benchmarks()
+    records[os.path.basename(_cache_paths(path)[0])] = record
+    tmp = f"{BACKEND_FILE}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(records, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, BACKEND_FILE)
+    return record
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="预热工作簿缓存，或比较各读取后端的速度")
+    parser.add_argument('paths', nargs='*', help="xlsx 文件，默认为当前目录下所有工作簿")
+    parser.add_argument('--benchmark', action='store_true', help="测试各读取后端并记录每个工作簿最快的一个")
+    parser.add_argument('--export', action='store_true', help="把 X.parquet/ 形式的分组结果导出为 X.xlsx")
+    args = parser.parse_args()
+
+    if args.export and not args.paths:
+        paths = sorted(d[:-len(STORE_SUFFIX)] + '.xlsx' for d in os.listdir('.')
+                       if d.endswith(STORE_SUFFIX) and os.path.isdir(d))
+    else:
+        paths = args.paths or sorted(p for p in os.listdir('.') if p.endswith('.xlsx'))
+    for p in paths:
+        if args.export:
+            export_store(p)
+            print(f"已导出 {p}")
+            continue
+        if args.benchmark:
+            record = benchmark_readers(p)
+            detail = ", ".join(f"{k} {v * 1000:.1f} ms" for k, v in record["seconds"].items())
+            print(f"{p}: {detail} -> {record['best']}")
+            continue
+        t0 = time.perf_counter()
+        load_workbook(p)
+        print(f"{p}: {(time.perf_counter() - t0) * 1000:.1f} ms")
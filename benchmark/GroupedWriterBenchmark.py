@@ -0,0 +1,70 @@
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+# 从仓库根目录导入（python benchmark/GroupedWriterBenchmark.py）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from WorkbookCache import load_workbook, write_workbook_streaming
+
+# 对比分组结果的两种写法在届数增多时的峰值内存（tracemalloc）和耗时：
+#   原写法：所有 Sheet 先放进 processed_sheets 字典，再用 openpyxl 的 ExcelWriter 一次写出
+#   流式写：每个 Sheet 处理完立即按行写出（xlsxwriter constant_memory / openpyxl write_only）
+# 把 TouhouVote_music_cn.xlsx 的 Sheet 重复 SCALE 倍模拟更多的届数。
+SOURCE = 'TouhouVote_music_cn.xlsx'
+SCALES = [1, 4, 8]
+
+
+def scaled_names(sheets, scale):
+    return [(f"{name}_{i}" if i else name, name) for i in range(scale) for name in sheets]
+
+
+def process(df):
+    """代替实际的合并：复制一份并追加一列，产生与合并相当的新 DataFrame"""
+    merged = df.copy()
+    merged['所属角色'] = merged['译名']
+    return merged
+
+
+def write_dict(path, sheets, scale):
+    processed_sheets = {}
+    for new_name, name in scaled_names(sheets, scale):
+        processed_sheets[new_name] = process(sheets[name])
+    with pd.ExcelWriter(path, engine="openpyxl") as writer:
+        for sheet_name, df in processed_sheets.items():
+            df.to_excel(writer, sheet_name=sheet_name, index=False)
+
+
+def write_stream(path, sheets, scale):
+    write_workbook_streaming(path, ((new_name, process(sheets[name])) for new_name, name in scaled_names(sheets, scale)))
+
+
+def measure(fn, *args):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    fn(*args)
+    elapsed = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak, elapsed
+
+
+if __name__ == '__main__':
+    sheets = load_workbook(SOURCE)
+    print(f"{'倍数':>4} {'Sheet数':>8} {'原写法峰值(MB)':>14} {'流式峰值(MB)':>12} {'原写法(s)':>10} {'流式(s)':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in SCALES:
+            old_path = os.path.join(tmp, f"dict_{scale}.xlsx")
+            new_path = os.path.join(tmp, f"stream_{scale}.xlsx")
+            peak_old, t_old = measure(write_dict, old_path, sheets, scale)
+            peak_new, t_new = measure(write_stream, new_path, sheets, scale)
+            if scale == 1:
+                a = pd.read_excel(old_path, sheet_name=None)
+                b = pd.read_excel(new_path, sheet_name=None)
+                if list(a) != list(b) or not all(a[k].equals(b[k]) for k in a):
+                    raise SystemExit("两种写法读回的内容不一致")
+            print(f"{scale:>4} {len(sheets) * scale:>8} {peak_old / 2**20:>14.1f} {peak_new / 2**20:>12.1f} "
+                  f"{t_old:>10.2f} {t_new:>8.2f}")
@@ -0,0 +1,61 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+# 从仓库根目录导入（python benchmark/PageCacheBenchmark.py，在仓库根目录下运行）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from PageCache import LEGACY_TEXT_DIR, PageCache, migrate_legacy, _thbwiki_candidates, url_key
+
+# 对比原来的文件缓存（每个 URL 一次 os.path.exists + open().read()）与 SQLite 缓存（get_many 一次查询），
+# 页面为 cache_data/ 中的全部页面；另记录导入耗时、按角色名批量读取（pages_for_names）的耗时和占用空间。
+REPEAT = 5
+
+
+def read_files(urls, cache_dir=LEGACY_TEXT_DIR):
+    texts = {}
+    for url in urls:
+        path = os.path.join(cache_dir, f"{url_key(url)}.txt")
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                texts[url] = f.read()
+    return texts
+
+
+def best_of(fn, *args):
+    best = float('inf')
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return result, best
+
+
+if __name__ == '__main__':
+    candidates = _thbwiki_candidates()
+    urls = [candidates[f[:-4]] for f in sorted(os.listdir(LEGACY_TEXT_DIR)) if f[:-4] in candidates]
+    files_size = sum(os.path.getsize(os.path.join(LEGACY_TEXT_DIR, f)) for f in os.listdir(LEGACY_TEXT_DIR))
+
+    tmp = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmp, 'page_cache.sqlite')
+        cache = PageCache(path, migrate=False)
+        t0 = time.perf_counter()
+        migrate_legacy(cache)
+        print(f"导入 cache_data/ 和 cache/：{time.perf_counter() - t0:.2f}s，"
+              f"{len(os.listdir(LEGACY_TEXT_DIR))} 个文件 {files_size / 1e6:.1f} MB -> "
+              f"数据库 {os.path.getsize(path) / 1e6:.1f} MB（含 cache/）")
+
+        expected, t_files = best_of(read_files, urls)
+        texts, t_db = best_of(cache.get_many, urls)
+        print(f"{len(urls)} 个页面：逐个读文件 {t_files * 1000:.1f} ms，get_many {t_db * 1000:.1f} ms，"
+              f"结果一致 {'是' if texts == expected else '否'}")
+
+        names = sorted({cache._conn().execute('SELECT name FROM pages WHERE key = ?', (url_key(u),)).fetchone()[0]
+                        for u in urls})
+        pages, t_names = best_of(cache.pages_for_names, names, 'thbwiki.cc')
+        print(f"pages_for_names（{len(names)} 个角色）：{t_names * 1000:.1f} ms，"
+              f"{sum(map(len, pages.values()))} 个页面")
+    finally:
+        shutil.rmtree(tmp)
@@ -0,0 +1,110 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# 从仓库根目录导入（python benchmark/PageFetcherBenchmark.py）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from PageCache import PageCache
+from PageFetcher import PageFetcher, default_retry
+
+# 用本地 HTTP 服务代替 thbwiki（每个请求延迟 LATENCY 秒，每 FAIL_EVERY 个页面第一次请求返回 503），
+# 在空缓存下比较：原来的逐个请求、PageFetcher 不限速、PageFetcher 限速 RATE 次/秒，
+# 并检查结果一致、限速生效（任意 1 秒内的请求数不超过 RATE + BURST）、503 被重试。
+N_PAGES = 200
+LATENCY = 0.05
+FAIL_EVERY = 10
+WORKERS = 16
+RATE = 40
+BURST = 5
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.times.append(time.monotonic())
+            attempts = server.attempts[self.path] = server.attempts.get(self.path, 0) + 1
+        time.sleep(LATENCY)
+        page = int(self.path.rsplit('/', 1)[-1])
+        if page % FAIL_EVERY == 0 and attempts == 1:
+            status, body = 503, b'busy'
+        else:
+            status, body = 200, f"<html><body>{unquote(self.path)}</body></html>".encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stand_in():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.reset = lambda: (server.times.clear(), server.attempts.clear())
+    server.times, server.attempts = [], {}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def serial_fetch(urls):
+    """原来的做法：一个 Session，逐个请求"""
+    session = requests.Session()
+    adapter = HTTPAdapter(max_retries=default_retry())
+    session.mount('http://', adapter)
+    texts = {}
+    for url in urls:
+        r = session.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=10)
+        r.raise_for_status()
+        texts[url] = r.text
+    return texts
+
+
+def max_per_second(times):
+    times = sorted(times)
+    best, lo = 0, 0
+    for hi, t in enumerate(times):
+        while t - times[lo] >= 1.0:
+            lo += 1
+        best = max(best, hi - lo + 1)
+    return best
+
+
+if __name__ == '__main__':
+    server = start_stand_in()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/"
+    urls = [f"{base_url}角色/{i}" for i in range(N_PAGES)]
+    print(f"{N_PAGES} 个页面，每个请求延迟 {LATENCY * 1000:.0f} ms，每 {FAIL_EVERY} 个页面首次请求返回 503")
+
+    t0 = time.perf_counter()
+    expected = serial_fetch(urls)
+    print(f"逐个请求：{time.perf_counter() - t0:.2f}s，请求数 {len(server.times)}")
+
+    for label, rate, burst in [(f"PageFetcher（{WORKERS} 线程，不限速）", 1e6, 1e6),
+                               (f"PageFetcher（{WORKERS} 线程，{RATE} 次/秒）", RATE, BURST)]:
+        server.reset()
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = PageCache(os.path.join(tmp, 'page_cache.sqlite'), migrate=False)
+            fetcher = PageFetcher(base_url, cache, max_workers=WORKERS, rate=rate, burst=burst,
+                                  parse=None, progress=False)
+            t0 = time.perf_counter()
+            texts = fetcher.fetch_all(urls)
+            elapsed = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            cached = fetcher.fetch_all(urls)
+            warm = time.perf_counter() - t0
+        retried = sum(n > 1 for n in server.attempts.values())
+        print(f"{label}：{elapsed:.2f}s，缓存后 {warm * 1000:.1f} ms，结果一致 {'是' if texts == expected == cached else '否'}，"
+              f"重试的页面 {retried}，任意 1 秒内最多 {max_per_second(server.times)} 个请求")
+    server.shutdown()
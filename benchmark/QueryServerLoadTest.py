@@ -0,0 +1,104 @@
+import argparse
+import http.client
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote, urlsplit
+
+import numpy as np
+
+# 从仓库根目录导入（python benchmark/QueryServerLoadTest.py）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from QueryServer import VoteIndex, start_server
+
+# QueryServer.py 的并发压测：多个线程各自保持一个连接，按随机的查询组合（角色占比、前 k 名、tag）发送请求，
+# 统计客户端看到的吞吐量和延迟分位数（p50/p90/p99），最后附上服务端 /stats 的统计。
+# 默认在本进程内启动一个服务实例；--url 可以指向已经运行的服务。
+CONCURRENCY = [1, 4, 16]
+REQUESTS = 2000
+
+
+def query_mix(index, n, seed=0):
+    """随机生成 n 个查询路径"""
+    rng = random.Random(seed)
+    characters = [name for name, info in index.characters.items() if info['sessions']]
+    tags = sorted({tag for by_tag in index.tag_heat.values() for tag in by_tag})
+    paths = []
+    for _ in range(n):
+        kind = rng.random()
+        if kind < 0.5:
+            name = rng.choice(characters)
+            sessions = list(index.characters[name]['sessions'])
+            paths.append(f"/share?character={quote(name)}&session={rng.choice(sessions)}")
+        elif kind < 0.75:
+            paths.append(f"/topk?session={rng.choice(index.sessions)}&k={rng.choice([7, 15, 30])}")
+        elif kind < 0.9:
+            region = rng.choice(list(index.tag_ranks))
+            session = rng.choice(list(index.tag_ranks[region]))
+            paths.append(f"/tags?region={region}&session={session}&top={rng.choice([10, 15, 30])}")
+        else:
+            paths.append(f"/tag?name={quote(rng.choice(tags))}")
+    return paths
+
+
+def worker(base_url, paths):
+    url = urlsplit(base_url)
+    conn = http.client.HTTPConnection(url.hostname, url.port, timeout=30)
+    latencies = []
+    errors = 0
+    for path in paths:
+        t0 = time.perf_counter()
+        conn.request('GET', path)
+        response = conn.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - t0)
+        errors += response.status != 200
+    conn.close()
+    return latencies, errors
+
+
+def run(base_url, paths, concurrency):
+    chunks = [paths[i::concurrency] for i in range(concurrency)]
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(lambda chunk: worker(base_url, chunk), chunks))
+    elapsed = time.perf_counter() - t0
+    latencies = np.array([t for lat, _ in results for t in lat]) * 1000
+    errors = sum(e for _, e in results)
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+    return len(latencies) / elapsed, p50, p90, p99, latencies.max(), errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="QueryServer.py 并发压测")
+    parser.add_argument('--url', help="已运行的服务地址（默认在本进程内启动）")
+    parser.add_argument('-n', '--requests', type=int, default=REQUESTS, help="每轮的请求数")
+    parser.add_argument('-c', '--concurrency', type=int, nargs='+', default=CONCURRENCY, help="并发连接数（可多个）")
+    parser.add_argument('--cache-size', type=int, default=4096, help="本进程内启动的服务的 LRU 缓存大小（0 为不缓存）")
+    args = parser.parse_args()
+
+    index = VoteIndex.load()
+    server = None
+    if args.url:
+        base_url = args.url.rstrip('/')
+    else:
+        server, base_url = start_server(index=index, cache_size=args.cache_size)
+    paths = query_mix(index, args.requests)
+
+    print(f"服务: {base_url}，每轮 {len(paths)} 个请求")
+    print(f"{'并发':>4} {'吞吐(req/s)':>12} {'p50(ms)':>8} {'p90(ms)':>8} {'p99(ms)':>8} {'max(ms)':>8} {'错误':>4}")
+    for concurrency in args.concurrency:
+        rate, p50, p90, p99, worst, errors = run(base_url, paths, concurrency)
+        print(f"{concurrency:>4} {rate:>12.0f} {p50:>8.2f} {p90:>8.2f} {p99:>8.2f} {worst:>8.2f} {errors:>4}")
+
+    conn = http.client.HTTPConnection(urlsplit(base_url).hostname, urlsplit(base_url).port)
+    conn.request('GET', '/stats')
+    print(f"服务端统计: {conn.getresponse().read().decode('utf-8')}")
+    if server is not None:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
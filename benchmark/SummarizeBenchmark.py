@@ -0,0 +1,282 @@
+import json
+import os
+import re
+import sys
+import time
+
+import pandas as pd
+
+# 从仓库根目录导入（python benchmark/SummarizeBenchmark.py）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import SummarizeAllData
+from SessionCatalog import sheet_total
+from SummarizeAllData import strip_columns
+from WorkbookCache import load_workbook
+
+# 对比 SummarizeAllData.py 的列式实现与原来逐行 iterrows 的实现：
+# 把每个工作簿的 Sheet 复制成 SCALE 倍的届数，分别计时并确认输出的 JSON 完全一致。
+SCALES = [1, 4, 16]
+REPEAT = 3
+
+
+# === 原实现（逐行 iterrows），仅作为基准和正确性对照 ===
+def to_int(val):
+    try:
+        if pd.isna(val): return None
+        return int(val)
+    except:
+        return None
+
+def to_float(val):
+    try:
+        if pd.isna(val): return None
+        return float(val)
+    except:
+        return None
+
+def clean_str(val):
+    if val is None or (isinstance(val, float) and pd.isna(val)): return None
+    if isinstance(val, float) and val.is_integer(): return str(int(val))
+    return str(val).strip()
+
+parse_session = SummarizeAllData.parse_session
+
+def legacy_build_data(books):
+    data = {
+        "meta": {"missing_gender": ["3_jp", "4_jp"], "jp_sessions": [], "cn_sessions": []},
+        "characters": {},
+        "songs": {},
+        "gender": {},
+        "indexes": {"by_work": {}, "by_session": {}}
+    }
+
+    # --- JP Character Sessions ---
+    for sheet, df in books['jp_grouped'].items():
+        sess = parse_session(sheet, 'jp')
+        data['meta']['jp_sessions'].append(sess)
+        df.columns = df.columns.str.strip()
+        data['indexes']['by_session'][sess] = {'chars': [], 'songs': [], 'extra_works': []}
+        for _, r in df.iterrows():
+            tr = r.get('译名')
+            if pd.isna(tr): continue
+            tr = str(tr).strip()
+            jp_name = None if pd.isna(r.get('日文名')) else str(r.get('日文名')).strip()
+            cid = re.sub(r"\W+", "", tr).lower()
+            fa = clean_str(r.get('首次出现作品'))
+            if tr not in data['characters']:
+                data['characters'][tr] = {'id': cid, 'jp_name': jp_name, 'first_appear': fa, 'keywords': [], 'sessions': {}}
+                if fa: data['indexes']['by_work'].setdefault(fa, []).append(tr)
+            stats = {
+                'r': to_int(r.get('名次')),
+                'prev_r': to_int(r.get('上回名次')),
+                'prev2_r': to_int(r.get('上上回名次')),
+                'v': to_int(r.get('票数')),
+                'bnum': to_int(r.get('本名票数')),
+                'comments': to_int(r.get('评论数')),
+                'support': to_int(r.get('应援作品数'))
+            }
+            data['characters'][tr]['sessions'][sess] = stats
+            data['indexes']['by_session'][sess]['chars'].append(tr)
+        extra = re.findall(r"\(([^)]+)\)", sheet)
+        if extra: data['indexes']['by_session'][sess]['extra_works'] = extra[0].split('、')
+
+    # --- JP Total Votes ---
+    for sheet, df in books['jp_full'].items():
+        sess = parse_session(sheet, 'jp')
+        if sess not in data['meta']['jp_sessions']: continue
+        df.columns = df.columns.str.strip()
+        tot = df['票数'].apply(to_int).dropna().sum()
+        data['indexes']['by_session'][sess]['total_votes'] = int(tot) if tot is not None else None
+
+    # --- CN Character Sessions ---
+    for sheet, df in books['cn_grouped'].items():
+        sess = parse_session(sheet, 'cn')
+        data['meta']['cn_sessions'].append(sess)
+        df.columns = df.columns.str.strip()
+        data['indexes']['by_session'][sess] = {'chars': [], 'songs': []}
+        for _, r in df.iterrows():
+            tr = r.get('译名');
+            if pd.isna(tr): continue
+            tr = str(tr).strip()
+            if tr not in data['characters']:
+                fa = clean_str(r.get('首次出现作品'))
+                data['characters'][tr] = {'id': re.sub(r"\W+", "", tr).lower(), 'jp_name': None, 'first_appear': fa, 'keywords': [], 'sessions': {}}
+                if fa: data['indexes']['by_work'].setdefault(fa, []).append(tr)
+            stats = {
+                'r': to_int(r.get('名次')),
+                'v': to_int(r.get('票数')),
+                'bnum': to_int(r.get('本命数')),
+                'brate': to_float(r.get('本命率')),
+                'bw': to_float(r.get('本命加权')),
+                'v_pct': to_float(r.get('票数占比')),
+                'b_pct': to_float(r.get('本命占比')),
+                'male_pct': to_float(r.get('男性比例')),
+                'female_pct': to_float(r.get('女性比例'))
+            }
+            data['characters'][tr]['sessions'][sess] = stats
+            data['indexes']['by_session'][sess]['chars'].append(tr)
+
+    # --- CN Total Votes ---
+    for sheet, df in books['cn_full'].items():
+        sess = parse_session(sheet, 'cn')
+        if sess not in data['meta']['cn_sessions']: continue
+        df.columns = df.columns.str.strip()
+        tot = df['票数'].apply(to_int).dropna().sum()
+        data['indexes']['by_session'][sess]['total_votes'] = int(tot) if tot is not None else None
+
+    # --- JP Music Sessions ---
+    for sheet, df in books['music_jp_grouped'].items():
+        sess = parse_session(sheet, 'jp')
+        idx = data['indexes']['by_session'].setdefault(sess, {'chars': [], 'songs': []})
+        df.columns = df.columns.str.strip()
+        for _, r in df.iterrows():
+            st = r.get('译名');
+            if pd.isna(st): continue
+            st = str(st).strip(); song_jp = None if pd.isna(r.get('曲目')) else str(r.get('曲目')).strip()
+            chars = [] if pd.isna(r.get('所属角色')) else [c.strip() for c in str(r.get('所属角色')).split('|')]
+            if st not in data['songs']:
+                data['songs'][st] = {'t': song_jp, 'tr_t': st, 'chars': [], 'sessions': {}}
+            for c in chars:
+                if c not in data['songs'][st]['chars']: data['songs'][st]['chars'].append(c)
+            stats = {
+                'r': to_int(r.get('排名')),
+                'prev_r': to_int(r.get('上回名次')),
+                'prev2_r': to_int(r.get('上上回名次')),
+                'v': to_int(r.get('得票数')),
+                'main_v': to_int(r.get('本名票数')),
+                'comments': to_int(r.get('评论数'))
+            }
+            data['songs'][st]['sessions'][sess] = stats
+            idx['songs'].append(st)
+
+    # --- JP Music Total Votes ---
+    for sheet, df in books['music_jp_full'].items():
+        sess = parse_session(sheet, 'jp')
+        if sess not in data['indexes']['by_session']: continue
+        df.columns = df.columns.str.strip()
+        tot = df['得票数'].apply(to_int).dropna().sum()
+        data['indexes']['by_session'][sess]['total_song_votes'] = int(tot) if tot is not None else None
+
+    # --- CN Music Sessions ---
+    for sheet, df in books['music_cn_grouped'].items():
+        sess = parse_session(sheet, 'cn')
+        idx = data['indexes']['by_session'].setdefault(sess, {'chars': [], 'songs': []})
+        df.columns = df.columns.str.strip()
+        for _, r in df.iterrows():
+            st = r.get('译名');
+            if pd.isna(st): continue
+            st = str(st).strip()
+            if st not in data['songs']: data['songs'][st] = {'t': None, 'tr_t': st, 'chars': [], 'sessions': {}}
+            stats = {
+                'r': to_int(r.get('名次')),
+                'v': to_int(r.get('票数')),
+                'bnum': to_int(r.get('本命数')),
+                'brate': to_float(r.get('本命率')),
+                'bw': to_float(r.get('本命加权')),
+                'v_pct': to_float(r.get('票数占比')),
+                'b_pct': to_float(r.get('本命占比')),
+                'male': to_int(r.get('男性')),
+                'male_pct': to_float(r.get('男性比')),
+                'male_total_pct': to_float(r.get('占总数')),
+                'female': to_int(r.get('女性')),
+                'female_pct': to_float(r.get('女性比')),
+                'female_total_pct': to_float(r.get('占总数.1')),
+                'bias_orig': to_int(r.get('偏原作')),
+                'bias_2nd': to_int(r.get('偏二次')),
+                'no_bias': to_int(r.get('无偏爱')),
+                'no_interest': to_int(r.get('都没兴趣'))
+            }
+            roles = [] if pd.isna(r.get('所属角色')) else [c.strip() for c in str(r.get('所属角色')).split('|')]
+            for c in roles:
+                if c not in data['songs'][st]['chars']: data['songs'][st]['chars'].append(c)
+            data['songs'][st]['sessions'][sess] = stats
+            idx['songs'].append(st)
+
+    # --- CN Music Total Votes ---
+    for sheet, df in books['music_cn_full'].items():
+        sess = parse_session(sheet, 'cn')
+        if sess not in data['indexes']['by_session']: continue
+        df.columns = df.columns.str.strip()
+        tot = df['票数'].apply(to_int).dropna().sum()
+        data['indexes']['by_session'][sess]['total_song_votes'] = int(tot) if tot is not None else None
+
+    # --- Process Gender Info ---
+    for sheet, df in books['gender'].items():
+        sess = parse_session(sheet, 'jp')
+        df.columns = df.columns.str.strip()
+        m_v = df[df['性别'] == '男性']['票数'].apply(to_int).sum(min_count=0)
+        f_v = df[df['性别'] == '女性']['票数'].apply(to_int).sum(min_count=0)
+        o_v = df[df['性别'] == '其他']['票数'].apply(to_int).sum(min_count=0)
+        data['gender'][sess] = {
+            'm': int(m_v) if pd.notna(m_v) and m_v > 0 else None,
+            'f': int(f_v) if pd.notna(f_v) and f_v > 0 else None,
+            'o': int(o_v) if pd.notna(o_v) and o_v > 0 else None
+        }
+
+    # --- Process Character Tags ---
+    # Assume single sheet
+    df_tag = next(iter(books['tags'].values()))
+    df_tag.columns = df_tag.columns.str.strip()
+    for _, r in df_tag.iterrows():
+        tr = r.get('译名')
+        if pd.isna(tr): continue
+        tr = str(tr).strip()
+        kw_str = r.get('keywords')
+        if pd.isna(kw_str): continue
+        keywords = [kw.strip() for kw in str(kw_str).split('、') if kw.strip()]
+        if tr in data['characters']:
+            data['characters'][tr]['keywords'] = keywords
+        else:
+            # create entry if not existing
+            data['characters'][tr] = {'id': re.sub(r"\W+", "", tr).lower(), 'jp_name': None, 'first_appear': None, 'keywords': keywords, 'sessions': {}}
+
+    # Sort sessions
+    data['meta']['jp_sessions'].sort(key=lambda x: int(x.split('_')[0]))
+    data['meta']['cn_sessions'].sort(key=lambda x: int(x.split('_')[0]))
+    return data
+
+
+# === 放大输入 ===
+def scale_sheets(sheets, factor):
+    """把每个 Sheet 复制 factor 份，届数依次加 100、200……，保持原有的后缀"""
+    scaled = {}
+    for i in range(factor):
+        for name, df in sheets.items():
+            m = re.match(r"^(\d+)(.*)$", name)
+            new_name = name if i == 0 or not m else f"{int(m.group(1)) + 100 * i}{m.group(2)}"
+            scaled[new_name] = df
+    return scaled
+
+def scale_books(books, factor):
+    return {key: sheets if key == 'tags' else scale_sheets(sheets, factor) for key, sheets in books.items()}
+
+
+def build_with_totals(books):
+    totals = {key: {sheet: sheet_total(strip_columns(df)[col]) for sheet, df in books[key].items()}
+              for key, (_, col) in SummarizeAllData.RAW_TOTALS.items()}
+    return SummarizeAllData.build_data(books, totals)
+
+
+def best_time(fn, *args):
+    best = float('inf')
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+if __name__ == '__main__':
+    books = SummarizeAllData.load_books()
+    print(f"{'倍数':>4} {'行数':>8} {'iterrows(s)':>12} {'列式(s)':>10} {'加速比':>8}")
+    # 原实现直接读原始工作簿求总票数，新实现从届次目录取得，这里按同样的方式从 DataFrame 统计
+    books.update({key: load_workbook(path) for key, (path, _) in SummarizeAllData.RAW_TOTALS.items()})
+    for factor in SCALES:
+        scaled = scale_books(books, factor)
+        rows = sum(len(df) for sheets in scaled.values() for df in sheets.values())
+        t_old, old = best_time(legacy_build_data, scaled)
+        t_new, new = best_time(build_with_totals, scaled)
+        same = json.dumps(old, ensure_ascii=False, indent=2) == json.dumps(new, ensure_ascii=False, indent=2)
+        if not same:
+            raise SystemExit(f"倍数 {factor} 时两种实现的输出不一致")
+        print(f"{factor:>4} {rows:>8} {t_old:>12.3f} {t_new:>10.3f} {t_old / t_new:>7.1f}x")
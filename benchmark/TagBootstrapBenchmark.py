@@ -0,0 +1,50 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+# 从仓库根目录导入（python benchmark/TagBootstrapBenchmark.py）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from VoteData import load_vote_data
+from VoteTensor import load_tensor
+from data_statistic.TagStatEngine import bootstrap_heat, filter_tags, incidence_matrix, relative_heat, vote_shares
+
+# 对比 bootstrap_heat（每批重抽样一次稀疏矩阵乘法）与逐次调用 relative_heat 的循环：
+# 两者使用同一组随机数（同一个 seed、同样的分批），确认结果一致并记录耗时。
+N_BOOT = [200, 1000, 4000]
+SEED = 0
+CHUNK = 100
+
+
+def loop_bootstrap(incidence, shares, n_boot, seed):
+    """逐次重抽样：每次生成角色的抽中次数，乘到得票率上再调用 relative_heat"""
+    n_chars = shares.shape[0]
+    out = []
+    for start, ss in zip(range(0, n_boot, CHUNK), np.random.SeedSequence(seed).spawn(-(-n_boot // CHUNK))):
+        rng = np.random.default_rng(ss)
+        size = min(CHUNK, n_boot - start)
+        weights = rng.multinomial(n_chars, np.full(n_chars, 1 / n_chars), size=size).astype(np.float64)
+        for w in weights:
+            out.append(relative_heat(incidence, shares * w[:, None, None]).astype(np.float32))
+    return np.stack(out)
+
+
+def timed(fn, *args, **kwargs):
+    t0 = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - t0
+
+
+if __name__ == '__main__':
+    data = load_vote_data('./touhou_vote.json')
+    tensor = load_tensor('./touhou_vote.json', data)
+    tags, incidence = filter_tags(*incidence_matrix(data, tensor['characters']))
+    shares = vote_shares(tensor)
+    bootstrap_heat(incidence, shares, 1, SEED)  # 预热
+    print(f"{'次数':>6} {'逐次循环(s)':>12} {'批量(s)':>9} {'批量 2 进程(s)':>15} {'最大差值':>10}")
+    for n_boot in N_BOOT:
+        loop, t_loop = timed(loop_bootstrap, incidence, shares, n_boot, SEED)
+        batch, t_batch = timed(bootstrap_heat, incidence, shares, n_boot, SEED, chunk_size=CHUNK)
+        _, t_pool = timed(bootstrap_heat, incidence, shares, n_boot, SEED, jobs=2, chunk_size=CHUNK)
+        print(f"{n_boot:>6} {t_loop:>12.3f} {t_batch:>9.3f} {t_pool:>15.3f} {np.abs(loop - batch).max():>10.1e}")
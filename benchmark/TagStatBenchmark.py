@@ -0,0 +1,170 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+# 从仓库根目录导入（python benchmark/TagStatBenchmark.py）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from VoteData import load_vote_data
+from VoteTensor import load_tensor
+from data_statistic.ChracterTagStatistics import compute_tag_ranks
+
+# 对比 tag 相对热度的稀疏矩阵实现（data_statistic/TagStatEngine.py）与原来逐个 tag 扫描角色列表的实现：
+# 把角色复制 SCALE 份（复制出的角色的 tag 加上后缀，tag 数也随之增加），分别计时并确认结果完全一致。
+# 原实现的耗时随 tag 数 × 角色数增长，超过 LEGACY_MAX_SCALE 的规模只测新实现。
+SCALES = [1, 4, 16, 64]
+LEGACY_MAX_SCALE = 16
+
+
+# === 原实现（逐个 tag 扫描角色的 keywords 列表），仅作为基准和正确性对照 ===
+def legacy_tag_ranks(data, tensor, rank_boundary=0, min_characters_per_tag=2):
+    # 存储所有tag到列表tag_set中
+    tag_list = []
+    for character in data['characters']:
+        tag_list += data['characters'][character]['keywords']
+
+    # 处理重复元素，得到所有唯一的 tag
+    all_unique_tags = np.unique(tag_list)
+
+    # --- 过滤掉独有 Tag ---
+    tag_character_counts = {}
+    for tag in all_unique_tags:
+        tag_character_counts[tag] = 0
+        for character_name in data['characters']:
+            if tag in data['characters'][character_name]['keywords']:
+                tag_character_counts[tag] += 1
+
+    tags = [tag for tag in all_unique_tags if tag_character_counts[tag] >= min_characters_per_tag]
+
+
+    # --- 预处理：确定排除的角色与届次 ---
+    # 某角色在某届任一大区排名 <= rank_boundary，则该届两区都不计入
+    with np.errstate(invalid='ignore'):
+        excluded_character_sessions = (tensor['r'] <= rank_boundary).any(axis=2)
+
+    # --- 新增部分：预计算每个角色在每届的得票率 (在排除高人气角色后) ---
+    # character_session_vote_percentages[角色下标, 届下标, 大区] 为得票率（占总票数），
+    # 未参加该届或被排除的记为 0
+    votes = np.asarray(tensor['v'], dtype=np.float64)
+    totals = np.asarray(tensor['total_votes'])
+    eligible = ~np.isnan(votes) & ~excluded_character_sessions[:, :, None]
+    character_session_vote_percentages = np.zeros(votes.shape)
+    np.divide(votes, totals[None, :, :], out=character_session_vote_percentages,
+              where=eligible & (totals[None, :, :] > 0))
+
+    # 数组的届下标 -> 原来 (2, 20) 数组中的 session_idx（届数 - 1）
+    session_cols = np.array(tensor['sessions']) - 1
+
+    # --- 关键修改：计算每个届次和国家区的“合格角色”总得票率之和 ---
+    # total_eligible_session_vote_percentage[nationality][session_idx] 
+    # 存储该届该国家区所有未被排除角色的得票率总和
+    total_eligible_session_vote_percentage = np.zeros((2, 20))
+    total_eligible_session_vote_percentage[:, session_cols] = character_session_vote_percentages.sum(axis=0).T
+
+    # --- 核心修改：统计带 Tag 角色的总得票率和 ---
+    # tags_dict{
+    #   tag名字: {
+    #     'tag_char_vote_sum': np.zeros((2,20)),  # 存储带有该标签的角色的总得票率和（占届总票数）
+    #   }
+    # }
+    tags_dict = {}
+
+    for tag in tags: # 遍历筛选后的 tags 列表
+        tags_dict[tag] = {
+            'tag_char_vote_sum': np.zeros((2, 20)),
+        }
+        # 拥有该 tag 的角色下标，直接对这些行的得票率切片求和
+        rows = [i for i, character in enumerate(tensor['characters'])
+                if tag in data['characters'][character]['keywords']]
+        tags_dict[tag]['tag_char_vote_sum'][:, session_cols] = character_session_vote_percentages[rows].sum(axis=0).T
+
+
+    # --- 数据统计：计算相对比例差异 ---
+    # 这里 tag_relative_proportion 将存储最终的相对比例差异
+    tag_relative_proportion = {}
+
+    for tag in tags_dict.keys():
+        tag_relative_proportion[tag] = np.zeros((2,20)) 
+
+        for i in range(2): # i=0 为中国，i=1 为日本
+            for session_idx in range(20): # 遍历所有届数 (0-19)
+                tag_char_vote_sum = tags_dict[tag]['tag_char_vote_sum'][i][session_idx]
+
+                # 分母现在是所有合格角色的总得票率
+                eligible_total_vote_percentage = total_eligible_session_vote_percentage[i][session_idx]
+
+                if eligible_total_vote_percentage > 0:
+                    # 相对比例差异：该Tag的累积得票率 / 合格角色的累积总得票率
+                    tag_relative_proportion[tag][i][session_idx] = tag_char_vote_sum / eligible_total_vote_percentage
+                else:
+                    tag_relative_proportion[tag][i][session_idx] = 0 # 如果没有合格角色，则为0
+
+
+
+    # --- 排序：基于新的相对比例差异 ---
+    tag_rank_sessions_china = {}
+    tag_rank_sessions_japan = {}
+
+    for i in range(2):
+        if i == 0:
+            # 中国：1-11届
+            for session in range(1,12): # 1-indexed session
+                temp_dict = {}
+                for tag in tags: # 遍历筛选后的 tags 列表
+                    temp_dict[tag] = tag_relative_proportion[tag][0][session-1]
+
+                sorted_dict = sorted(temp_dict.items(), key=lambda x: x[1],reverse=True)
+                tag_rank_sessions_china[session] = sorted_dict
+
+        else:
+            # 日本：3-20届
+            for session in range(3,21): # 1-indexed session
+                temp_dict = {}
+                for tag in tags: # 遍历筛选后的 tags 列表
+                    temp_dict[tag] = tag_relative_proportion[tag][1][session-1]
+
+                sorted_dict = sorted(temp_dict.items(), key=lambda x: x[1],reverse=True)
+                tag_rank_sessions_japan[session] = sorted_dict
+
+    return tag_rank_sessions_china, tag_rank_sessions_japan
+
+
+def scaled(data, tensor, scale):
+    """角色复制 scale 份：第 k 份的名字和 tag 加上后缀 #k，数组沿角色轴重复"""
+    characters = {}
+    for k in range(scale):
+        for name, info in data['characters'].items():
+            suffix = f"#{k}" if k else ''
+            characters[name + suffix] = {'keywords': [tag + suffix for tag in info['keywords']]}
+    big = dict(tensor)
+    big['characters'] = list(characters)
+    for name in ('v', 'r'):
+        big[name] = np.tile(np.asarray(tensor[name]), (scale, 1, 1))
+    return {'characters': characters, 'meta': data['meta']}, big
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - t0
+
+
+if __name__ == '__main__':
+    data = load_vote_data('./touhou_vote.json')
+    tensor = load_tensor('./touhou_vote.json', data)
+    print(f"{'倍数':>4} {'角色数':>7} {'tag数':>7} {'原实现(s)':>10} {'稀疏矩阵(s)':>12} {'一致':>4}")
+    for scale in SCALES:
+        big_data, big_tensor = scaled(data, tensor, scale)
+        n_tags = len({tag for info in big_data['characters'].values() for tag in info['keywords']})
+        with open(os.devnull, 'w') as devnull:
+            stdout, sys.stdout = sys.stdout, devnull
+            try:
+                new, t_new = timed(compute_tag_ranks, big_data, big_tensor)
+                new = (new['cn'], new['jp'])
+                old, t_old = timed(legacy_tag_ranks, big_data, big_tensor) if scale <= LEGACY_MAX_SCALE else (None, None)
+            finally:
+                sys.stdout = stdout
+        same = '-' if old is None else ('是' if old == new else '否')
+        t_old = f"{t_old:.3f}" if t_old is not None else '-'
+        print(f"{scale:>4} {len(big_data['characters']):>7} {n_tags:>7} {t_old:>10} {t_new:>12.3f} {same:>4}")
@@ -0,0 +1,41 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+# 从仓库根目录导入（python benchmark/TagSweepBenchmark.py）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from VoteData import load_vote_data
+from VoteTensor import load_tensor
+from benchmark.TagStatBenchmark import scaled
+from data_statistic.TagStatEngine import filter_tags, incidence_matrix, relative_heat, relative_heat_sweep, vote_shares
+
+# 对比 rank_boundary 扫描（relative_heat_sweep，一次分桶 + 后缀和）与对每个 boundary 重新计算 relative_heat，
+# 角色复制 SCALE 份（同 TagStatBenchmark.py），记录两者耗时和最大差值。
+SCALES = [1, 4, 16]
+MAX_BOUNDARY = 50
+
+
+def per_boundary(incidence, tensor, max_boundary):
+    return np.stack([relative_heat(incidence, vote_shares(tensor, b)) for b in range(max_boundary + 1)])
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - t0
+
+
+if __name__ == '__main__':
+    data = load_vote_data('./touhou_vote.json')
+    tensor = load_tensor('./touhou_vote.json', data)
+    print(f"rank_boundary 0–{MAX_BOUNDARY}")
+    print(f"{'倍数':>4} {'角色数':>7} {'tag数':>7} {'逐个重算(s)':>12} {'扫描(s)':>9} {'最大差值':>10}")
+    for scale in SCALES:
+        big_data, big_tensor = scaled(data, tensor, scale)
+        tags, incidence = filter_tags(*incidence_matrix(big_data, big_tensor['characters']))
+        loop, t_loop = timed(per_boundary, incidence, big_tensor, MAX_BOUNDARY)
+        sweep, t_sweep = timed(relative_heat_sweep, incidence, big_tensor, MAX_BOUNDARY)
+        print(f"{scale:>4} {len(big_tensor['characters']):>7} {len(tags):>7} {t_loop:>12.3f} {t_sweep:>9.3f} "
+              f"{np.abs(loop - sweep).max():>10.1e}")
@@ -0,0 +1,40 @@
+import os
+import sys
+import time
+
+# 从仓库根目录导入（python benchmark/VoteDataBenchmark.py）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import VoteData
+
+# 对比 touhou_vote.json 与二进制副本 touhou_vote.msgpack 的文件大小和读取耗时
+REPEAT = 20
+
+
+def best_time(fn):
+    best = float('inf')
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+if __name__ == '__main__':
+    json_path = VoteData.VOTE_JSON
+    if VoteData.msgpack is None:
+        raise SystemExit("未安装 msgpack，无法生成二进制副本")
+    if not VoteData.binary_is_fresh(json_path):
+        print("二进制副本不存在或已过期，根据 JSON 重新生成")
+        VoteData.save_vote_data(VoteData.load_json(json_path), json_path)
+
+    t_json, from_json = best_time(lambda: VoteData.load_json(json_path))
+    t_bin, from_bin = best_time(lambda: VoteData.load_binary(json_path))
+    if from_json != from_bin:
+        raise SystemExit("两种格式读出的数据不一致")
+
+    size_json = os.path.getsize(json_path)
+    size_bin = os.path.getsize(VoteData.binary_path(json_path))
+    print(f"{'格式':<8} {'大小(KB)':>10} {'读取(ms)':>10}")
+    print(f"{'json':<8} {size_json / 1024:>10.1f} {t_json * 1000:>10.2f}")
+    print(f"{'msgpack':<8} {size_bin / 1024:>10.1f} {t_bin * 1000:>10.2f}")
+    print(f"体积为 JSON 的 {size_bin / size_json:.0%}，读取快 {t_json / t_bin:.1f} 倍")
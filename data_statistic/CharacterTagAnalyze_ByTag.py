@@ -1,83 +1,86 @@
-import json
+import argparse
+import os
+import sys
 import matplotlib.pyplot as plt
-import numpy as np
+
+# 从仓库根目录导入公共模块（脚本在仓库根目录下以 python data_statistic/xxx.py 运行）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from VoteAnalysis import safe_filename, save_table
+from data_statistic.TagRanks import tag_history, tag_matrix, tag_trend
 
 TAG = "萝莉" # 你要分析的特定 Tag
+# 批量模式：python data_statistic/CharacterTagAnalyze_ByTag.py --all --export tag_history.csv --plot-dir tag_trend
+# 数据只读取一次（tag_index_*.json），每个 tag 的各届数据直接按行取出
+
+
+def plot_tag_trend(tag_name, cn, jp):
+    # cn / jp 为中国区和日本区各届的相对热度（TagRanks.tag_trend），没有该 tag 的届为 0
+    cn_sessions, cn_values = list(cn.index), list(cn.values)
+    jp_sessions, jp_values = list(jp.index), list(jp.values)
 
-with open("data_statistic/data_cn.json", "r", encoding="utf-8") as f:
-    loaded_data = json.load(f)
+    # 创建一张包含两张子图的图表
+    plt.figure(figsize=(14, 5))
+    plt.rcParams['font.sans-serif'] = ['SimHei']  # 中文支持
 
-# 将 list[list[key, value]] 转回 list[tuple[key, value]]
-# 注意：这里的 value 已经是相对热度了
-tag_rank_sessions_china = {
-    int(session): [(tag, np.float64(value)) for tag, value in tag_list]
-    for session, tag_list in loaded_data.items()
-}
+    # 子图 1：中国区折线图
+    ax1 = plt.subplot(1, 2, 1)
+    ax1.plot(cn_sessions, cn_values, marker='o', linestyle='-', color='blue')
+    ax1.set_xlabel("届数 (Session)")
+    ax1.set_ylabel("相对热度") # 适配：更改 Y 轴标签
+    ax1.set_title(f"Tag “{tag_name}” 相对热度 中国区 (第{min(cn_sessions)}–{max(cn_sessions)}届)") # 适配：更改标题
+    ax1.set_xticks(cn_sessions)
+    # 可以考虑设置Y轴的范围，因为相对热度应该在0-1之间
+    ax1.set_ylim(bottom=0) # 确保Y轴从0开始
+    ax1.grid(True)
 
-with open("data_statistic/data_jp.json", "r", encoding="utf-8") as f:
-    loaded_data = json.load(f)
+    # 子图 2：日本区折线图
+    ax2 = plt.subplot(1, 2, 2)
+    ax2.plot(jp_sessions, jp_values, marker='s', linestyle='-', color='orange')
+    ax2.set_xlabel("届数 (Session)")
+    ax2.set_ylabel("相对热度") # 适配：添加 Y 轴标签，保持一致
+    ax2.set_title(f"Tag “{tag_name}” 相对热度 日本区 (第{min(jp_sessions)}–{max(jp_sessions)}届)") # 适配：更改标题
+    ax2.set_xticks(jp_sessions)
+    # 可以考虑设置Y轴的范围，因为相对热度应该在0-1之间
+    ax2.set_ylim(bottom=0) # 确保Y轴从0开始
+    ax2.grid(True)
 
-# 将 list[list[key, value]] 转回 list[tuple[key, value]]
-# 注意：这里的 value 已经是相对热度了
-tag_rank_sessions_japan = {
-    int(session): [(tag, np.float64(value)) for tag, value in tag_list]
-    for session, tag_list in loaded_data.items()
-}
+    plt.tight_layout()
+    plt.show()
 
-# -------------------------------
-# （3） 分别获取中国区 (1–11 届) 和日本区 (3–20 届) 的 sessions 列表
-# -------------------------------
-cn_sessions = sorted(tag_rank_sessions_china.keys())  # [1, 2, ..., 11]
-jp_sessions = sorted(tag_rank_sessions_japan.keys())  # [3, 4, ..., 20]
 
-# -------------------------------
-# （4） 定义函数提取每个 session 中的 tag 相对热度
-# -------------------------------
-def extract_relative_heat_per_session(rank_dict, sessions, tag_name):
-    rates = []
-    for s in sessions:
-        found = False
-        # 从字典中获取当前届次的所有标签及其值
-        session_data = rank_dict.get(s, [])
-        for (t, rate) in session_data:
-            if t == tag_name:
-                rates.append(float(rate))
-                found = True
-                break
-        if not found:
-            rates.append(0.0) # 如果没有找到该 tag，则热度为 0
-    return rates
+def plot_all(out_dir):
+    """每个 tag 输出一张趋势图到 out_dir，返回生成的文件数"""
+    plt.switch_backend('Agg')
+    os.makedirs(out_dir, exist_ok=True)
+    cn_matrix, jp_matrix = tag_matrix('cn'), tag_matrix('jp')
+    tags = sorted(set(cn_matrix.index) | set(jp_matrix.index))
+    for tag in tags:
+        plot_tag_trend(tag, tag_trend('cn', tag), tag_trend('jp', tag))
+        plt.savefig(os.path.join(out_dir, f"{safe_filename(tag)}.png"), dpi=100)
+        plt.close('all')
+    return len(tags)
 
-cn_values = extract_relative_heat_per_session(tag_rank_sessions_china, cn_sessions, TAG)
-jp_values = extract_relative_heat_per_session(tag_rank_sessions_japan, jp_sessions, TAG)
 
-# -------------------------------
-# （5） 创建一张包含两张子图的图表
-# -------------------------------
-plt.figure(figsize=(14, 5))
-plt.rcParams['font.sans-serif'] = ['SimHei']  # 中文支持
+def main():
+    parser = argparse.ArgumentParser(description="tag 在各届的相对热度（中国区 / 日本区）")
+    parser.add_argument('tag', nargs='?', default=TAG, help=f"要分析的 tag（默认 {TAG}）")
+    parser.add_argument('--all', action='store_true', help="批量模式：处理所有 tag")
+    parser.add_argument('--export', metavar='PATH', help="批量模式下把所有 tag 的各届相对热度保存为 .csv 或 .parquet")
+    parser.add_argument('--plot-dir', metavar='DIR', help="批量模式下每个 tag 输出一张趋势图到该目录")
+    args = parser.parse_args()
 
-# 子图 1：中国区折线图
-ax1 = plt.subplot(1, 2, 1)
-ax1.plot(cn_sessions, cn_values, marker='o', linestyle='-', color='blue')
-ax1.set_xlabel("届数 (Session)")
-ax1.set_ylabel("相对热度") # 适配：更改 Y 轴标签
-ax1.set_title(f"Tag “{TAG}” 相对热度 中国区 (第1–11届)") # 适配：更改标题
-ax1.set_xticks(cn_sessions)
-# 可以考虑设置Y轴的范围，因为相对热度应该在0-1之间
-ax1.set_ylim(bottom=0) # 确保Y轴从0开始
-ax1.grid(True)
+    if not args.all:
+        plot_tag_trend(args.tag, tag_trend('cn', args.tag), tag_trend('jp', args.tag))
+        return
+    if not (args.export or args.plot_dir):
+        parser.error("--all 需要同时指定 --export 或 --plot-dir")
+    if args.export:
+        history = tag_history()
+        save_table(history, args.export)
+        print(f"已导出 {len(history)} 个 tag 的各届相对热度到 {args.export}")
+    if args.plot_dir:
+        print(f"已输出 {plot_all(args.plot_dir)} 张趋势图到 {args.plot_dir}")
 
-# 子图 2：日本区折线图
-ax2 = plt.subplot(1, 2, 2)
-ax2.plot(jp_sessions, jp_values, marker='s', linestyle='-', color='orange')
-ax2.set_xlabel("届数 (Session)")
-ax2.set_ylabel("相对热度") # 适配：添加 Y 轴标签，保持一致
-ax2.set_title(f"Tag “{TAG}” 相对热度 日本区 (第3–20届)") # 适配：更改标题
-ax2.set_xticks(jp_sessions)
-# 可以考虑设置Y轴的范围，因为相对热度应该在0-1之间
-ax2.set_ylim(bottom=0) # 确保Y轴从0开始
-ax2.grid(True)
 
-plt.tight_layout()
-plt.show()
\ No newline at end of file
+if __name__ == '__main__':
+    main()
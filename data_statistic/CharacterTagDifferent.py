@@ -1,117 +1,138 @@
-import json
+import argparse
+import os
+import sys
 import numpy as np
 import matplotlib.pyplot as plt
 
-# -------------------------------
-# （1） 读取并转换 data_cn.json 和 data_jp.json
-# -------------------------------
-with open("data_statistic/data_cn.json", "r", encoding="utf-8") as f:
-    loaded_cn = json.load(f)
-tag_rank_sessions_china = {
-    int(session): {tag: float(value) for tag, value in tag_list}
-    for session, tag_list in loaded_cn.items()
-}
-
-with open("data_statistic/data_jp.json", "r", encoding="utf-8") as f:
-    loaded_jp = json.load(f)
-tag_rank_sessions_japan = {
-    int(session): {tag: float(value) for tag, value in tag_list}
-    for session, tag_list in loaded_jp.items()
-}
+# 从仓库根目录导入公共模块（脚本在仓库根目录下以 python data_statistic/xxx.py 运行）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from VoteAnalysis import save_table
+from data_statistic.TagRanks import tag_difference, tag_difference_all
 
 # -------------------------------
-# （2） 指定要对比的中国区和日本区届数及阈值
+# （1） 指定要对比的中国区和日本区届数及阈值
 # -------------------------------
 cn_session = 11     # 中国区要对比的届数 (1–11)
 jp_session = 20     # 日本区要对比的届数 (3–20)
 threshold = 0.001   # 绝对差值阈值 (现在是相对热度差值，范围通常在0-1之间)
 top_n_tags = 30     # 新增：只显示差异最大的前 N 个标签，可根据需要调整
+# 全部组合：python data_statistic/CharacterTagDifferent.py --all --output tag_divergence.csv --plot-dir charts -j 4
+# 一次算出所有（国区届, 日区届）组合（11 × 18）的差值表，图表由 RenderCharts.py 的进程池渲染
 
-# -------------------------------
-# （3） 获取对应届的 tag->rate 映射
-# -------------------------------
-cn_rates = tag_rank_sessions_china.get(cn_session, {})
-jp_rates = tag_rank_sessions_japan.get(jp_session, {})
-
-# -------------------------------
-# （4） 找出满足阈值差异的所有 tag，并计算“有向差值”（小数）
-# -------------------------------
-diff_list = []
-all_tags = set(cn_rates.keys()).union(jp_rates.keys())
-
-for tag in all_tags:
-    cn_rate = cn_rates.get(tag, 0.0)
-    jp_rate = jp_rates.get(tag, 0.0)
-    diff = cn_rate - jp_rate    # 有向差值
-    if abs(diff) >= threshold:
-        diff_list.append((tag, cn_rate, jp_rate, diff))
-
-# 按差值绝对值从大到小排序
-diff_list.sort(key=lambda x: abs(x[3]), reverse=True)
-
-# 如果指定了 top_n_tags，则只取前 N 个
-if top_n_tags > 0:
-    diff_list = diff_list[:top_n_tags]
-
-# 如果没有满足条件的 tag，则提示
-if not diff_list:
-    print(f"在中国区第 {cn_session} 届和日本区第 {jp_session} 届中，没有 tag 的相对热度差异 ≥ {threshold:.3f} 或没有足够多的标签满足显示数量 ({top_n_tags})。")
-else:
-    # -------------------------------
-    # （5） 分解信息，准备绘图
-    # -------------------------------
-    # 注意：为了水平条形图，这里需要反转列表，让最大的差异在图表上方显示
-    tags = [item[0] for item in diff_list][::-1]
-    # 不再乘以 100，直接使用 diff 值
-    diffs = [item[3] for item in diff_list][::-1] 
-
-    y = np.arange(len(tags)) # Y轴现在是标签的位置
-
-    # 为正负差值分别指定颜色：正(中国区更高)为红色，负(日本区更高)为蓝色
-    colors = ['tab:red' if d > 0 else 'tab:blue' for d in diffs] # 这里也使用 diffs
 
+def plot_tag_difference(diff_df, cn_session, jp_session, threshold, top_n_tags):
     # -------------------------------
-    # （6） 绘制“差值条形图”，使用水平条形图
+    # （2） diff_df 为满足阈值差异的 tag 及“有向差值”（小数），按差值绝对值从大到小排序（TagRanks.tag_difference）
     # -------------------------------
-    plt.figure(figsize=(10, len(tags) * 0.4 + 2)) # 根据标签数量动态调整图表高度
-    plt.rcParams['font.sans-serif'] = ['SimHei']  # 中文支持
-
-    # 使用 plt.barh 绘制水平条形图
-    bars = plt.barh(y, diffs, color=colors) # 这里也使用 diffs
-
-    # 在每个条形旁边标注数值（保留三位小数，因为是小数比例）
-    for bar, d in zip(bars, diffs):
-        x_val = bar.get_width() # 获取条形的宽度（即差值）
-        y_val = bar.get_y() + bar.get_height() / 2 # 获取条形的中心Y坐标
-
-        # 根据正负差值调整文本位置：正值文本在条形右侧，负值文本在条形左侧
-        if x_val >= 0:
-            ha, x_offset = 'left', 0.00 # 文本左对齐，稍偏右
-        else:
-            ha, x_offset = 'right', -0.00 # 文本右对齐，稍偏左
-        
-        plt.text(
-            x_val + x_offset,
-            y_val,
-            f"{d:.3f}",  # 显示为三位小数
-            ha=ha,
-            va='center', # 垂直居中
-            fontsize=8
-        )
-
-    plt.axvline(0, color='black', linewidth=0.8) # 添加 x=0 的参考线 (现在是垂直的)
-    plt.ylabel("标签 (Tag)") # Y轴现在是标签
-    # 更改 x 轴标签以反映“相对热度差值”
-    plt.xlabel("相对热度差值 (中国区 – 日本区)") 
-    
-    title_suffix = f"（|差| ≥ {threshold:.3f}）" # 更改阈值显示格式
-    if top_n_tags > 0:
-        title_suffix = f"（差异最大前 {top_n_tags} 个，|差| ≥ {threshold:.3f}）"
-    # 更改标题以反映“相对热度差值”
-    plt.title(f"中日区 第{cn_session}届 vs 第{jp_session}届 标签相对热度有向差值{title_suffix}")
-    
-    # 设置 Y 轴刻度标签
-    plt.yticks(y, tags)
-    plt.grid(axis='x', linestyle='--', alpha=0.6) # 网格线现在是垂直的
-    plt.tight_layout() # 自动调整布局，防止标签重叠
-    plt.show()
\ No newline at end of file
+    diff_list = list(diff_df.itertuples(index=False))
+
+    # 如果没有满足条件的 tag，则提示
+    if not diff_list:
+        print(f"在中国区第 {cn_session} 届和日本区第 {jp_session} 届中，没有 tag 的相对热度差异 ≥ {threshold:.3f} 或没有足够多的标签满足显示数量 ({top_n_tags})。")
+    else:
+        # -------------------------------
+        # （3） 分解信息，准备绘图
+        # -------------------------------
+        # 注意：为了水平条形图，这里需要反转列表，让最大的差异在图表上方显示
+        tags = [item[0] for item in diff_list][::-1]
+        # 不再乘以 100，直接使用 diff 值
+        diffs = [item[3] for item in diff_list][::-1] 
+
+        y = np.arange(len(tags)) # Y轴现在是标签的位置
+
+        # 为正负差值分别指定颜色：正(中国区更高)为红色，负(日本区更高)为蓝色
+        colors = ['tab:red' if d > 0 else 'tab:blue' for d in diffs] # 这里也使用 diffs
+
+        # -------------------------------
+        # （4） 绘制“差值条形图”，使用水平条形图
+        # -------------------------------
+        plt.figure(figsize=(10, len(tags) * 0.4 + 2)) # 根据标签数量动态调整图表高度
+        plt.rcParams['font.sans-serif'] = ['SimHei']  # 中文支持
+
+        # 使用 plt.barh 绘制水平条形图
+        bars = plt.barh(y, diffs, color=colors) # 这里也使用 diffs
+
+        # 在每个条形旁边标注数值（保留三位小数，因为是小数比例）
+        for bar, d in zip(bars, diffs):
+            x_val = bar.get_width() # 获取条形的宽度（即差值）
+            y_val = bar.get_y() + bar.get_height() / 2 # 获取条形的中心Y坐标
+
+            # 根据正负差值调整文本位置：正值文本在条形右侧，负值文本在条形左侧
+            if x_val >= 0:
+                ha, x_offset = 'left', 0.00 # 文本左对齐，稍偏右
+            else:
+                ha, x_offset = 'right', -0.00 # 文本右对齐，稍偏左
+
+            plt.text(
+                x_val + x_offset,
+                y_val,
+                f"{d:.3f}",  # 显示为三位小数
+                ha=ha,
+                va='center', # 垂直居中
+                fontsize=8
+            )
+
+        plt.axvline(0, color='black', linewidth=0.8) # 添加 x=0 的参考线 (现在是垂直的)
+        plt.ylabel("标签 (Tag)") # Y轴现在是标签
+        # 更改 x 轴标签以反映“相对热度差值”
+        plt.xlabel("相对热度差值 (中国区 – 日本区)") 
+
+        title_suffix = f"（|差| ≥ {threshold:.3f}）" # 更改阈值显示格式
+        if top_n_tags > 0:
+            title_suffix = f"（差异最大前 {top_n_tags} 个，|差| ≥ {threshold:.3f}）"
+        # 更改标题以反映“相对热度差值”
+        plt.title(f"中日区 第{cn_session}届 vs 第{jp_session}届 标签相对热度有向差值{title_suffix}")
+
+        # 设置 Y 轴刻度标签
+        plt.yticks(y, tags)
+        plt.grid(axis='x', linestyle='--', alpha=0.6) # 网格线现在是垂直的
+        plt.tight_layout() # 自动调整布局，防止标签重叠
+        plt.show()
+
+
+def render_all_pairs(table, out_dir, threshold, top_n_tags, jobs=None, significant=False):
+    """table 为 tag_difference_all() 的结果，每个组合一张差值条形图（tag_diff/cn<届>_jp<届>.png），返回 (渲染数, 跳过数)"""
+    from RenderCharts import render_specs, tag_diff_spec
+
+    specs = (tag_diff_spec(cn, jp, group, threshold, top_n_tags, significant)
+             for (cn, jp), group in table.groupby(['cn_session', 'jp_session'], sort=True))
+    return render_specs(specs, out_dir, jobs=jobs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="中国区与日本区 tag 相对热度的有向差值（中国区 – 日本区）")
+    parser.add_argument('--cn-session', type=int, default=cn_session)
+    parser.add_argument('--jp-session', type=int, default=jp_session)
+    parser.add_argument('--threshold', type=float, default=threshold)
+    parser.add_argument('--top', type=int, default=top_n_tags, help="每个组合只取差异最大的前 N 个（<= 0 为全部）")
+    parser.add_argument('--significant', action='store_true',
+                        help="只保留重抽样置信区间不含 0 的差值（需先运行 ChracterTagStatistics.py --bootstrap B）")
+    parser.add_argument('--alpha', type=float, default=0.05, help="置信区间为 1 - alpha")
+    parser.add_argument('--all', action='store_true', help="计算所有（国区届, 日区届）组合")
+    parser.add_argument('--output', metavar='PATH', help="--all 时把差值表保存为 .csv 或 .parquet")
+    parser.add_argument('--plot-dir', metavar='DIR', help="--all 时每个组合输出一张图到该目录（跳过数据未变化的图）")
+    parser.add_argument('-j', '--jobs', type=int, help="渲染进程数（默认为 CPU 核数）")
+    args = parser.parse_args()
+
+    if not args.all:
+        plot_tag_difference(tag_difference(args.cn_session, args.jp_session, args.threshold, args.top,
+                                           args.significant, args.alpha),
+                            args.cn_session, args.jp_session, args.threshold, args.top)
+        return
+
+    table = tag_difference_all(args.threshold, args.top, args.significant, args.alpha)
+    n_pairs = table.groupby(['cn_session', 'jp_session']).ngroups
+    print(f"{n_pairs} 个组合有满足条件的 tag，共 {len(table)} 行")
+    if args.output:
+        save_table(table.set_index(['cn_session', 'jp_session', 'rank']), args.output)
+        print(f"已保存到 {args.output}")
+    else:
+        print(table.head(30).to_string(index=False))
+    if args.plot_dir:
+        rendered, skipped = render_all_pairs(table, args.plot_dir, args.threshold, args.top, args.jobs,
+                                             args.significant)
+        print(f"渲染 {rendered} 张，跳过 {skipped} 张（数据未变化），输出目录 {args.plot_dir}")
+
+
+if __name__ == '__main__':
+    main()
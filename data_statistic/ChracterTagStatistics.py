@@ -1,181 +1,197 @@
+import argparse
+import hashlib
 import json
+import os
+import sys
+
 import numpy as np
-import re
+
+# 从仓库根目录导入公共模块（脚本在仓库根目录下以 python data_statistic/xxx.py 运行）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from VoteData import load_vote_data
+from VoteTensor import load_tensor
+from data_statistic.TagRanks import (BOOTSTRAP_FILE, STATE_FILE, SWEEP_FILE, data_file, index_file, load_tag_ranks,
+                                     read_tag_state, region_name, save_tag_bootstrap, save_tag_ranks, save_tag_sweep)
+from data_statistic.TagStatEngine import (bootstrap_heat, filter_tags, incidence_matrix, rank_tags, region_sessions,
+                                          relative_heat, relative_heat_sweep, session_fingerprints, tag_coverage,
+                                          tags_fingerprint, vote_shares)
 
 # 给出排名限定，如果排名 <= rank_boundary 则不计入
 rank_boundary = 0
+min_characters_per_tag = 2
+
+
+
+def tag_incidence(data, characters, min_characters_per_tag=2):
+    """过滤掉独有 tag 后的 (tags, 稀疏的 tag × 角色 关联矩阵)"""
+    all_unique_tags, incidence = incidence_matrix(data, characters)
+    tags, incidence = filter_tags(all_unique_tags, incidence, min_characters_per_tag)
+
+    print(f"原始 tag 数量: {len(all_unique_tags)}")
+    print(f"过滤后 tag 数量 (至少被 {min_characters_per_tag} 个角色拥有): {len(tags)}")
+    return tags, incidence
+
+
+def inputs_fingerprint(tags, incidence, tensor, min_characters_per_tag, session_fps=None):
+    """tag 集合、关联矩阵和所有届输入的哈希（不含 rank_boundary）；记录在扫描和重抽样结果中，读取时校验"""
+    return tags_fingerprint(tags, incidence, tensor['characters'],
+                            {'min_characters_per_tag': min_characters_per_tag,
+                             'sessions': sorted((session_fps or session_fingerprints(tensor)).items())})
+
+
+def _ranks(data, tensor, tags, incidence, rank_boundary, sessions=None):
+    """{大区: {届数: [(tag, 相对热度), ...]}}，大区和届数取自 data['meta']；sessions 不为 None 时只计算其中的届"""
+    regions = region_sessions(data)
+    wanted = sorted({s for region_list in regions.values() for s in region_list
+                     if sessions is None or s in sessions})
+    # 只取需要的届的列：角色 × 届 × 大区 的得票率，乘以关联矩阵得到 tag × 届 × 大区 的相对热度
+    heat = relative_heat(incidence, vote_shares(tensor, rank_boundary, [tensor['session_index'][s] for s in wanted]))
+    column = {s: k for k, s in enumerate(wanted)}
+    return {region: {s: rank_tags(tags, heat[:, column[s], tensor['regions'].index(region)])
+                     for s in region_list if s in column}
+            for region, region_list in regions.items()}
+
+
+def compute_tag_ranks(data, tensor, rank_boundary=0, min_characters_per_tag=2, sessions=None):
+    """
+    各届 tag 相对热度排名，返回 {大区: {届数: [(tag, 相对热度), ...]}}（按相对热度降序）。
+    data 为 touhou_vote.json 的数据，tensor 为 load_tensor() 的结果；sessions 不为 None 时只计算其中的届。
+    """
+    tags, incidence = tag_incidence(data, tensor['characters'], min_characters_per_tag)
+    return _ranks(data, tensor, tags, incidence, rank_boundary, sessions)
+
+
+def compute_tag_sweep(data, tensor, max_boundary, min_characters_per_tag=2):
+    """
+    rank_boundary 从 0 到 max_boundary 的相对热度，一次计算完成：
+    {'heat': (boundary, 大区, 届, tag) 数组, 'boundaries', 'regions', 'sessions', 'tags', 'valid': (大区, 届) 布尔数组,
+     'inputs': 输入指纹, 'min_characters_per_tag'}
+    """
+    tags, incidence = tag_incidence(data, tensor['characters'], min_characters_per_tag)
+    regions = region_sessions(data)
+    heat = relative_heat_sweep(incidence, tensor, max_boundary)  # (boundary, tag, 届, 数组中的大区)
+    order = [tensor['regions'].index(region) for region in regions]
+    return {
+        'heat': heat[..., order].transpose(0, 3, 2, 1),
+        'boundaries': np.arange(max_boundary + 1),
+        'regions': np.array(list(regions)),
+        'sessions': np.array(tensor['sessions']),
+        'tags': np.array([str(tag) for tag in tags]),
+        'valid': np.array([[s in region_list for s in tensor['sessions']] for region_list in regions.values()]),
+        'inputs': np.array(inputs_fingerprint(tags, incidence, tensor, min_characters_per_tag)),
+        'min_characters_per_tag': np.array(min_characters_per_tag),
+    }
 
-# 打开文件，存储至字典data中
-with open('./touhou_vote.json','r',encoding='utf-8') as file:
-    data = json.load(file)
-
-# 存储所有tag到列表tag_set中
-tag_list = []
-for character in data['characters']:
-    tag_list += data['characters'][character]['keywords']
-
-# 处理重复元素，得到所有唯一的 tag
-all_unique_tags = np.unique(tag_list)
-
-# 数据处理，例：输入'3_jp'，返回session = 3, nationality = 1
-def vote_data_processing(votes):
-    session = int(re.findall(r'\d+', votes)[0]) - 1
-    nationality = ''.join(re.findall(r'[a-zA-Z]', votes))
-    if nationality == 'cn':
-        nationality = 0
-    else:
-        nationality = 1
-    return session, nationality
-
-# --- 过滤掉独有 Tag ---
-tag_character_counts = {}
-for tag in all_unique_tags:
-    tag_character_counts[tag] = 0
-    for character_name in data['characters']:
-        if tag in data['characters'][character_name]['keywords']:
-            tag_character_counts[tag] += 1
-
-min_characters_per_tag = 2 
-tags = [tag for tag in all_unique_tags if tag_character_counts[tag] >= min_characters_per_tag]
-
-print(f"原始 tag 数量: {len(all_unique_tags)}")
-print(f"过滤后 tag 数量 (至少被 {min_characters_per_tag} 个角色拥有): {len(tags)}")
-
-# --- 预处理：确定排除的角色与届次 ---
-excluded_character_sessions = set()
-
-for character_name, character_data in data['characters'].items():
-    for votes_key, session_data in character_data['sessions'].items():
-        rank = int(session_data['r'])
-        session_num = int(re.findall(r'\d+', votes_key)[0]) # 提取届数（1-indexed）
-        
-        if rank <= rank_boundary:
-            excluded_character_sessions.add((character_name, session_num))
-
-# --- 新增部分：预计算每个角色在每届的得票率 (在排除高人气角色后) ---
-# 这个字典存储每个角色在每届的得票率（占总票数），用于计算分母
-# 格式: {character_name: {session_key: vote_percentage}}
-character_session_vote_percentages = {}
-
-for character_name, character_data in data['characters'].items():
-    character_session_vote_percentages[character_name] = {}
-    for votes_key, session_data in character_data['sessions'].items():
-        session_num = int(re.findall(r'\d+', votes_key)[0])
-        # 如果该角色在该届被排除，则跳过
-        if (character_name, session_num) in excluded_character_sessions:
-            continue
-        
-        current_votes = session_data['v']
-        total_session_votes = data['indexes']['by_session'][votes_key]['total_votes']
-        
-        if total_session_votes > 0:
-            character_session_vote_percentages[character_name][votes_key] = current_votes / total_session_votes
-        else:
-            character_session_vote_percentages[character_name][votes_key] = 0.0
-
-# --- 关键修改：计算每个届次和国家区的“合格角色”总得票率之和 ---
-# total_eligible_session_vote_percentage[nationality][session_idx] 
-# 存储该届该国家区所有未被排除角色的得票率总和
-total_eligible_session_vote_percentage = np.zeros((2, 20))
-
-for character_name, session_votes_map in character_session_vote_percentages.items():
-    for votes_key, vote_percentage in session_votes_map.items():
-        session_idx, nationality = vote_data_processing(votes_key)
-        total_eligible_session_vote_percentage[nationality][session_idx] += vote_percentage
-
-# --- 核心修改：统计带 Tag 角色的总得票率和 ---
-# tags_dict{
-#   tag名字: {
-#     'tag_char_vote_sum': np.zeros((2,20)),  # 存储带有该标签的角色的总得票率和（占届总票数）
-#   }
-# }
-tags_dict = {}
-
-for tag in tags: # 遍历筛选后的 tags 列表
-    tags_dict[tag] = {
-        'tag_char_vote_sum': np.zeros((2, 20)),
+
+def compute_tag_bootstrap(data, tensor, n_boot=1000, seed=None, rank_boundary=0, min_characters_per_tag=2, jobs=1):
+    """
+    按角色有放回重抽样 n_boot 次的相对热度：
+    {'heat': (大区, 届, tag) 点估计, 'replicates': (次, 大区, 届, tag), 'coverage': (大区, 届, tag) 角色数占比,
+     'regions', 'sessions', 'tags', 'valid', 'seed': 实际使用的随机种子,
+     'inputs': 输入指纹, 'rank_boundary', 'min_characters_per_tag'}
+    """
+    tags, incidence = tag_incidence(data, tensor['characters'], min_characters_per_tag)
+    regions = region_sessions(data)
+    order = [tensor['regions'].index(region) for region in regions]
+    shares = vote_shares(tensor, rank_boundary)
+    seed = np.random.SeedSequence(seed).entropy  # 未指定时随机生成，并记录下来以便复现
+    replicates = bootstrap_heat(incidence, shares, n_boot, seed, jobs)
+    return {
+        'heat': relative_heat(incidence, shares)[..., order].transpose(2, 1, 0),
+        'replicates': replicates[..., order].transpose(0, 3, 2, 1),
+        'coverage': tag_coverage(incidence, shares)[..., order].transpose(2, 1, 0),
+        'regions': np.array(list(regions)),
+        'sessions': np.array(tensor['sessions']),
+        'tags': np.array([str(tag) for tag in tags]),
+        'valid': np.array([[s in region_list for s in tensor['sessions']] for region_list in regions.values()]),
+        'seed': np.array(str(seed)),
+        'inputs': np.array(inputs_fingerprint(tags, incidence, tensor, min_characters_per_tag)),
+        'rank_boundary': np.array(rank_boundary),
+        'min_characters_per_tag': np.array(min_characters_per_tag),
     }
-    
-    for character in data['characters']:
-        for votes_key in data['characters'][character]['sessions']:
-            session_idx, nationality = vote_data_processing(votes_key)
-            original_session_num = session_idx + 1
-
-            # 如果该角色在该届被排除，则跳过
-            if (character, original_session_num) in excluded_character_sessions:
-                continue
-            
-            # 获取该角色在该届的得票率（已经预计算并排除了高人气角色）
-            char_vote_percentage_in_session = character_session_vote_percentages[character].get(votes_key, 0.0)
-
-            # 累加所有拥有该tag的角色的总得票率和（占届总票数）
-            if tag in data['characters'][character]['keywords']:
-                tags_dict[tag]['tag_char_vote_sum'][nationality][session_idx] += char_vote_percentage_in_session
-
-
-# --- 数据统计：计算相对比例差异 ---
-# 这里 tag_relative_proportion 将存储最终的相对比例差异
-tag_relative_proportion = {}
-
-for tag in tags_dict.keys():
-    tag_relative_proportion[tag] = np.zeros((2,20)) 
-
-    for i in range(2): # i=0 为中国，i=1 为日本
-        for session_idx in range(20): # 遍历所有届数 (0-19)
-            tag_char_vote_sum = tags_dict[tag]['tag_char_vote_sum'][i][session_idx]
-            
-            # 分母现在是所有合格角色的总得票率
-            eligible_total_vote_percentage = total_eligible_session_vote_percentage[i][session_idx]
-
-            if eligible_total_vote_percentage > 0:
-                # 相对比例差异：该Tag的累积得票率 / 合格角色的累积总得票率
-                tag_relative_proportion[tag][i][session_idx] = tag_char_vote_sum / eligible_total_vote_percentage
-            else:
-                tag_relative_proportion[tag][i][session_idx] = 0 # 如果没有合格角色，则为0
-    
-    # print(f"Tag: {tag}")
-    # print(f"  中国区相对比例 (1-11届): {tag_relative_proportion[tag][0][0:11]}")
-    # print(f"  日本区相对比例 (3-20届): {tag_relative_proportion[tag][1][2:20]}")
-
-
-# --- 排序：基于新的相对比例差异 ---
-tag_rank_sessions_china = {}
-tag_rank_sessions_japan = {}
-
-for i in range(2):
-    if i == 0:
-        # 中国：1-11届
-        for session in range(1,12): # 1-indexed session
-            temp_dict = {}
-            for tag in tags: # 遍历筛选后的 tags 列表
-                temp_dict[tag] = tag_relative_proportion[tag][0][session-1]
-            
-            sorted_dict = sorted(temp_dict.items(), key=lambda x: x[1],reverse=True)
-            tag_rank_sessions_china[session] = sorted_dict
-
-    else:
-        # 日本：3-20届
-        for session in range(3,21): # 1-indexed session
-            temp_dict = {}
-            for tag in tags: # 遍历筛选后的 tags 列表
-                temp_dict[tag] = tag_relative_proportion[tag][1][session-1]
-            
-            sorted_dict = sorted(temp_dict.items(), key=lambda x: x[1],reverse=True)
-            tag_rank_sessions_japan[session] = sorted_dict
-
-# --- 保存结果 ---
-data_to_save_cn = {
-    session: list(map(list, tag_list)) 
-    for session, tag_list in tag_rank_sessions_china.items()
-}
-
-with open("data_statistic/data_cn.json", "w", encoding="utf-8") as f:
-    json.dump(data_to_save_cn, f, ensure_ascii=False, indent=4)
-
-data_to_save_jp = {
-    session: list(map(list, tag_list)) 
-    for session, tag_list in tag_rank_sessions_japan.items()
-}
-
-with open("data_statistic/data_jp.json", "w", encoding="utf-8") as f:
-    json.dump(data_to_save_jp, f, ensure_ascii=False, indent=4)
\ No newline at end of file
+
+
+def _file_sha(path):
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def update_tag_ranks(data, tensor, rank_boundary=0, min_characters_per_tag=2, full=False):
+    """
+    增量更新 data_<大区>.json：tag 集合、参数和输出文件都没变时，只重算新增或输入变化的届，
+    其余届沿用已保存的结果（各届的计算互不依赖，结果与全部重算相同）。返回重算的届数列表
+    """
+    tags, incidence = tag_incidence(data, tensor['characters'], min_characters_per_tag)
+    params = {'rank_boundary': rank_boundary, 'min_characters_per_tag': min_characters_per_tag}
+    fingerprint = tags_fingerprint(tags, incidence, tensor['characters'], params)
+    session_fps = session_fingerprints(tensor)
+    regions = region_sessions(data)
+
+    state = read_tag_state()
+    saved = {region: _file_sha(data_file(region)) for region in regions}
+    reuse = (not full and state.get('tags') == fingerprint
+             and all(sha is not None and state.get('outputs', {}).get(region) == sha for region, sha in saved.items()))
+    previous = state.get('sessions', {}) if reuse else {}
+    todo = [s for s in tensor['sessions'] if previous.get(str(s)) != session_fps[s]]
+
+    fresh = _ranks(data, tensor, tags, incidence, rank_boundary, set(todo)) if todo else {r: {} for r in regions}
+    outputs = {}
+    for region, region_list in regions.items():
+        old = load_tag_ranks(region) if reuse else {}
+        merged = {s: fresh[region][s] if s in fresh[region] else old[s] for s in region_list}
+        if (not reuse or any(s in fresh[region] for s in region_list) or list(old) != region_list
+                or not os.path.exists(index_file(region))):
+            save_tag_ranks(region, merged)
+        outputs[region] = _file_sha(data_file(region))
+
+    os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
+    with open(STATE_FILE, 'w', encoding='utf-8') as f:
+        json.dump({'tags': fingerprint, 'sessions': {str(s): fp for s, fp in session_fps.items()},
+                   'outputs': outputs, 'params': params,
+                   'inputs': inputs_fingerprint(tags, incidence, tensor, min_characters_per_tag, session_fps)},
+                  f, indent=1)
+    return todo
+
+
+def main():
+    parser = argparse.ArgumentParser(description="计算各届 tag 相对热度排名，输出 data_cn.json / data_jp.json")
+    parser.add_argument('--full', action='store_true', help="忽略上次的结果，全部届重新计算")
+    parser.add_argument('--sweep', type=int, metavar='N',
+                        help=f"另外计算 rank_boundary 为 0..N 时的相对热度，保存到 {os.path.basename(SWEEP_FILE)}")
+    parser.add_argument('--bootstrap', type=int, metavar='B',
+                        help=f"另外按角色重抽样 B 次估计置信区间，保存到 {os.path.basename(BOOTSTRAP_FILE)}")
+    parser.add_argument('--seed', type=int, help="重抽样的随机种子（默认随机生成并记录在结果中）")
+    parser.add_argument('-j', '--jobs', type=int, default=1, help="重抽样的进程数")
+    args = parser.parse_args()
+    if args.sweep is not None and args.sweep < 0:
+        parser.error("--sweep 必须为非负整数")
+    if args.bootstrap is not None and args.bootstrap < 1:
+        parser.error("--bootstrap 必须为正整数")
+
+    # 读取投票数据（优先读取二进制副本 touhou_vote.msgpack），存储至字典data中
+    data = load_vote_data('./touhou_vote.json')
+    # 各角色每届的票数、排名和每届总票数，形状为 (角色, 届, 大区)，大区和届数取自 data['meta']
+    tensor = load_tensor('./touhou_vote.json', data)
+
+    todo = update_tag_ranks(data, tensor, rank_boundary, min_characters_per_tag, args.full)
+    for region, region_list in region_sessions(data).items():
+        print(f"{region_name(region)}：第 {min(region_list)}–{max(region_list)} 届，共 {len(region_list)} 届")
+    print(f"重新计算的届：{todo}" if todo else "各届输入均未变化，沿用已保存的结果")
+
+    if args.sweep is not None:
+        sweep = compute_tag_sweep(data, tensor, args.sweep, min_characters_per_tag)
+        save_tag_sweep(sweep)
+        print(f"rank_boundary 0–{args.sweep} 的扫描结果已保存到 {SWEEP_FILE}，形状 {sweep['heat'].shape}")
+
+    if args.bootstrap is not None:
+        boot = compute_tag_bootstrap(data, tensor, args.bootstrap, args.seed, rank_boundary, min_characters_per_tag,
+                                     args.jobs)
+        save_tag_bootstrap(boot)
+        print(f"{args.bootstrap} 次重抽样（seed={boot['seed']}）已保存到 {BOOTSTRAP_FILE}")
+
+
+if __name__ == '__main__':
+    main()
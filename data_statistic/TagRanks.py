@@ -0,0 +1,302 @@
+import json
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# ChracterTagStatistics.py 输出的各届 tag 相对热度排名（data_cn.json / data_jp.json）的读写，
+# 格式为 {届数: [[tag, 相对热度], ...]}（按相对热度降序）。读取结果按大区缓存。
+# 同时输出按 tag 索引的 tag_index_cn.json / tag_index_jp.json：
+# {"sessions": [届数, ...], "tags": {tag: [各届相对热度, ...]}}，查某个 tag 的各届数据不必扫描每一届的排名列表。
+# 以及 rank_boundary 扫描（ChracterTagStatistics.py --sweep）的结果 tag_heat_sweep.npz：
+# heat[boundary, 大区, 届, tag] 与各轴的标签，valid[大区, 届] 标记该大区是否有这一届。
+# 以及按角色重抽样（ChracterTagStatistics.py --bootstrap B）的结果 tag_heat_bootstrap.npz：
+# replicates[次, 大区, 届, tag]，置信区间在读取时按 alpha 计算。显著性：
+#   排名  置信区间下限高于角色数占比（coverage，tag 与得票无关时的期望值）
+#   差值  国区 – 日区差值的置信区间不含 0（两区用同一组重抽样的角色）
+# 两个 .npz 都记录了计算时的输入指纹（tag 集合与各届输入）和参数，读取时与 tag_stats_state.json 中
+# 当前 data_<大区>.json 对应的值比较，不一致（数据或参数变了、tag 轴对不上）时报错并提示重新计算。
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+SWEEP_FILE = os.path.join(DATA_DIR, 'tag_heat_sweep.npz')
+BOOTSTRAP_FILE = os.path.join(DATA_DIR, 'tag_heat_bootstrap.npz')
+# ChracterTagStatistics.py 上次计算的输入指纹、参数和输出文件的哈希
+STATE_FILE = os.path.join(os.path.dirname(DATA_DIR), 'cache_workbook', 'tag_stats_state.json')
+REGION_NAMES = {'cn': '中国', 'jp': '日本'}
+
+
+def data_file(region):
+    """大区的输出文件 data_<大区>.json"""
+    return os.path.join(DATA_DIR, f'data_{region}.json')
+
+
+def index_file(region):
+    """大区的 tag 索引文件 tag_index_<大区>.json"""
+    return os.path.join(DATA_DIR, f'tag_index_{region}.json')
+
+
+def region_name(region):
+    return REGION_NAMES.get(region, region)
+
+
+@lru_cache(maxsize=None)
+def load_tag_ranks(region):
+    """{届数: [(tag, 相对热度), ...]}，届数为 int，相对热度为 np.float64"""
+    with open(data_file(region), 'r', encoding='utf-8') as f:
+        loaded_data = json.load(f)
+    return {
+        int(session): [(tag, np.float64(value)) for tag, value in tag_list]
+        for session, tag_list in loaded_data.items()
+    }
+
+
+def build_tag_index(tag_rank_sessions):
+    """{届数: [(tag, 相对热度), ...]} -> {'sessions': [届数, ...], 'tags': {tag: [各届相对热度, ...]}}，没有该 tag 的届为 0"""
+    sessions = sorted(int(s) for s in tag_rank_sessions)
+    rates = {int(s): dict(tag_list) for s, tag_list in tag_rank_sessions.items()}
+    tags = sorted({tag for tag_list in rates.values() for tag in tag_list})
+    return {'sessions': sessions,
+            'tags': {tag: [float(rates[s].get(tag, 0.0)) for s in sessions] for tag in tags}}
+
+
+def save_tag_ranks(region, tag_rank_sessions):
+    data_to_save = {
+        session: list(map(list, tag_list))
+        for session, tag_list in tag_rank_sessions.items()
+    }
+    with open(data_file(region), 'w', encoding='utf-8') as f:
+        json.dump(data_to_save, f, ensure_ascii=False, indent=4)
+    with open(index_file(region), 'w', encoding='utf-8') as f:
+        json.dump(build_tag_index(tag_rank_sessions), f, ensure_ascii=False, indent=1)
+    load_tag_ranks.cache_clear()
+    tag_matrix.cache_clear()
+
+
+@lru_cache(maxsize=None)
+def tag_matrix(region):
+    """tag × 届数 的相对热度：DataFrame（index 为 tag，列为届数，升序）。读取 tag_index_<大区>.json，没有时由排名构建"""
+    try:
+        with open(index_file(region), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except FileNotFoundError:
+        index = build_tag_index(load_tag_ranks(region))
+    return pd.DataFrame(np.array(list(index['tags'].values()), dtype=np.float64).reshape(-1, len(index['sessions'])),
+                        index=pd.Index(list(index['tags']), name='tag'),
+                        columns=pd.Index(index['sessions'], name='届数'))
+
+
+def tag_history(regions=('cn', 'jp')):
+    """所有 tag 在各大区各届的相对热度：DataFrame（index 为 tag，列为 '<届数>_<大区>'），没有该 tag 的为 0"""
+    frames = [tag_matrix(region).rename(columns=lambda s, r=region: f'{s}_{r}') for region in regions]
+    return pd.concat(frames, axis=1).fillna(0.0).sort_index()
+
+
+def session_top_tags(region, session, top_n=15, significant=False, alpha=0.05):
+    """
+    某一届相对热度前 top_n 的 tag：DataFrame（tag, 相对热度）；该届不存在时抛出 KeyError。
+    significant 为 True 时只保留置信区间下限高于角色数占比的 tag，并附上 下限、上限、角色数占比 三列
+    """
+    ranks = load_tag_ranks(region)
+    if session not in ranks:
+        raise KeyError(f"{region_name(region)}区第 {session} 届数据不存在，可选届数：{min(ranks)}–{max(ranks)}")
+    if not significant:
+        return pd.DataFrame(ranks[session][:top_n], columns=['tag', '相对热度'])
+    ci = tag_confidence(region, session, alpha).set_index('tag')
+    df = pd.DataFrame(ranks[session], columns=['tag', '相对热度']).join(ci[['下限', '上限', '角色数占比']], on='tag')
+    return df[df['下限'] > df['角色数占比']].head(top_n).reset_index(drop=True)
+
+
+def tag_trend(region, tag_name):
+    """某个 tag 在各届的相对热度：Series（index 为届数，升序），没有该 tag 的届为 0"""
+    matrix = tag_matrix(region)
+    values = matrix.loc[tag_name].to_numpy() if tag_name in matrix.index else np.zeros(len(matrix.columns))
+    return pd.Series(values, index=pd.Index(list(matrix.columns), name='届数'), name=tag_name)
+
+
+def tag_difference(cn_session, jp_session, threshold=0.001, top_n_tags=30, significant=False, alpha=0.05):
+    """
+    国区第 cn_session 届与日区第 jp_session 届的 tag 相对热度有向差值（国区 - 日区），
+    只保留 |差| >= threshold 的 tag，按差值绝对值降序；top_n_tags > 0 时只取前 N 个。
+    significant 为 True 时另外只保留差值置信区间不含 0 的 tag。DataFrame（tag, cn, jp, diff）
+    """
+    cn_rates = {tag: float(v) for tag, v in load_tag_ranks('cn').get(cn_session, [])}
+    jp_rates = {tag: float(v) for tag, v in load_tag_ranks('jp').get(jp_session, [])}
+    keep = None
+    if significant:
+        sig = significant_differences([cn_session], [jp_session], alpha)
+        keep = set(sig.columns[sig.iloc[0]])
+
+    diff_list = []
+    for tag in sorted(set(cn_rates.keys()).union(jp_rates.keys())):  # 排序使差值相同的 tag 顺序固定
+        cn_rate = cn_rates.get(tag, 0.0)
+        jp_rate = jp_rates.get(tag, 0.0)
+        diff = cn_rate - jp_rate    # 有向差值
+        if abs(diff) >= threshold and (keep is None or tag in keep):
+            diff_list.append((tag, cn_rate, jp_rate, diff))
+
+    # 按差值绝对值从大到小排序
+    diff_list.sort(key=lambda x: abs(x[3]), reverse=True)
+    if top_n_tags > 0:
+        diff_list = diff_list[:top_n_tags]
+    return pd.DataFrame(diff_list, columns=['tag', 'cn', 'jp', 'diff'])
+
+
+def read_tag_state():
+    """tag_stats_state.json 的内容；没有时为 {}"""
+    try:
+        with open(STATE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _check_current(result, path, rerun, params):
+    """result 的输入指纹和 params 中的参数须与当前 data_<大区>.json 的一致，否则抛出 ValueError"""
+    state = read_tag_state()
+    current = state.get('params', {})
+    if 'inputs' not in result or not state.get('inputs'):
+        reason = "缺少输入指纹"
+    elif str(result['inputs']) != state['inputs']:
+        reason = "touhou_vote.json 或 tag 集合已变化"
+    else:
+        changed = [p for p in params if p not in current or int(result[p]) != current[p]]
+        reason = f"参数 {', '.join(changed)} 已变化" if changed else None
+    if reason:
+        raise ValueError(f"{path} 与当前的 tag 统计结果不一致（{reason}），"
+                         f"请重新运行 python data_statistic/ChracterTagStatistics.py {rerun}")
+
+
+def save_tag_sweep(sweep):
+    np.savez(SWEEP_FILE, **{k: np.asarray(v) for k, v in sweep.items()})
+    load_tag_sweep.cache_clear()
+
+
+@lru_cache(maxsize=None)
+def load_tag_sweep():
+    """
+    {'heat': (boundary, 大区, 届, tag) 数组, 'boundaries', 'regions', 'sessions', 'tags', 'valid', ...}；
+    没有时提示先运行 --sweep，与当前数据不一致时抛出 ValueError
+    """
+    if not os.path.exists(SWEEP_FILE):
+        raise FileNotFoundError(f"{SWEEP_FILE} 不存在，请先运行 python data_statistic/ChracterTagStatistics.py --sweep 50")
+    with np.load(SWEEP_FILE) as f:
+        sweep = {k: f[k] for k in f.files}
+    _check_current(sweep, SWEEP_FILE, f"--sweep {int(sweep['boundaries'][-1])}", ['min_characters_per_tag'])
+    return sweep
+
+
+def tag_sensitivity(region, tag_name):
+    """某个 tag 的相对热度随 rank_boundary 的变化：DataFrame（index 为 rank_boundary，列为该大区的届数）"""
+    sweep = load_tag_sweep()
+    regions, tags = list(sweep['regions']), list(sweep['tags'])
+    if region not in regions:
+        raise KeyError(f"扫描结果中没有{region_name(region)}区")
+    if tag_name not in tags:
+        raise KeyError(f"扫描结果中没有 tag '{tag_name}'")
+    ri = regions.index(region)
+    valid = sweep['valid'][ri]
+    return pd.DataFrame(sweep['heat'][:, ri, valid, tags.index(tag_name)],
+                        index=pd.Index(sweep['boundaries'], name='rank_boundary'),
+                        columns=pd.Index(sweep['sessions'][valid], name='届数'))
+
+
+def tag_difference_all(threshold=0.001, top_n_tags=30, significant=False, alpha=0.05):
+    """
+    所有（国区届数, 日区届数）组合的 tag_difference：两区的 tag × 届 矩阵广播相减得到 tag × 国区届 × 日区届 的差值，
+    每个组合用 argpartition 取差值绝对值最大的 top_n_tags 个（top_n_tags <= 0 时取全部满足阈值的）。
+    每个组合的结果与 tag_difference() 相同。DataFrame（cn_session, jp_session, rank, tag, cn, jp, diff）
+    """
+    cn_matrix, jp_matrix = tag_matrix('cn'), tag_matrix('jp')
+    tags = sorted(set(cn_matrix.index) | set(jp_matrix.index))
+    cn = cn_matrix.reindex(tags, fill_value=0.0).to_numpy()
+    jp = jp_matrix.reindex(tags, fill_value=0.0).to_numpy()
+    cn_sessions, jp_sessions = np.array(cn_matrix.columns), np.array(jp_matrix.columns)
+
+    # (组合, tag)：组合按国区届数、日区届数排列
+    diff = (cn[:, :, None] - jp[:, None, :]).reshape(len(tags), -1).T
+    size = np.abs(diff)
+    eligible = size >= threshold
+    if significant:
+        eligible &= significant_differences(cn_sessions, jp_sessions, alpha).reindex(
+            columns=tags, fill_value=False).to_numpy()
+    selected = eligible
+    if 0 < top_n_tags < len(tags):
+        key = np.where(eligible, size, -1.0)
+        kth = -np.partition(-key, top_n_tags - 1, axis=1)[:, top_n_tags - 1:top_n_tags]  # 第 N 大的值
+        above = key > kth
+        # 与第 N 大的值相等的 tag 按 tag 顺序补足 N 个（与 tag_difference 中稳定排序的结果一致）
+        ties = (key == kth) & (np.cumsum(key == kth, axis=1) <= top_n_tags - above.sum(axis=1, keepdims=True))
+        selected = eligible & (above | ties)
+
+    pair, tag = np.nonzero(selected)                    # 每个组合内按 tag 顺序
+    order = np.lexsort((-size[pair, tag], pair))        # 组合内按差值绝对值降序，相同时保持 tag 顺序
+    pair, tag = pair[order], tag[order]
+    starts = np.searchsorted(pair, pair, side='left')
+    ci, ji = np.divmod(pair, len(jp_sessions))
+    return pd.DataFrame({
+        'cn_session': cn_sessions[ci],
+        'jp_session': jp_sessions[ji],
+        'rank': np.arange(len(pair)) - starts + 1,
+        'tag': np.array(tags, dtype=object)[tag],
+        'cn': cn[tag, ci],
+        'jp': jp[tag, ji],
+        'diff': diff[pair, tag],
+    })
+
+
+def save_tag_bootstrap(boot):
+    np.savez(BOOTSTRAP_FILE, **{k: np.asarray(v) for k, v in boot.items()})
+    load_tag_bootstrap.cache_clear()
+
+
+@lru_cache(maxsize=None)
+def load_tag_bootstrap():
+    """ChracterTagStatistics.compute_tag_bootstrap() 的结果；没有时提示先运行 --bootstrap，与当前数据不一致时抛出 ValueError"""
+    if not os.path.exists(BOOTSTRAP_FILE):
+        raise FileNotFoundError(f"{BOOTSTRAP_FILE} 不存在，请先运行 python data_statistic/ChracterTagStatistics.py --bootstrap 1000")
+    with np.load(BOOTSTRAP_FILE) as f:
+        boot = {k: f[k] for k in f.files}
+    _check_current(boot, BOOTSTRAP_FILE, f"--bootstrap {boot['replicates'].shape[0]}",
+                   ['rank_boundary', 'min_characters_per_tag'])
+    return boot
+
+
+def _bootstrap_index(region, sessions):
+    boot = load_tag_bootstrap()
+    ri = list(boot['regions']).index(region)
+    session_index = {int(s): i for i, s in enumerate(boot['sessions'])}
+    missing = [s for s in sessions if s not in session_index or not boot['valid'][ri, session_index[s]]]
+    if missing:
+        raise KeyError(f"重抽样结果中没有{region_name(region)}区第 {missing} 届")
+    return boot, ri, [session_index[s] for s in sessions]
+
+
+def tag_confidence(region, session, alpha=0.05):
+    """某一届各 tag 相对热度的 bootstrap 百分位数置信区间：DataFrame（tag, 相对热度, 下限, 上限, 标准误, 角色数占比）"""
+    from data_statistic.TagStatEngine import percentile_interval
+
+    boot, ri, (si,) = _bootstrap_index(region, [session])
+    replicates = boot['replicates'][:, ri, si, :]
+    lower, upper = percentile_interval(replicates, alpha)
+    return pd.DataFrame({'tag': boot['tags'].astype(object), '相对热度': boot['heat'][ri, si],
+                         '下限': lower, '上限': upper, '标准误': replicates.std(axis=0, ddof=1),
+                         '角色数占比': boot['coverage'][ri, si]})
+
+
+def significant_differences(cn_sessions, jp_sessions, alpha=0.05):
+    """
+    国区 – 日区差值的置信区间是否不含 0：DataFrame（行为 (国区届, 日区届) 组合，按国区届、日区届排列；列为 tag）。
+    两区用同一组重抽样的角色，差值的分布直接由逐次的差得到
+    """
+    from data_statistic.TagStatEngine import percentile_interval
+
+    boot, cn_ri, cn_idx = _bootstrap_index('cn', list(cn_sessions))
+    _, jp_ri, jp_idx = _bootstrap_index('jp', list(jp_sessions))
+    jp_rep = boot['replicates'][:, jp_ri, jp_idx, :]                          # (次, 日区届, tag)
+    rows = []
+    for ci in cn_idx:  # 逐个国区届计算，内存为 次 × 日区届 × tag
+        lower, upper = percentile_interval(boot['replicates'][:, cn_ri, ci, None, :] - jp_rep, alpha)
+        rows.append((lower > 0) | (upper < 0))
+    return pd.DataFrame(np.concatenate(rows), columns=boot['tags'].astype(object),
+                        index=pd.MultiIndex.from_product([list(cn_sessions), list(jp_sessions)],
+                                                         names=['cn_session', 'jp_session']))
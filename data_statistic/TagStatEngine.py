@@ -0,0 +1,198 @@
+import hashlib
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy import sparse
+
+from VoteTensor import split_session_key
+
+# tag 相对热度的矩阵计算：
+#   incidence      稀疏的 tag × 角色 关联矩阵（角色拥有该 tag 为 1）
+#   shares         角色 × (届, 大区) 的得票率（占该届总票数，被排除或未参加的为 0）
+#   incidence @ shares 即各 tag 的得票率和，再除以该届所有合格角色的得票率和得到相对热度。
+# 稀疏矩阵乘法按角色下标顺序累加，与逐个 tag 切片求和的结果逐位相同。
+# 各届互不影响（排除规则和分母都只看本届），因此可以只计算新增或变化的届，见 session_fingerprints()。
+
+
+def region_sessions(data):
+    """{大区: [届数, ...]}（升序），取自 data['meta'] 中的 '<大区>_sessions'，如 'jp_sessions': ['3_jp', ...]"""
+    return {key[:-len('_sessions')]: sorted(split_session_key(k)[0] for k in values)
+            for key, values in data['meta'].items() if key.endswith('_sessions')}
+
+
+def incidence_matrix(data, characters):
+    """返回 (tags, incidence)：tags 为所有 tag（升序，与 np.unique 相同），incidence 为 tag × 角色 的 CSR 矩阵"""
+    keywords = [data['characters'][name]['keywords'] for name in characters]
+    tags = np.unique([tag for kw in keywords for tag in kw])
+    tag_index = {tag: i for i, tag in enumerate(tags)}
+    pairs = {(tag_index[tag], ci) for ci, kw in enumerate(keywords) for tag in kw}  # 同一角色重复的 tag 只计一次
+    rows, cols = (np.fromiter((p[k] for p in pairs), dtype=np.int64, count=len(pairs)) for k in (0, 1))
+    incidence = sparse.csr_matrix((np.ones(len(pairs)), (rows, cols)), shape=(len(tags), len(characters)))
+    incidence.sort_indices()
+    return tags, incidence
+
+
+def filter_tags(tags, incidence, min_characters_per_tag=2):
+    """只保留至少被 min_characters_per_tag 个角色拥有的 tag"""
+    keep = np.asarray(incidence.getnnz(axis=1)) >= min_characters_per_tag
+    return tags[keep], incidence[keep]
+
+
+def vote_shares(tensor, rank_boundary=0, cols=None):
+    """
+    角色 × 届 × 大区 的得票率（占该届总票数）。某角色在某届任一大区排名 <= rank_boundary 时，
+    该届两区都不计入；未参加该届或被排除的记为 0。cols 为数组的届下标列表时只计算这几届
+    """
+    cols = slice(None) if cols is None else list(cols)
+    with np.errstate(invalid='ignore'):
+        excluded = (np.asarray(tensor['r'][:, cols]) <= rank_boundary).any(axis=2)
+    votes = np.asarray(tensor['v'][:, cols], dtype=np.float64)
+    totals = np.asarray(tensor['total_votes'][cols])
+    eligible = ~np.isnan(votes) & ~excluded[:, :, None]
+    shares = np.zeros(votes.shape)
+    np.divide(votes, totals[None, :, :], out=shares, where=eligible & (totals[None, :, :] > 0))
+    return shares
+
+
+def relative_heat(incidence, shares):
+    """tag × 届 × 大区 的相对热度：带该 tag 的角色得票率和 / 所有合格角色的得票率和（后者为 0 时为 0）"""
+    n_chars = shares.shape[0]
+    flat = shares.reshape(n_chars, -1)
+    tag_sum = np.asarray(incidence @ flat)
+    eligible_total = flat.sum(axis=0)
+    heat = np.zeros(tag_sum.shape)
+    np.divide(tag_sum, eligible_total[None, :], out=heat, where=eligible_total[None, :] > 0)
+    return heat.reshape((incidence.shape[0],) + shares.shape[1:])
+
+
+def exclusion_rank(tensor, cols=None):
+    """角色 × 届 的各大区最高排名（数值最小）：rank_boundary >= 该值时该角色该届被排除；两区都未上榜的为 inf"""
+    cols = slice(None) if cols is None else list(cols)
+    ranks = np.asarray(tensor['r'][:, cols], dtype=np.float64)
+    with np.errstate(invalid='ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # 全为 NaN 的行
+        best = np.nanmin(ranks, axis=2)
+    return np.where(np.isnan(best), np.inf, best)
+
+
+def relative_heat_sweep(incidence, tensor, max_boundary, cols=None):
+    """
+    rank_boundary 为 0..max_boundary 时的相对热度，形状 (boundary, tag, 届, 大区)，
+    与逐个 boundary 计算 relative_heat(incidence, vote_shares(tensor, boundary)) 相同（至多差浮点舍入）。
+    每届的角色按最高排名分桶（排名 1..max_boundary 各一桶，其余一桶），一次稀疏乘法得到各桶的 tag 得票率和，
+    boundary = b 时计入的正好是排名 > b 的各桶，从后往前累加即可
+    """
+    shares = vote_shares(tensor, 0, cols)  # 排名都 >= 1，boundary 为 0 时不排除任何角色
+    best = exclusion_rank(tensor, cols)
+    n_chars, n_sessions, n_regions = shares.shape
+    n_buckets = max_boundary + 2           # 桶 k（1..max_boundary）为最高排名 k，桶 max_boundary + 1 为其余
+    bucket = np.where(best <= max_boundary, np.ceil(best), max_boundary + 1).astype(np.int64)
+
+    chars, sessions, regions = np.nonzero(shares)
+    flat_cols = (bucket[chars, sessions] * n_sessions + sessions) * n_regions + regions
+    bucketed = sparse.csr_matrix((shares[chars, sessions, regions], (chars, flat_cols)),
+                                 shape=(n_chars, n_buckets * n_sessions * n_regions))
+    shape = (n_buckets, n_sessions, n_regions)
+    tag_sum = np.asarray((incidence @ bucketed).todense()).reshape((incidence.shape[0],) + shape)
+    eligible_total = np.asarray(bucketed.sum(axis=0)).reshape(shape)
+
+    # 桶 k 起的后缀和 = 最高排名 >= k 的角色之和；boundary = b 取桶 b + 1 起的后缀和
+    tag_sum = np.cumsum(tag_sum[:, ::-1], axis=1)[:, ::-1][:, 1:]
+    eligible_total = np.cumsum(eligible_total[::-1], axis=0)[::-1][1:]
+    heat = np.zeros(tag_sum.shape)
+    np.divide(tag_sum, eligible_total[None], out=heat, where=eligible_total[None] > 0)
+    return heat.transpose(1, 0, 2, 3)
+
+
+def tag_coverage(incidence, shares):
+    """tag × 届 × 大区 的角色数占比：带该 tag 的合格角色数 / 合格角色数。tag 与得票无关时相对热度的期望值，用作显著性的基准"""
+    n_chars = shares.shape[0]
+    present = (shares > 0).reshape(n_chars, -1).astype(np.float64)
+    counts = np.asarray(incidence @ present)
+    eligible = present.sum(axis=0)
+    coverage = np.zeros(counts.shape)
+    np.divide(counts, eligible[None, :], out=coverage, where=eligible[None, :] > 0)
+    return coverage.reshape((incidence.shape[0],) + shares.shape[1:])
+
+
+def _tag_share_matrix(incidence, flat):
+    """(tag, 届 × 大区) × 角色 的稀疏矩阵，元素为 incidence[tag, 角色] * flat[角色, 届 × 大区]"""
+    coo = incidence.tocoo()
+    n_cols = flat.shape[1]
+    rows = np.repeat(coo.row, n_cols) * n_cols + np.tile(np.arange(n_cols), coo.nnz)
+    chars = np.repeat(coo.col, n_cols)
+    values = flat[chars, rows % n_cols]
+    keep = values != 0
+    return sparse.csr_matrix((values[keep], (rows[keep], chars[keep])),
+                             shape=(incidence.shape[0] * n_cols, flat.shape[0]))
+
+
+def _bootstrap_chunk(tag_shares, flat, n_tags, size, seed):
+    """
+    一批 size 次重抽样：每次按角色有放回抽取与原来相同数量的角色，抽中次数作为权重 w，
+    tag 的得票率和即 tag_shares @ w，一批的 w 拼成矩阵后一次稀疏乘法完成
+    """
+    rng = np.random.default_rng(seed)
+    n_chars, n_cols = flat.shape
+    weights = rng.multinomial(n_chars, np.full(n_chars, 1 / n_chars), size=size).astype(np.float64)  # (次, 角色)
+    tag_sum = (tag_shares @ weights.T).reshape(n_tags, n_cols, size)                                 # (tag, 届 × 大区, 次)
+    eligible_total = (weights @ flat).T                                                               # (届 × 大区, 次)
+    heat = np.zeros(tag_sum.shape)
+    np.divide(tag_sum, eligible_total[None], out=heat, where=eligible_total[None] > 0)  # 在连续的内存布局上相除，最后再转置
+    return heat.transpose(2, 0, 1).astype(np.float32)
+
+
+def bootstrap_heat(incidence, shares, n_boot=1000, seed=None, jobs=1, chunk_size=100):
+    """
+    相对热度的 bootstrap 重抽样，形状 (n_boot, tag, 届, 大区)，float32。
+    按 chunk_size 次一批，每批用 SeedSequence(seed).spawn() 得到的独立随机数，结果只取决于 seed，与 jobs 无关；
+    jobs > 1 时各批在进程池中计算
+    """
+    n_chars = shares.shape[0]
+    flat = shares.reshape(n_chars, -1)
+    tag_shares = _tag_share_matrix(incidence, flat)
+    sizes = [min(chunk_size, n_boot - start) for start in range(0, n_boot, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = ([tag_shares] * len(sizes), [flat] * len(sizes), [incidence.shape[0]] * len(sizes), sizes, seeds)
+    if jobs == 1 or len(sizes) <= 1:
+        chunks = list(map(_bootstrap_chunk, *args))
+    else:
+        with ProcessPoolExecutor(jobs) as pool:
+            chunks = list(pool.map(_bootstrap_chunk, *args))
+    return np.concatenate(chunks).reshape((n_boot, incidence.shape[0]) + shares.shape[1:])
+
+
+def percentile_interval(replicates, alpha=0.05, axis=0):
+    """重抽样结果的百分位数置信区间 (下限, 上限)"""
+    lower, upper = np.quantile(replicates, [alpha / 2, 1 - alpha / 2], axis=axis)
+    return lower, upper
+
+
+def rank_tags(tags, heat_column):
+    """按相对热度降序排列 [(tag, 热度), ...]，热度相同的保持 tags 中的顺序"""
+    order = np.argsort(-heat_column, kind='stable')
+    return [(str(tags[i]), float(heat_column[i])) for i in order]
+
+
+def _digest(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part if isinstance(part, bytes) else repr(part).encode('utf-8'))
+    return h.hexdigest()
+
+
+def tags_fingerprint(tags, incidence, characters, params):
+    """tag 集合、关联矩阵、角色顺序和参数的哈希；任何一个变化，所有届都要重新计算"""
+    return _digest(list(map(str, tags)), incidence.indptr.tobytes(), incidence.indices.tobytes(),
+                   list(characters), sorted(params.items()))
+
+
+def session_fingerprints(tensor):
+    """{届数: 该届输入（各角色票数、排名和总票数）的哈希}"""
+    out = {}
+    for j, session in enumerate(tensor['sessions']):
+        out[session] = _digest(np.ascontiguousarray(tensor['v'][:, j]).tobytes(),
+                               np.ascontiguousarray(tensor['r'][:, j]).tobytes(),
+                               np.ascontiguousarray(tensor['total_votes'][j]).tobytes())
+    return out
@@ -1,26 +1,43 @@
+import argparse
+from functools import lru_cache
+
 import pandas as pd
 import matplotlib.pyplot as plt
 
+from SessionCatalog import session_total, sessions
+from VoteAnalysis import save_table
+from WorkbookCache import load_sheet
+
 # ===== 用户配置区域 =====
 TARGET_CN_NAME = "琪露诺"    # 要分析的中文角色名
 CN_SHEET_NAME = "11"         # 中文版分析的Sheet名称
 JP_SHEET_NAME = "20"     # 日文版分析的Sheet名称
 # =======================
 
+# 大区 -> (分组工作簿, 原始工作簿, 名字列)
+REGIONS = {
+    'cn': ('TouhouVote_cn_grouped.xlsx', 'TouhouVote_cn.xlsx', '译名'),
+    'jp': ('TouhouVote_jp_grouped.xlsx', 'TouhouVote_jp.xlsx', '日文名'),
+}
+SORT_KEYS = {'abs': 'abs_diff', 'diff': 'diff', 'cn': 'cn_share', 'jp': 'jp_share'}
+
+
 # 1. 读取名称对照表
-name_mapping = pd.read_excel('fun.xlsx').set_index('译名')['日文名'].to_dict()
+@lru_cache(maxsize=None)
+def name_mapping():
+    """译名 -> 日文名"""
+    return load_sheet('fun.xlsx').set_index('译名')['日文名'].to_dict()
 
-# 2. 验证角色存在性
-if TARGET_CN_NAME not in name_mapping:
-    raise ValueError(f"角色'{TARGET_CN_NAME}'在对照表中不存在")
-target_jp = name_mapping[TARGET_CN_NAME]
 
-# 3. 定义核心查询函数
-def analyze_sheet(excel_grouped, excel_raw, sheet_name, target_col, target_name):
+# 2. 每届各角色的得票占比，按 (大区, Sheet) 缓存：同一进程中再次查询不重新读取工作簿
+@lru_cache(maxsize=None)
+def session_shares(region, sheet_name):
+    """Series：index 为名字（同名取第一行），值为票数占该届原始总票数的百分比"""
+    excel_grouped, excel_raw, target_col = REGIONS[region]
     try:
         # 读取数据
-        df_group = pd.read_excel(excel_grouped, sheet_name=sheet_name)
-        df_raw = pd.read_excel(excel_raw, sheet_name=sheet_name)
+        df_group = load_sheet(excel_grouped, sheet_name)
+        total_votes = session_total(excel_raw, sheet_name)
     except ValueError:
         raise ValueError(f"Sheet '{sheet_name}'不存在")
 
@@ -28,67 +45,149 @@ def analyze_sheet(excel_grouped, excel_raw, sheet_name, target_col, target_name)
     if '票数' not in df_group.columns or target_col not in df_group.columns:
         raise ValueError(f"Sheet '{sheet_name}'缺少必要列")
 
-    # 计算总票数
-    total_votes = df_raw['票数'].sum()
+    # 总票数（来自届次目录，不解析原始工作簿）
     if total_votes == 0:
         raise ValueError(f"Sheet '{sheet_name}'总票数为0")
 
+    df_group = df_group.drop_duplicates(target_col)
+    return pd.Series((df_group['票数'] / total_votes * 100).to_numpy(), index=df_group[target_col])
+
+
+# 3. 定义核心查询函数
+def analyze_sheet(region, sheet_name, target_name):
+    shares = session_shares(region, sheet_name)
     # 获取目标数据
-    target_data = df_group[df_group[target_col] == target_name]
-    if target_data.empty:
+    if target_name not in shares.index:
         raise ValueError(f"Sheet '{sheet_name}'未找到'{target_name}'")
-
-    return (target_data['票数'].iloc[0] / total_votes) * 100
-
-# 4. 执行分析
-try:
-    cn_pct = analyze_sheet('TouhouVote_cn_grouped.xlsx', 'TouhouVote_cn.xlsx',
-                          CN_SHEET_NAME, '译名', TARGET_CN_NAME)
-    jp_pct = analyze_sheet('TouhouVote_jp_grouped.xlsx', 'TouhouVote_jp.xlsx',
-                          JP_SHEET_NAME, '日文名', target_jp)
-except Exception as e:
-    print(f"分析失败: {str(e)}")
-    exit()
-
-# 5. 输出结果
-diff = round(cn_pct - jp_pct, 2)
-print(f"[角色分析报告] {TARGET_CN_NAME} ({target_jp})")
-print("═" * 40)
-print(f"中文版 Sheet [{CN_SHEET_NAME}]: {cn_pct:.2f}%")
-print(f"日文版 Sheet [{JP_SHEET_NAME}]: {jp_pct:.2f}%")
-print(f"比例差值: {diff}% (+表示中文更高)")
-
-# 6. 可视化对比
-plt.figure(figsize=(10, 5))
-ax = plt.subplot()
-
-# 绘制双柱状图
-positions = [0.2, 0.6]
-colors = ['#2E86C1', '#E74C3C']
-bars = ax.bar(positions, [cn_pct, jp_pct], 
-             width=0.3, color=colors, 
-             edgecolor='black', linewidth=1)
-
-# 图表装饰
-ax.set_xticks(positions)
-ax.set_xticklabels([f'国区', f'日区'])
-plt.ylabel('得票比例 (%)', fontsize=12)
-plt.title(f"角色人气对比: {TARGET_CN_NAME} vs {target_jp}", pad=20)
-plt.grid(axis='y', alpha=0.3)
-plt.rcParams['font.sans-serif'] = ['SimHei']  # 解决中文乱码
-
-# 添加数据标签
-for bar, value in zip(bars, [cn_pct, jp_pct]):
-    height = bar.get_height()
-    ax.text(bar.get_x() + bar.get_width()/2., height + 0.1,
-            f'{value:.2f}%', ha='center', va='bottom')
-
-# 绘制差值箭头
-ymax = max(cn_pct, jp_pct) + 5
-ax.annotate('', xy=(0.4, ymax-2), xytext=(0.4, ymax-8),
-            arrowprops=dict(arrowstyle="->", lw=1.5))
-ax.text(0.4, ymax, f'差值: {diff}%', 
-        ha='center', va='bottom', fontsize=12)
-
-plt.tight_layout()
-plt.show()
\ No newline at end of file
+    return shares[target_name]
+
+
+def aligned_pairs(offset=None):
+    """
+    对齐的 (国区Sheet, 日区Sheet) 列表：日区届数 = 国区届数 + offset。
+    offset 默认为两个大区最新一届之差（即国区第 11 届对日区第 20 届，往前依次对齐）。
+    """
+    cn = {s['number']: s['sheet'] for s in sessions(REGIONS['cn'][1], 'cn') if s['number'] is not None}
+    jp = {s['number']: s['sheet'] for s in sessions(REGIONS['jp'][1], 'jp') if s['number'] is not None}
+    if offset is None:
+        offset = max(jp) - max(cn)
+    return [(cn[n], jp[n + offset]) for n in sorted(cn) if n + offset in jp]
+
+
+def _region_long(region, sheet_names, sheet_col):
+    parts = []
+    for sheet_name in sheet_names:
+        shares = session_shares(region, sheet_name)
+        parts.append(pd.DataFrame({sheet_col: sheet_name, 'name': shares.index, 'share': shares.to_numpy()}))
+    return pd.concat(parts, ignore_index=True)
+
+
+def divergence_table(pairs, sort='abs'):
+    """
+    所有对齐届次中每个角色的 国区占比 - 日区占比（百分点），两个大区都上榜的角色才计入。
+    返回按 sort（abs：差值绝对值，diff：差值，cn / jp：该大区占比）降序排列的表，
+    rank 为差值绝对值的名次（1 为差异最大）。
+    """
+    pair_df = pd.DataFrame(pairs, columns=['cn_sheet', 'jp_sheet'])
+    cn = _region_long('cn', pair_df['cn_sheet'], 'cn_sheet').rename(columns={'name': '译名', 'share': 'cn_share'})
+    jp = _region_long('jp', pair_df['jp_sheet'], 'jp_sheet').rename(columns={'name': '日文名', 'share': 'jp_share'})
+    cn['日文名'] = cn['译名'].map(name_mapping())
+
+    # 一次连接：国区长表 × 届次对 × 日区长表
+    table = cn.merge(pair_df, on='cn_sheet').merge(jp, on=['jp_sheet', '日文名'])
+    table['diff'] = table['cn_share'] - table['jp_share']
+    table['abs_diff'] = table['diff'].abs()
+    table['rank'] = table['abs_diff'].rank(ascending=False, method='min').astype(int)
+    table = table.sort_values(SORT_KEYS[sort], ascending=False, kind='stable', ignore_index=True)
+    return table[['rank', '译名', '日文名', 'cn_sheet', 'jp_sheet', 'cn_share', 'jp_share', 'diff', 'abs_diff']]
+
+
+def run_all(args):
+    pairs = aligned_pairs(args.offset)
+    print("对齐的届次（国区 ↔ 日区）: " + ", ".join(f"{cn}↔{jp}" for cn, jp in pairs))
+    table = divergence_table(pairs, args.sort)
+    with pd.option_context('display.max_columns', None, 'display.width', 200):
+        print(table.head(args.top).round(2).to_string(index=False))
+    if args.output:
+        print(f"已保存到 {save_table(table, args.output)}")
+
+
+def compare(target_cn_name, cn_sheet_name, jp_sheet_name):
+    # 验证角色存在性
+    mapping = name_mapping()
+    if target_cn_name not in mapping:
+        raise ValueError(f"角色'{target_cn_name}'在对照表中不存在")
+    target_jp = mapping[target_cn_name]
+
+    # 4. 执行分析
+    try:
+        cn_pct = analyze_sheet('cn', cn_sheet_name, target_cn_name)
+        jp_pct = analyze_sheet('jp', jp_sheet_name, target_jp)
+    except Exception as e:
+        print(f"分析失败: {str(e)}")
+        return
+
+    # 5. 输出结果
+    diff = round(cn_pct - jp_pct, 2)
+    print(f"[角色分析报告] {target_cn_name} ({target_jp})")
+    print("═" * 40)
+    print(f"中文版 Sheet [{cn_sheet_name}]: {cn_pct:.2f}%")
+    print(f"日文版 Sheet [{jp_sheet_name}]: {jp_pct:.2f}%")
+    print(f"比例差值: {diff}% (+表示中文更高)")
+
+    # 6. 可视化对比
+    plt.figure(figsize=(10, 5))
+    ax = plt.subplot()
+
+    # 绘制双柱状图
+    positions = [0.2, 0.6]
+    colors = ['#2E86C1', '#E74C3C']
+    bars = ax.bar(positions, [cn_pct, jp_pct], 
+                 width=0.3, color=colors, 
+                 edgecolor='black', linewidth=1)
+
+    # 图表装饰
+    ax.set_xticks(positions)
+    ax.set_xticklabels([f'国区', f'日区'])
+    plt.ylabel('得票比例 (%)', fontsize=12)
+    plt.title(f"角色人气对比: {target_cn_name} vs {target_jp}", pad=20)
+    plt.grid(axis='y', alpha=0.3)
+    plt.rcParams['font.sans-serif'] = ['SimHei']  # 解决中文乱码
+
+    # 添加数据标签
+    for bar, value in zip(bars, [cn_pct, jp_pct]):
+        height = bar.get_height()
+        ax.text(bar.get_x() + bar.get_width()/2., height + 0.1,
+                f'{value:.2f}%', ha='center', va='bottom')
+
+    # 绘制差值箭头
+    ymax = max(cn_pct, jp_pct) + 5
+    ax.annotate('', xy=(0.4, ymax-2), xytext=(0.4, ymax-8),
+                arrowprops=dict(arrowstyle="->", lw=1.5))
+    ax.text(0.4, ymax, f'差值: {diff}%', 
+            ha='center', va='bottom', fontsize=12)
+
+    plt.tight_layout()
+    plt.show()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="国区与日区的角色得票占比差异")
+    parser.add_argument('--name', default=TARGET_CN_NAME, help="要分析的中文角色名")
+    parser.add_argument('--cn-sheet', default=CN_SHEET_NAME)
+    parser.add_argument('--jp-sheet', default=JP_SHEET_NAME)
+    parser.add_argument('--all', action='store_true', help="计算所有角色在所有对齐届次的差值并排名")
+    parser.add_argument('--offset', type=int, help="对齐方式：日区届数 = 国区届数 + offset（默认按最新一届对齐）")
+    parser.add_argument('--sort', choices=list(SORT_KEYS), default='abs', help="--all 时的排序依据")
+    parser.add_argument('--top', type=int, default=30, help="--all 时打印的行数")
+    parser.add_argument('--output', help="--all 时把完整的表保存为 .csv 或 .parquet")
+    args = parser.parse_args()
+
+    if args.all:
+        run_all(args)
+        return
+    compare(args.name, args.cn_sheet, args.jp_sheet)
+
+
+if __name__ == '__main__':
+    main()